@@ -41,10 +41,19 @@ PROTOCOL_VERSION = '2'
 DEFAULT_SETTINGS = {
     'backoff': None,
     'batch_max_requests': 25,
+    'batch_parallel_requests': 0,
     'cache_backend': '',
+    'cache_max_entries': 0,
+    'cache_max_size_bytes': 0,
     'cache_url': '',
     'cache_pool_size': 25,
     'cache_prefix': '',
+    'cache_purge_interval_seconds': 60,
+    'cache_tiered_backend': 'cliquet.cache.redis',
+    'cache_tiered_invalidation_channel': 'cliquet.cache.invalidation',
+    'cache_tiered_invalidation_pool_size': 5,
+    'cache_tiered_invalidation_url': '',
+    'cache_tiered_ttl_seconds': 5,
     'cors_origins': '*',
     'cors_max_age_seconds': 3600,
     'eos': None,
@@ -62,6 +71,7 @@ DEFAULT_SETTINGS = {
         'cliquet.initialization.setup_storage',
         'cliquet.initialization.setup_permission',
         'cliquet.initialization.setup_cache',
+        'cliquet.initialization.setup_permission_cache',
         'cliquet.initialization.setup_requests_scheme',
         'cliquet.initialization.setup_vary_headers',
         'cliquet.initialization.setup_version_redirection',
@@ -73,11 +83,13 @@ DEFAULT_SETTINGS = {
         'cliquet.events.setup_transaction_hook',
     ),
     'event_listeners': '',
+    'json_codec': None,
     'logging_renderer': 'cliquet.logs.ClassicLogRenderer',
     'newrelic_config': None,
     'newrelic_env': 'dev',
     'paginate_by': None,
     'permission_backend': '',
+    'permission_cache_ttl_seconds': 0,
     'permission_url': '',
     'permission_pool_size': 25,
     'profiler_dir': '/tmp',
@@ -89,9 +101,11 @@ DEFAULT_SETTINGS = {
     'retry_after_seconds': 30,
     'statsd_prefix': 'cliquet',
     'statsd_url': None,
+    'stream_collections': False,
     'storage_backend': '',
     'storage_url': '',
     'storage_max_fetch_size': 10000,
+    'storage_itersize': 1000,
     'storage_pool_size': 25,
     'tm.annotate_user': False,  # Do annotate transactions with the user-id.
     'transaction_per_request': True,
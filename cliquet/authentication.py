@@ -46,7 +46,16 @@ class BasicAuthAuthenticationPolicy(base_auth.BasicAuthAuthenticationPolicy):
             if not username:
                 return
 
-            hmac_secret = settings['userid_hmac_secret']
             credentials = '%s:%s' % credentials
+
+            # Batch subrequests share the bound data of their parent request:
+            # reuse the digest when the credentials are the same.
+            bound_data = getattr(request, 'bound_data', {})
+            cached = bound_data.get('basicauth_userid')
+            if cached is not None and cached[0] == credentials:
+                return cached[1]
+
+            hmac_secret = settings['userid_hmac_secret']
             userid = utils.hmac_digest(hmac_secret, credentials)
+            bound_data['basicauth_userid'] = (credentials, userid)
             return userid
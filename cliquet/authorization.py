@@ -85,7 +85,7 @@ class AuthorizationPolicy(object):
                 permission,
                 principals,
                 get_bound_permissions=self.get_bound_permissions)
-            allowed = len(shared_records) > 0
+            allowed = bool(shared_records)
 
         return allowed
 
@@ -101,6 +101,8 @@ class RouteFactory(object):
     permission_object_id = None
     current_record = None
     get_shared_ids = None
+    get_shared_objects = None
+    shared_objects = None
 
     method_permissions = {
         "head": "read",
@@ -156,10 +158,17 @@ class RouteFactory(object):
 
             if self.on_collection:
                 object_id_match = self.get_permission_object_id(request, '*')
+                permission = request.registry.permission
                 self.get_shared_ids = functools.partial(
-                    request.registry.permission.principals_accessible_objects,
+                    permission.principals_accessible_objects,
                     object_id_match=object_id_match)
 
+                storage = getattr(request.registry, 'storage', None)
+                if _share_database(storage, permission):
+                    self.get_shared_objects = functools.partial(
+                        permission.accessible_objects,
+                        object_id_match=object_id_match)
+
             settings = request.registry.settings
             setting = '%s_%s_principals' % (self.resource_name,
                                             self.required_permission)
@@ -168,7 +177,39 @@ class RouteFactory(object):
     def check_permission(self, *args, **kw):
         return self._check_permission(self.permission_object_id, *args, **kw)
 
+    @property
+    def shared_ids(self):
+        """Ids of the shared records of partial collections. When the shared
+        records are joined by the storage backend (see
+        :attr:`shared_objects`), they are only fetched if accessed.
+
+        :rtype: list
+        """
+        if self._shared_ids is None:
+            ids = self.shared_objects.fetch()
+            self._shared_ids = [self.extract_object_id(id_) for id_ in ids]
+        return self._shared_ids
+
+    @shared_ids.setter
+    def shared_ids(self, ids):
+        self._shared_ids = ids
+        self.shared_objects = None
+
     def fetch_shared_records(self, perm, principals, get_bound_permissions):
+        if self.get_shared_objects is not None:
+            # Records are joined with their permissions by the storage
+            # backend: only check that some are shared.
+            shared = self.get_shared_objects(
+                permission=perm,
+                principals=principals,
+                get_bound_permissions=get_bound_permissions)
+            if not shared.exists():
+                self.shared_ids = []
+                return self.shared_ids
+            self._shared_ids = None
+            self.shared_objects = shared
+            return shared
+
         ids = self.get_shared_ids(
             permission=perm,
             principals=principals,
@@ -199,3 +240,14 @@ class RouteFactory(object):
     def extract_object_id(self, object_uri):
         # XXX: Help needed: use something like route.matchdict.get('id').
         return object_uri.split('/')[-1]
+
+
+def _share_database(storage, permission):
+    """Whether the records of the storage backend can be joined with the
+    permissions in the same database (i.e. PostgreSQL backends with the same
+    URL).
+    """
+    if storage is None or not hasattr(permission, 'accessible_objects'):
+        return False
+    client = getattr(storage, 'client', None)
+    return client is not None and client is getattr(permission, 'client', None)
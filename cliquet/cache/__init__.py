@@ -53,6 +53,23 @@ class CacheBase(object):
         """
         raise NotImplementedError
 
+    def set_if_absent(self, key, value, ttl=None):
+        """Store a value with the specified `key`, unless a value is already
+        stored. If `ttl` is provided, set an expiration value.
+
+        Backends should override this to do it atomically.
+
+        :param str key: key
+        :param str value: value to store
+        :param float ttl: expire after number of seconds
+        :returns: ``True`` if the value was stored.
+        :rtype: bool
+        """
+        if self.get(key) is not None:
+            return False
+        self.set(key, value, ttl)
+        return True
+
     def get(self, key):
         """Obtain the value of the specified `key`.
 
@@ -69,6 +86,61 @@ class CacheBase(object):
         """
         raise NotImplementedError
 
+    def get_many(self, keys):
+        """Obtain the values of the specified `keys`.
+
+        Backends may override this to fetch them in a single round trip.
+
+        :param list keys: list of keys
+        :returns: the stored values or None if missing, in the same order.
+        :rtype: list
+        """
+        return [self.get(key) for key in keys]
+
+    def get_many_with_ttl(self, keys):
+        """Obtain the values of the specified `keys`, along their expiration
+        values.
+
+        Backends may override this to fetch them in a single round trip.
+
+        :param list keys: list of keys
+        :returns: the stored values or None if missing, and their number of
+            seconds to live or negative if no TTL, in the same order.
+        :rtype: list of tuples
+        """
+        return [(self.get(key), self.ttl(key)) for key in keys]
+
+    def set_many(self, items, ttl=None):
+        """Store several values. If `ttl` is provided, set an expiration
+        value on each of them.
+
+        Backends may override this to store them in a single round trip.
+
+        :param dict items: values to store by key
+        :param float ttl: expire after number of seconds
+        """
+        for key, value in items.items():
+            self.set(key, value, ttl)
+
+    def delete_many(self, keys):
+        """Delete the values of the specified `keys`.
+
+        Backends may override this to delete them in a single round trip.
+
+        :param list keys: list of keys
+        """
+        for key in keys:
+            self.delete(key)
+
+    def purge_expired(self):
+        """Delete the expired values.
+
+        This is executed when the ``cliquet purge-cache`` command is ran.
+        Nothing is done by default, for backends that expire values on their
+        own.
+        """
+        pass
+
 
 def heartbeat(backend):
     def ping(request):
@@ -1,19 +1,36 @@
+import heapq
+import threading
+from collections import OrderedDict
+
 from cliquet import utils
 from cliquet.cache import CacheBase
 
 
 class Cache(CacheBase):
-    """Cache backend implementation in local thread memory.
+    """Cache backend implementation in local process memory.
 
     Enable in configuration::
 
         cliquet.cache_backend = cliquet.cache.memory
 
+    *(Optional)* The number and the size of the stored values can be bounded
+    (unbounded by default). The least recently used ones are evicted when
+    exceeded::
+
+        cliquet.cache_max_entries = 10000
+        cliquet.cache_max_size_bytes = 524288
+
+    Bounding the number of values is cheaper, since the size of every value
+    is measured by serializing it.
+
     :noindex:
     """
 
     def __init__(self, *args, **kwargs):
         super(Cache, self).__init__(*args, **kwargs)
+        self.max_entries = kwargs.get('max_entries')
+        self.max_size_bytes = kwargs.get('max_size_bytes')
+        self._lock = threading.RLock()
         self.flush()
 
     def initialize_schema(self):
@@ -21,8 +38,14 @@ class Cache(CacheBase):
         pass
 
     def flush(self):
-        self._ttl = {}
-        self._store = {}
+        with self._lock:
+            # Values ordered from least to most recently used.
+            self._store = OrderedDict()
+            self._sizes = {}
+            self._size = 0
+            self._ttl = {}
+            # Expiration times, possibly outdated by further ``expire()``.
+            self._expirations = []
 
     def ttl(self, key):
         ttl = self._ttl.get(self.prefix + key)
@@ -31,26 +54,93 @@ class Cache(CacheBase):
         return -1
 
     def expire(self, key, ttl):
-        self._ttl[self.prefix + key] = utils.msec_time() + int(ttl * 1000.0)
+        with self._lock:
+            self._expire(self.prefix + key, ttl)
+
+    def _expire(self, key, ttl):
+        expiration = utils.msec_time() + int(ttl * 1000.0)
+        self._ttl[key] = expiration
+        heapq.heappush(self._expirations, (expiration, key))
+        if len(self._expirations) > 2 * len(self._ttl) + 100:
+            # Drop the outdated expiration times.
+            self._expirations = [(v, k) for k, v in self._ttl.items()]
+            heapq.heapify(self._expirations)
 
     def set(self, key, value, ttl=None):
-        if ttl is not None:
-            self.expire(key, ttl)
-        self._store[self.prefix + key] = value
+        key = self.prefix + key
+        size = 0
+        if self.max_size_bytes:
+            size = len(key) + len(utils.json.dumps(value))
+        with self._lock:
+            if self.max_size_bytes and size > self.max_size_bytes:
+                self._delete(key)
+                return
+            self._store.pop(key, None)
+            self._size -= self._sizes.pop(key, 0)
+            if ttl is not None:
+                self._expire(key, ttl)
+            self._store[key] = value
+            self._sizes[key] = size
+            self._size += size
+            self._evict()
+
+    def set_if_absent(self, key, value, ttl=None):
+        with self._lock:
+            self._purge_expired()
+            if self.prefix + key in self._store:
+                return False
+            self.set(key, value, ttl)
+            return True
 
     def get(self, key):
-        current = utils.msec_time()
-        expired = [k for k, v in self._ttl.items() if current >= v]
-        for expired_item_key in expired:
-            self.delete(expired_item_key[len(self.prefix):])
-        return self._store.get(self.prefix + key)
+        key = self.prefix + key
+        with self._lock:
+            self._purge_expired()
+            if key not in self._store:
+                return None
+            # Mark as most recently used.
+            value = self._store.pop(key)
+            self._store[key] = value
+            return value
 
     def delete(self, key):
-        key = self.prefix + key
+        with self._lock:
+            self._delete(self.prefix + key)
+
+    def _delete(self, key):
         self._ttl.pop(key, None)
         self._store.pop(key, None)
+        self._size -= self._sizes.pop(key, 0)
+
+    def purge_expired(self):
+        with self._lock:
+            self._purge_expired()
+
+    def _purge_expired(self):
+        """Delete the values whose expiration time is passed, without
+        scanning every stored value.
+        """
+        current = utils.msec_time()
+        while self._expirations and self._expirations[0][0] <= current:
+            expiration, key = heapq.heappop(self._expirations)
+            if self._ttl.get(key) == expiration:
+                self._delete(key)
+
+    def _evict(self):
+        """Delete the least recently used values until the stored values
+        fit in the maximum number and size.
+        """
+        if not self.max_entries and not self.max_size_bytes:
+            return
+        self._purge_expired()
+        while ((self.max_entries and len(self._store) > self.max_entries) or
+               (self.max_size_bytes and self._size > self.max_size_bytes)):
+            key = next(iter(self._store))
+            self._delete(key)
 
 
 def load_from_config(config):
     settings = config.get_settings()
-    return Cache(cache_prefix=settings['cache_prefix'])
+    return Cache(cache_prefix=settings['cache_prefix'],
+                 max_entries=int(settings['cache_max_entries']),
+                 max_size_bytes=int(settings['cache_max_size_bytes']))
@@ -1,11 +1,13 @@
 from __future__ import absolute_import
 
 import os
+import time
 
 from cliquet import logger
 from cliquet.cache import CacheBase
+from cliquet.storage import exceptions
 from cliquet.storage.postgresql.client import create_from_config
-from cliquet.utils import json
+from cliquet.utils import json, sqlalchemy
 
 
 class Cache(CacheBase):
@@ -34,6 +36,14 @@ class Cache(CacheBase):
         distinguish schema manipulation privileges from schema usage.
 
 
+    Expired values are deleted along with writes, in a separate transaction,
+    at most once per interval of time (*0 to disable*)::
+
+        cliquet.cache_purge_interval_seconds = 60
+
+    They can also be deleted from a periodic job, using the
+    ``cliquet purge-cache`` command.
+
     A connection pool is enabled by default::
 
         cliquet.cache_pool_size = 10
@@ -63,6 +73,8 @@ class Cache(CacheBase):
     def __init__(self, client, *args, **kwargs):
         super(Cache, self).__init__(*args, **kwargs)
         self.client = client
+        self.purge_interval = kwargs.get('purge_interval')
+        self._last_purge = 0
 
     def initialize_schema(self):
         # Create schema
@@ -116,12 +128,44 @@ class Cache(CacheBase):
         with self.client.connect() as conn:
             conn.execute(query, dict(key=self.prefix + key,
                                      value=value, ttl=ttl))
+        self._purge_if_due()
 
-    def get(self, key):
-        purge = "DELETE FROM cache WHERE ttl IS NOT NULL AND now() > ttl;"
-        query = "SELECT value FROM cache WHERE key = :key;"
+    def set_if_absent(self, key, value, ttl=None):
+        query = """
+        WITH expired AS (
+            UPDATE cache SET value = :value, ttl = sec2ttl(:ttl)
+             WHERE key = :key
+               AND ttl IS NOT NULL AND ttl <= now()
+            RETURNING key
+        ),
+        inserted AS (
+            INSERT INTO cache (key, value, ttl)
+            SELECT :key, :value, sec2ttl(:ttl)
+            WHERE NOT EXISTS (SELECT 1 FROM cache WHERE key = :key)
+            RETURNING key
+        )
+        SELECT key FROM expired UNION ALL SELECT key FROM inserted;
+        """
+        value = json.dumps(value)
         with self.client.connect() as conn:
-            conn.execute(purge)
+            try:
+                # If the key is inserted concurrently, the unique violation
+                # only rolls back to this savepoint.
+                with conn.begin_nested():
+                    result = conn.execute(query, dict(key=self.prefix + key,
+                                                      value=value, ttl=ttl))
+            except sqlalchemy.exc.IntegrityError:
+                return False
+            return result.rowcount > 0
+
+    def get(self, key):
+        query = """
+        SELECT value
+          FROM cache
+         WHERE key = :key
+           AND (ttl IS NULL OR ttl > now());
+        """
+        with self.client.connect(readonly=True) as conn:
             result = conn.execute(query, dict(key=self.prefix + key))
             if result.rowcount > 0:
                 value = result.fetchone()['value']
@@ -132,8 +176,124 @@ class Cache(CacheBase):
         with self.client.connect() as conn:
             conn.execute(query, dict(key=self.prefix + key))
 
+    def get_many(self, keys):
+        if not keys:
+            return []
+        query = """
+        SELECT key, value
+          FROM cache
+         WHERE key IN :keys
+           AND (ttl IS NULL OR ttl > now());
+        """
+        prefixed = tuple(self.prefix + key for key in keys)
+        with self.client.connect(readonly=True) as conn:
+            result = conn.execute(query, dict(keys=prefixed))
+            values = dict((row['key'], json.loads(row['value']))
+                          for row in result.fetchall())
+        return [values.get(key) for key in prefixed]
+
+    def get_many_with_ttl(self, keys):
+        if not keys:
+            return []
+        query = """
+        SELECT key, value, EXTRACT(EPOCH FROM (ttl - now())) AS ttl
+          FROM cache
+         WHERE key IN :keys
+           AND (ttl IS NULL OR ttl > now());
+        """
+        prefixed = tuple(self.prefix + key for key in keys)
+        with self.client.connect(readonly=True) as conn:
+            result = conn.execute(query, dict(keys=prefixed))
+            values = dict((row['key'], (json.loads(row['value']),
+                                        -1 if row['ttl'] is None
+                                        else row['ttl']))
+                          for row in result.fetchall())
+        return [values.get(key, (None, -1)) for key in prefixed]
+
+    def set_many(self, items, ttl=None):
+        if not items:
+            return
+        query = """
+        WITH new_values AS (
+            SELECT key, value
+              FROM unnest((:keys)::VARCHAR[], (:values)::TEXT[])
+                AS v(key, value)
+        ),
+        upsert AS (
+            UPDATE cache SET value = new_values.value, ttl = sec2ttl(:ttl)
+              FROM new_values
+             WHERE cache.key = new_values.key
+            RETURNING cache.key
+        )
+        INSERT INTO cache (key, value, ttl)
+        SELECT key, value, sec2ttl(:ttl)
+          FROM new_values
+         WHERE key NOT IN (SELECT key FROM upsert);
+        """
+        keys = [self.prefix + key for key in items.keys()]
+        values = [json.dumps(value) for value in items.values()]
+        with self.client.connect() as conn:
+            conn.execute(query, dict(keys=keys, values=values, ttl=ttl))
+        self._purge_if_due()
+
+    def delete_many(self, keys):
+        if not keys:
+            return
+        query = "DELETE FROM cache WHERE key IN :keys"
+        prefixed = tuple(self.prefix + key for key in keys)
+        with self.client.connect() as conn:
+            conn.execute(query, dict(keys=prefixed))
+
+    def purge_expired(self):
+        # Since called outside request, force commit.
+        with self.client.connect(force_commit=True) as conn:
+            result = conn.execute(PURGE_QUERY)
+        logger.info('Purged %s expired values from PostgreSQL cache' %
+                    result.rowcount)
+
+    def _purge_is_due(self):
+        """Whether expired values should be deleted, at most once every
+        ``purge_interval`` seconds in this process.
+        """
+        if not self.purge_interval:
+            return False
+        now = time.time()
+        if now - self._last_purge < self.purge_interval:
+            return False
+        self._last_purge = now
+        return True
+
+    def _purge_if_due(self):
+        """Delete expired values if due, on a connection of its own, so that
+        the deleted rows are not locked until the end of the current request.
+
+        The purge gives up instead of waiting for rows locked by running
+        transactions (including the one of the current request): these
+        values are deleted by the next purge.
+        """
+        if not self._purge_is_due():
+            return
+        try:
+            with self.client.connect_autocommit() as conn:
+                conn.execute("SET lock_timeout = '%sms';" %
+                             PURGE_LOCK_TIMEOUT_MS)
+                try:
+                    conn.execute(PURGE_QUERY)
+                finally:
+                    conn.execute('RESET lock_timeout;')
+        except exceptions.BackendError as e:
+            logger.warning('Expired values were not purged: %s' % e)
+
+
+PURGE_QUERY = "DELETE FROM cache WHERE ttl IS NOT NULL AND now() > ttl;"
+
+# Maximum wait for rows locked by other transactions during purges.
+PURGE_LOCK_TIMEOUT_MS = 100
+
 
 def load_from_config(config):
     settings = config.get_settings()
     client = create_from_config(config, prefix='cache_')
-    return Cache(client=client, cache_prefix=settings['cache_prefix'])
+    purge_interval = float(settings['cache_purge_interval_seconds'])
+    return Cache(client=client, cache_prefix=settings['cache_prefix'],
+                 purge_interval=purge_interval)
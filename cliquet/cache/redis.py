@@ -61,6 +61,13 @@ class Cache(CacheBase):
         else:
             self._client.set(self.prefix + key, value)
 
+    @wrap_redis_error
+    def set_if_absent(self, key, value, ttl=None):
+        value = json.dumps(value)
+        px = int(ttl * 1000) if ttl else None
+        return bool(self._client.set(self.prefix + key, value, px=px,
+                                     nx=True))
+
     @wrap_redis_error
     def get(self, key):
         value = self._client.get(self.prefix + key)
@@ -72,6 +79,45 @@ class Cache(CacheBase):
     def delete(self, key):
         self._client.delete(self.prefix + key)
 
+    @wrap_redis_error
+    def get_many(self, keys):
+        if not keys:
+            return []
+        values = self._client.mget([self.prefix + key for key in keys])
+        return [json.loads(value.decode('utf-8')) if value else None
+                for value in values]
+
+    @wrap_redis_error
+    def get_many_with_ttl(self, keys):
+        if not keys:
+            return []
+        prefixed = [self.prefix + key for key in keys]
+        with self._client.pipeline(transaction=False) as pipe:
+            pipe.mget(prefixed)
+            for key in prefixed:
+                pipe.ttl(key)
+            results = pipe.execute()
+        values = [json.loads(value.decode('utf-8')) if value else None
+                  for value in results[0]]
+        return list(zip(values, results[1:]))
+
+    @wrap_redis_error
+    def set_many(self, items, ttl=None):
+        with self._client.pipeline() as multi:
+            for key, value in items.items():
+                value = json.dumps(value)
+                if ttl:
+                    multi.psetex(self.prefix + key, int(ttl * 1000), value)
+                else:
+                    multi.set(self.prefix + key, value)
+            multi.execute()
+
+    @wrap_redis_error
+    def delete_many(self, keys):
+        if not keys:
+            return
+        self._client.delete(*[self.prefix + key for key in keys])
+
 
 def load_from_config(config):
     settings = config.get_settings()
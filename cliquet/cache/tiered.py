@@ -0,0 +1,223 @@
+from __future__ import absolute_import
+
+import os
+import threading
+import time
+import uuid
+
+import redis
+
+from cliquet import logger
+from cliquet.cache import CacheBase, memory
+from cliquet.storage.redis import wrap_redis_error, create_from_config
+from cliquet.utils import json
+
+
+# Bounds of the delay (in seconds) before subscribing again to
+# invalidations, when the server is unreachable.
+MIN_LISTEN_BACKOFF = 0.1
+MAX_LISTEN_BACKOFF = 5
+
+
+class Cache(CacheBase):
+    """Cache backend keeping values in local process memory, in front of
+    another cache backend shared by every node.
+
+    Values read from the remote backend are kept locally until their remote
+    expiration, or at most a few seconds. The number and the size of local
+    values can be bounded by the ``cache_max_entries`` and
+    ``cache_max_size_bytes`` settings (see
+    :class:`cliquet.cache.memory.Cache`).
+
+    Enable in configuration::
+
+        cliquet.cache_backend = cliquet.cache.tiered
+        cliquet.cache_tiered_backend = cliquet.cache.redis
+
+    *(Optional)* The duration of values in local memory can be customized::
+
+        cliquet.cache_tiered_ttl_seconds = 5
+
+    *(Optional)* Values deleted, modified or expired on a node can be removed
+    from the local memory of other nodes, using Redis Pub/Sub::
+
+        cliquet.cache_tiered_invalidation_url = redis://localhost:6379/1
+        cliquet.cache_tiered_invalidation_channel = cliquet.cache.invalidation
+
+    Invalidations are received by a thread, started in each process when the
+    local memory is first used (e.g. after the server workers are forked).
+
+    :noindex:
+    """
+
+    def __init__(self, remote, local, local_ttl, client=None,
+                 channel=None, *args, **kwargs):
+        super(Cache, self).__init__(*args, **kwargs)
+        self.remote = remote
+        self.local = local
+        self.local_ttl = local_ttl
+        self._client = client
+        self._channel = channel
+        self._node_id = uuid.uuid4().hex
+        self._listening_pid = None
+        self._listening_lock = threading.Lock()
+
+    def initialize_schema(self):
+        self.remote.initialize_schema()
+
+    def flush(self):
+        self.remote.flush()
+        self.local.flush()
+        self._invalidate(None)
+
+    def ttl(self, key):
+        return self.remote.ttl(key)
+
+    def expire(self, key, ttl):
+        self.remote.expire(key, ttl)
+        self.local.delete(key)
+        self._invalidate([key])
+
+    def set(self, key, value, ttl=None):
+        self.remote.set(key, value, ttl)
+        self._listen_invalidations()
+        local_ttl = self.local_ttl
+        if ttl is not None:
+            local_ttl = min(ttl, local_ttl)
+        self.local.set(key, value, local_ttl)
+        self._invalidate([key])
+
+    def set_if_absent(self, key, value, ttl=None):
+        stored = self.remote.set_if_absent(key, value, ttl)
+        self.local.delete(key)
+        if stored:
+            self._invalidate([key])
+        return stored
+
+    def get(self, key):
+        return self.get_many([key])[0]
+
+    def _keep_locally(self, key, value, ttl):
+        """Keep the remote value locally until its remote expiration at most.
+        """
+        if ttl == -1:
+            self.local.set(key, value, self.local_ttl)
+        elif ttl > 0:
+            self.local.set(key, value, min(float(ttl), self.local_ttl))
+
+    def delete(self, key):
+        self.remote.delete(key)
+        self.local.delete(key)
+        self._invalidate([key])
+
+    def get_many(self, keys):
+        self._listen_invalidations()
+        values = [self.local.get(key) for key in keys]
+        missing = [key for key, value in zip(keys, values) if value is None]
+        if not missing:
+            return values
+
+        remote_values = {}
+        fetched = self.remote.get_many_with_ttl(missing)
+        for key, (value, ttl) in zip(missing, fetched):
+            if value is not None:
+                self._keep_locally(key, value, ttl)
+            remote_values[key] = value
+        return [remote_values.get(key) if value is None else value
+                for key, value in zip(keys, values)]
+
+    def set_many(self, items, ttl=None):
+        self.remote.set_many(items, ttl)
+        self._listen_invalidations()
+        local_ttl = self.local_ttl
+        if ttl is not None:
+            local_ttl = min(ttl, local_ttl)
+        for key, value in items.items():
+            self.local.set(key, value, local_ttl)
+        self._invalidate(list(items.keys()))
+
+    def delete_many(self, keys):
+        self.remote.delete_many(keys)
+        for key in keys:
+            self.local.delete(key)
+        self._invalidate(keys)
+
+    def purge_expired(self):
+        self.remote.purge_expired()
+        self.local.purge_expired()
+
+    def _invalidate(self, keys):
+        """Notify the other nodes that the local values of `keys` (or every
+        value if ``None``) are outdated.
+
+        The change is already made on the remote backend: a failure is only
+        logged, and other nodes keep their values until their local TTL.
+        """
+        if self._client is None:
+            return
+        message = json.dumps({'node': self._node_id, 'keys': keys})
+        try:
+            self._client.publish(self._channel, message)
+        except redis.RedisError as e:
+            logger.exception(e)
+
+    @wrap_redis_error
+    def _listen_invalidations(self):
+        """Start the thread receiving invalidations of other nodes, once per
+        process since threads do not survive forks.
+        """
+        if self._client is None or self._listening_pid == os.getpid():
+            return
+        with self._listening_lock:
+            if self._listening_pid == os.getpid():
+                return
+            pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(**{self._channel: self._on_invalidation})
+            # Invalidations may have been missed before subscribing.
+            self.local.flush()
+            thread = threading.Thread(target=self._listen, args=(pubsub,))
+            thread.daemon = True
+            thread.start()
+            self._listening_pid = os.getpid()
+
+    def _on_invalidation(self, message):
+        data = json.loads(message['data'].decode('utf-8'))
+        if data['node'] == self._node_id:
+            return
+        if data['keys'] is None:
+            self.local.flush()
+        else:
+            for key in data['keys']:
+                self.local.delete(key)
+
+    def _listen(self, pubsub):
+        backoff = MIN_LISTEN_BACKOFF
+        while True:
+            try:
+                for _ in pubsub.listen():
+                    backoff = MIN_LISTEN_BACKOFF
+            except redis.RedisError as e:
+                # Invalidations may have been missed.
+                logger.exception(e)
+                self.local.flush()
+                time.sleep(backoff)
+                backoff = min(backoff * 2, MAX_LISTEN_BACKOFF)
+
+
+def load_from_config(config):
+    settings = config.get_settings()
+    remote_mod = config.maybe_dotted(settings['cache_tiered_backend'])
+    remote = remote_mod.load_from_config(config)
+    local = memory.Cache(cache_prefix=settings['cache_prefix'],
+                         max_entries=int(settings['cache_max_entries']),
+                         max_size_bytes=int(settings['cache_max_size_bytes']))
+
+    client = None
+    if settings['cache_tiered_invalidation_url']:
+        client = create_from_config(config,
+                                    prefix='cache_tiered_invalidation_')
+    return Cache(remote, local,
+                 local_ttl=float(settings['cache_tiered_ttl_seconds']),
+                 client=client,
+                 channel=settings['cache_tiered_invalidation_channel'],
+                 cache_prefix=settings['cache_prefix'])
@@ -27,6 +27,7 @@ from cliquet import statsd
 from cliquet import cache
 from cliquet import storage
 from cliquet import permission
+from cliquet.permission.cached import CachedPermission
 from cliquet.logs import logger
 from cliquet.events import ResourceRead, ResourceChanged, ACTIONS
 
@@ -45,11 +46,19 @@ def setup_json_serializer(config):
     import requests
     import webob
 
-    # Monkey patch to use ujson
+    settings = config.get_settings()
+    codec = settings['json_codec']
+    try:
+        utils.json.configure(codec)
+    except ImportError:
+        error_msg = "Unknown JSON codec %r (module not installed)." % codec
+        raise ConfigurationError(error_msg)
+
+    # Monkey patch to use the configured codec
     webob.request.json = utils.json
     requests.models.json = utils.json
 
-    # Override json renderer using ujson
+    # Override json renderer using the configured codec
     renderer = JSONRenderer(serializer=utils.json_serializer)
     config.add_renderer('json', renderer)
 
@@ -239,6 +248,21 @@ def setup_cache(config):
     config.registry.heartbeats['cache'] = heartbeat
 
 
+def setup_permission_cache(config):
+    """Keep the principals of objects permissions in the cache backend, if
+    enabled with the ``permission_cache_ttl_seconds`` setting.
+    """
+    settings = config.get_settings()
+    ttl = float(settings['permission_cache_ttl_seconds'])
+    registry = config.registry
+    if not ttl or not hasattr(registry, 'permission') or \
+            not hasattr(registry, 'cache'):
+        return
+
+    registry.permission = CachedPermission(registry.permission,
+                                           registry.cache, ttl)
+
+
 def setup_statsd(config):
     settings = config.get_settings()
     config.registry.statsd = None
@@ -1,9 +1,9 @@
 from __future__ import absolute_import
-import json
 
 from cliquet.listeners import ListenerBase
 from cliquet.storage.redis import create_from_config
 from cliquet import logger
+from cliquet.utils import json
 
 
 class Listener(ListenerBase):
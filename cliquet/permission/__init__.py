@@ -162,6 +162,24 @@ class PermissionBase(object):
         """
         raise NotImplementedError
 
+    def set_object_permissions(self, object_id, permissions, owner=None):
+        """Replace given object permissions, give the ``write`` permission to
+        the `owner` principal, and return the resulting object permissions.
+
+        Backends can override it to perform it in a single operation.
+
+        :param str object_id: The object to replace permissions to.
+        :param str permissions: The permissions dict to replace.
+        :param str owner: The principal to add to the ``write`` permission.
+        :returns: The dictionnary with the list of user principals for
+                  each object permissions
+        :rtype: dict
+        """
+        self.replace_object_permissions(object_id, permissions)
+        if owner is not None:
+            self.add_principal_to_ace(object_id, 'write', owner)
+        return self.object_permissions(object_id)
+
     def delete_object_permissions(self, *object_id_list):
         """Delete all listed object permissions.
 
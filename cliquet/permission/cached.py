@@ -0,0 +1,165 @@
+import hashlib
+import uuid
+
+import transaction
+
+from cliquet.permission import PermissionBase
+
+
+_VERSION_KEY = 'permission.version'
+
+
+def _digest(*parts):
+    identifier = '\n'.join(parts)
+    return hashlib.md5(identifier.encode('utf-8')).hexdigest()
+
+
+def _version_key(object_id):
+    return '{0}.{1}'.format(_VERSION_KEY, _digest(object_id))
+
+
+class CachedPermission(PermissionBase):
+    """Permission backend wrapper, which keeps the principals of objects
+    permissions in the cache backend.
+
+    Each object has a version stored in the cache backend, which changes
+    with its Access Control Entries. Cached entries are outdated by a change
+    on the object or on the objects they inherit from. If the cache backend
+    is shared, changes are thus taken into account by every process.
+
+    Enable in configuration (*in seconds*)::
+
+        cliquet.permission_cache_ttl_seconds = 10
+
+    .. note::
+
+        Changes are taken into account again once the current transaction is
+        committed, since cached entries may have been read from uncommitted
+        or rolled back changes in the meantime.
+    """
+
+    def __init__(self, backend, cache, ttl, *args, **kwargs):
+        super(CachedPermission, self).__init__(*args, **kwargs)
+        self.backend = backend
+        self.cache = cache
+        self.ttl = ttl
+
+    def __getattr__(self, name):
+        # Backend specific attributes (e.g. ``client``).
+        if name == 'backend':
+            raise AttributeError(name)
+        return getattr(self.backend, name)
+
+    def _cached(self, kind, object_id, permission, fetch, bound=None):
+        """Obtain the principals from the cache backend if they were cached
+        with the current versions of the objects of the `bound` permissions,
+        otherwise `fetch` and cache them.
+        """
+        bound = set(tuple(b) for b in bound or [])
+        bound = sorted(bound | {(object_id, permission)})
+        key = 'permission.{0}.{1}'.format(
+            kind, _digest(*['{0}\n{1}'.format(*b) for b in bound]))
+        objects = sorted(set(obj for obj, _ in bound))
+        # The global version is only changed by ``flush()``.
+        version_keys = [_VERSION_KEY] + [_version_key(o) for o in objects]
+
+        values = self.cache.get_many(version_keys + [key])
+        versions, cached = values[:-1], values[-1]
+        if cached is not None and cached.get('versions') == versions:
+            return set(cached['principals'])
+
+        if None in versions:
+            # Create the missing versions before fetching, without replacing
+            # those created meanwhile by changes. Entries cached with an
+            # expired (or evicted) version are outdated by the new one.
+            for version_key, version in zip(version_keys, versions):
+                if version is None:
+                    self.cache.set_if_absent(version_key, uuid.uuid4().hex,
+                                             self.ttl)
+            versions = self.cache.get_many(version_keys)
+
+        principals = fetch()
+        if None not in versions:
+            self.cache.set(key, {'versions': versions,
+                                 'principals': list(principals)}, self.ttl)
+        return principals
+
+    def _invalidate(self, *object_ids):
+        keys = [_version_key(object_id) for object_id in object_ids]
+        self.cache.delete_many(keys)
+
+        def delete_after_commit(success):
+            self.cache.delete_many(keys)
+        transaction.get().addAfterCommitHook(delete_after_commit)
+
+    def initialize_schema(self):
+        self.backend.initialize_schema()
+
+    def flush(self):
+        self.backend.flush()
+        self.cache.delete(_VERSION_KEY)
+
+    def add_user_principal(self, user_id, principal):
+        self.backend.add_user_principal(user_id, principal)
+
+    def remove_user_principal(self, user_id, principal):
+        self.backend.remove_user_principal(user_id, principal)
+
+    def remove_principal(self, principal):
+        self.backend.remove_principal(principal)
+
+    def user_principals(self, user_id):
+        return self.backend.user_principals(user_id)
+
+    def add_principal_to_ace(self, object_id, permission, principal):
+        self.backend.add_principal_to_ace(object_id, permission, principal)
+        self._invalidate(object_id)
+
+    def remove_principal_from_ace(self, object_id, permission, principal):
+        self.backend.remove_principal_from_ace(object_id, permission,
+                                               principal)
+        self._invalidate(object_id)
+
+    def object_permission_principals(self, object_id, permission):
+        def fetch():
+            return self.backend.object_permission_principals(object_id,
+                                                             permission)
+        return self._cached('principals', object_id, permission, fetch)
+
+    def principals_accessible_objects(self, principals, permission,
+                                      object_id_match=None,
+                                      get_bound_permissions=None):
+        return self.backend.principals_accessible_objects(
+            principals, permission, object_id_match=object_id_match,
+            get_bound_permissions=get_bound_permissions)
+
+    def object_permission_authorized_principals(self, object_id, permission,
+                                                get_bound_permissions=None):
+        def fetch():
+            return self.backend.object_permission_authorized_principals(
+                object_id, permission, get_bound_permissions)
+        if get_bound_permissions is None:
+            return self._cached('principals', object_id, permission, fetch)
+        bound = get_bound_permissions(object_id, permission)
+        return self._cached('authorized', object_id, permission, fetch,
+                            bound=bound)
+
+    def object_permissions(self, object_id, permissions=None):
+        return self.backend.object_permissions(object_id, permissions)
+
+    def replace_object_permissions(self, object_id, permissions):
+        result = self.backend.replace_object_permissions(object_id,
+                                                         permissions)
+        self._invalidate(object_id)
+        return result
+
+    def set_object_permissions(self, object_id, permissions, owner=None):
+        result = self.backend.set_object_permissions(object_id, permissions,
+                                                     owner)
+        self._invalidate(object_id)
+        return result
+
+    def delete_object_permissions(self, *object_id_list):
+        result = self.backend.delete_object_permissions(*object_id_list)
+        self._invalidate(*object_id_list)
+        return result
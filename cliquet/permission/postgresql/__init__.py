@@ -4,8 +4,11 @@ import os
 
 from collections import defaultdict
 
+import six
+
 from cliquet import logger
 from cliquet.permission import PermissionBase
+from cliquet.storage.postgresql import SubQuery
 from cliquet.storage.postgresql.client import create_from_config
 
 
@@ -61,18 +64,83 @@ class Permission(PermissionBase):
 
     :noindex:
     """  # NOQA
+
+    schema_version = 2
+
     def __init__(self, client, *args, **kwargs):
         super(Permission, self).__init__(*args, **kwargs)
         self.client = client
 
-    def initialize_schema(self):
-        # Create schema
+    def _execute_sql_file(self, filepath):
         here = os.path.abspath(os.path.dirname(__file__))
-        schema = open(os.path.join(here, 'schema.sql')).read()
+        schema = open(os.path.join(here, filepath)).read()
         # Since called outside request, force commit.
         with self.client.connect(force_commit=True) as conn:
             conn.execute(schema)
-        logger.info('Created PostgreSQL permission tables')
+
+    def initialize_schema(self):
+        """Create PostgreSQL tables, and run necessary schema migrations.
+        """
+        version = self._get_installed_version()
+        if not version:
+            # Create full schema.
+            self._execute_sql_file('schema.sql')
+            logger.info('Created PostgreSQL permission tables '
+                        '(version %s).' % self.schema_version)
+            return
+
+        logger.debug('Detected PostgreSQL permission schema version %s.' %
+                     version)
+        migrations = [(v, v + 1) for v in range(version, self.schema_version)]
+        if not migrations:
+            logger.info('Permission schema is up-to-date.')
+
+        for migration in migrations:
+            # Check order of migrations.
+            expected = migration[0]
+            current = self._get_installed_version()
+            error_msg = "Expected version %s. Found version %s."
+            if expected != current:
+                raise AssertionError(error_msg % (expected, current))
+
+            logger.info('Migrate permission schema from version %s to %s.' %
+                        migration)
+            filepath = 'migration_%03d_%03d.sql' % migration
+            self._execute_sql_file(os.path.join('migrations', filepath))
+
+        logger.info('Permission schema migration done.')
+
+    def _get_installed_version(self):
+        """Return current version of schema or None if not any found.
+        """
+        query = """
+        SELECT tablename
+          FROM pg_tables
+         WHERE tablename IN ('access_control_entries', 'metadata');
+        """
+        with self.client.connect() as conn:
+            result = conn.execute(query)
+            tables = set([r['tablename'] for r in result.fetchall()])
+
+        if 'access_control_entries' not in tables:
+            return
+        if 'metadata' not in tables:
+            # In the first versions of Cliquet, there was no migration.
+            return 1
+
+        query = """
+        SELECT value AS version
+          FROM metadata
+         WHERE name = 'permission_schema_version'
+         ORDER BY LPAD(value, 3, '0') DESC;
+        """
+        with self.client.connect() as conn:
+            result = conn.execute(query)
+            if result.rowcount > 0:
+                return int(result.fetchone()['version'])
+        # The metadata table may be shared with (and flushed by) the storage
+        # backend. Since migrations can be run again, start from the first.
+        return 1
 
     def flush(self):
         query = """
@@ -172,25 +240,40 @@ class Permission(PermissionBase):
         if not perms:
             return set()
 
-        perms_values = ','.join(["('%s', '%s')" % p for p in perms])
         query = """
         WITH required_perms AS (
-          VALUES %s
+          SELECT *
+            FROM unnest((:object_ids)::TEXT[], (:permissions)::TEXT[])
+              AS required(object_id, permission)
         )
         SELECT principal
-          FROM required_perms JOIN access_control_entries
-            ON (object_id = column1 AND permission = column2);
-        """ % perms_values
+          FROM required_perms JOIN access_control_entries AS aces
+            ON (aces.object_id = required_perms.object_id
+                AND aces.permission = required_perms.permission);
+        """
+        placeholders = _perms_placeholders(perms)
         with self.client.connect(readonly=True) as conn:
-            result = conn.execute(query)
+            result = conn.execute(query, placeholders)
             results = result.fetchall()
         return set([r['principal'] for r in results])
 
     def principals_accessible_objects(self, principals, permission,
                                       object_id_match=None,
                                       get_bound_permissions=None):
-        placeholders = {'permission': permission}
-
+        accessible = self.accessible_objects(
+            principals, permission, object_id_match=object_id_match,
+            get_bound_permissions=get_bound_permissions)
+        return accessible.fetch()
+
+    def accessible_objects(self, principals, permission,
+                           object_id_match=None, get_bound_permissions=None):
+        """Same as :meth:`principals_accessible_objects`, but the objects
+        are not fetched.
+
+        :returns: the objects to be looked up, usable as a sub-query of
+            the storage backend queries when it uses the same database.
+        :rtype: :class:`AccessibleObjects`
+        """
         if object_id_match is None:
             object_id_match = '*'
 
@@ -199,35 +282,8 @@ class Permission(PermissionBase):
         else:
             perms = get_bound_permissions(object_id_match, permission)
 
-        perms = [(o.replace('*', '.*'), p) for (o, p) in perms
-                 if o.endswith(object_id_match)]
-        perms_values = ','.join(["('%s', '%s')" % p for p in perms])
-        principals_values = ','.join(["('%s')" % p for p in principals])
-        query = """
-        WITH required_perms AS (
-          VALUES %(perms)s
-        ),
-        user_principals AS (
-          VALUES %(principals)s
-        ),
-        potential_objects AS (
-          SELECT object_id, required_perms.column1 AS pattern
-            FROM access_control_entries
-            JOIN user_principals
-              ON (principal = user_principals.column1)
-            JOIN required_perms
-              ON (permission = required_perms.column2)
-        )
-        SELECT object_id
-          FROM potential_objects
-         WHERE object_id ~ pattern;
-        """ % dict(perms=perms_values,
-                   principals=principals_values)
-
-        with self.client.connect(readonly=True) as conn:
-            result = conn.execute(query, placeholders)
-            results = result.fetchall()
-        return set([r['object_id'] for r in results])
+        perms = [(o, p) for (o, p) in perms if o.endswith(object_id_match)]
+        return AccessibleObjects(self.client, principals, perms)
 
     def check_permission(self, object_id, permission, principals,
                          get_bound_permissions=None):
@@ -239,27 +295,23 @@ class Permission(PermissionBase):
         if not perms:
             return False
 
-        perms_values = ','.join(["('%s', '%s')" % p for p in perms])
-        principals_values = ','.join(["('%s')" % p for p in principals])
         query = """
         WITH required_perms AS (
-          VALUES %(perms)s
-        ),
-        allowed_principals AS (
-          SELECT principal
-            FROM required_perms JOIN access_control_entries
-              ON (object_id = column1 AND permission = column2)
-        ),
-        required_principals AS (
-          VALUES %(principals)s
+          SELECT *
+            FROM unnest((:object_ids)::TEXT[], (:permissions)::TEXT[])
+              AS required(object_id, permission)
         )
         SELECT COUNT(*) AS matched
-          FROM required_principals JOIN allowed_principals
-            ON (required_principals.column1 = principal);
-        """ % dict(perms=perms_values, principals=principals_values)
+          FROM required_perms JOIN access_control_entries AS aces
+            ON (aces.object_id = required_perms.object_id
+                AND aces.permission = required_perms.permission)
+         WHERE principal = ANY((:principals)::TEXT[]);
+        """
+        placeholders = _perms_placeholders(perms)
+        placeholders['principals'] = list(principals)
 
         with self.client.connect(readonly=True) as conn:
-            result = conn.execute(query)
+            result = conn.execute(query, placeholders)
             total = result.fetchone()
         return total['matched'] > 0
 
@@ -286,43 +338,95 @@ class Permission(PermissionBase):
         if not permissions:
             return
 
+        specified_perms = []
+        new_perms = []
+        for perm, principals in permissions.items():
+            specified_perms.append(perm)
+            new_perms.extend([(perm, principal)
+                              for principal in set(principals)])
+
         placeholders = {
-            'object_id': object_id
+            'object_id': object_id,
+            'specified_perms': specified_perms,
+            'permissions': [perm for (perm, principal) in new_perms],
+            'principals': [principal for (perm, principal) in new_perms]
         }
 
-        new_perms = []
-        specified_perms = []
-        for i, (perm, principals) in enumerate(permissions.items()):
-            placeholders['perm_%s' % i] = perm
-            specified_perms.append("(:perm_%s)" % i)
-            for principal in set(principals):
-                j = len(new_perms)
-                placeholders['principal_%s' % j] = principal
-                new_perms.append("(:perm_%s, :principal_%s)" % (i, j))
-
         delete_query = """
-        WITH specified_perms AS (
-          VALUES %(specified_perms)s
-        )
         DELETE FROM access_control_entries
-         USING specified_perms
-         WHERE object_id = :object_id AND permission = column1
-        """ % dict(specified_perms=','.join(specified_perms))
+         WHERE object_id = :object_id
+           AND permission = ANY((:specified_perms)::TEXT[]);
+        """
 
         insert_query = """
-        WITH new_aces AS (
-          VALUES %(new_perms)s
-        )
         INSERT INTO access_control_entries(object_id, permission, principal)
-          SELECT :object_id, column1, column2
-            FROM new_aces;
-        """ % dict(new_perms=','.join(new_perms))
+          SELECT :object_id, permission, principal
+            FROM unnest((:permissions)::TEXT[], (:principals)::TEXT[])
+              AS new_aces(permission, principal);
+        """
 
         with self.client.connect() as conn:
             conn.execute(delete_query, placeholders)
             if new_perms:
                 conn.execute(insert_query, placeholders)
 
+    def set_object_permissions(self, object_id, permissions, owner=None):
+        new_perms = []
+        for perm, principals in permissions.items():
+            new_perms.extend([(perm, principal)
+                              for principal in set(principals)])
+
+        placeholders = {
+            'object_id': object_id,
+            'owner': owner,
+            'specified_perms': list(permissions.keys()),
+            'permissions': [perm for (perm, principal) in new_perms],
+            'principals': [principal for (perm, principal) in new_perms]
+        }
+
+        # Sub-statements see the entries as they were before the query: the
+        # resulting ones are obtained from the current and the new ones.
+        query = """
+        WITH new_aces AS (
+          SELECT permission, principal
+            FROM unnest((:permissions)::TEXT[], (:principals)::TEXT[])
+              AS new_aces(permission, principal)
+           UNION
+          SELECT 'write', (:owner)::TEXT
+           WHERE (:owner)::TEXT IS NOT NULL
+        ),
+        current_aces AS (
+          SELECT permission, principal
+            FROM access_control_entries
+           WHERE object_id = :object_id
+        ),
+        deleted AS (
+          DELETE FROM access_control_entries
+           WHERE object_id = :object_id
+             AND permission = ANY((:specified_perms)::TEXT[])
+             AND (permission, principal) NOT IN (SELECT * FROM new_aces)
+        ),
+        inserted AS (
+          INSERT INTO access_control_entries (object_id, permission, principal)
+          SELECT :object_id, permission, principal
+            FROM new_aces
+           WHERE (permission, principal) NOT IN (SELECT * FROM current_aces)
+        )
+        SELECT permission, principal
+          FROM current_aces
+         WHERE permission != ALL((:specified_perms)::TEXT[])
+         UNION
+        SELECT permission, principal
+          FROM new_aces;
+        """
+        with self.client.connect() as conn:
+            result = conn.execute(query, placeholders)
+            results = result.fetchall()
+        permissions = defaultdict(set)
+        for r in results:
+            permissions[r['permission']].add(r['principal'])
+        return permissions
+
     def delete_object_permissions(self, *object_id_list):
         if len(object_id_list) == 0:
             return
@@ -334,6 +438,117 @@ class Permission(PermissionBase):
             conn.execute(query, dict(object_id_list=tuple(object_id_list)))
 
 
+class AccessibleObjects(SubQuery):
+    """Objects accessible by principals, as looked up by PostgreSQL.
+
+    As the value of a storage filter, the last segment of the objects ids
+    (i.e. records ids, like in
+    :meth:`cliquet.authorization.RouteFactory.extract_object_id`) are
+    matched using a semi-join with the permission tables, instead of being
+    fetched first.
+    """
+    def __init__(self, client, principals, perms):
+        self.client = client
+        self.principals = principals
+        self.perms = perms
+
+    def _query(self, prefix=''):
+        # Object ids are looked up in the range of their pattern prefix, using
+        # the ``text_pattern_ops`` index, before being matched. ``OFFSET 0``
+        # makes sure the range of each pattern is looked up separately.
+        query = """
+        WITH required_perms AS (
+          SELECT *
+            FROM unnest((:%(prefix)sobject_ids)::TEXT[],
+                        (:%(prefix)spermissions)::TEXT[],
+                        (:%(prefix)slower_bounds)::TEXT[],
+                        (:%(prefix)supper_bounds)::TEXT[])
+              AS required(pattern, permission, lower_bound, upper_bound)
+        )
+        SELECT object_id
+          FROM required_perms,
+       LATERAL (
+          SELECT object_id
+            FROM access_control_entries AS aces
+           WHERE aces.object_id ~>=~ required_perms.lower_bound
+             AND aces.object_id ~<~ required_perms.upper_bound
+             AND aces.object_id LIKE required_perms.pattern
+             AND aces.permission = required_perms.permission
+             AND aces.principal = ANY((:%(prefix)sprincipals)::TEXT[])
+          OFFSET 0
+       ) AS matching
+        """
+        bounds = [_pattern_bounds(o) for (o, p) in self.perms]
+        perms = [(_like_pattern(o), p) for (o, p) in self.perms]
+        placeholders = _perms_placeholders(perms)
+        placeholders['principals'] = list(self.principals)
+        placeholders['lower_bounds'] = [lower for (lower, upper) in bounds]
+        placeholders['upper_bounds'] = [upper for (lower, upper) in bounds]
+
+        placeholders = dict([(prefix + name, value)
+                             for name, value in placeholders.items()])
+        return query % dict(prefix=prefix), placeholders
+
+    def fetch(self):
+        """:returns: the set of accessible objects ids."""
+        query, placeholders = self._query()
+        with self.client.connect(readonly=True) as conn:
+            result = conn.execute(query, placeholders)
+            results = result.fetchall()
+        return set([r['object_id'] for r in results])
+
+    def exists(self):
+        """:returns: ``True`` if at least one object is accessible."""
+        query, placeholders = self._query()
+        query = "SELECT EXISTS (%s) AS found;" % query
+        with self.client.connect(readonly=True) as conn:
+            result = conn.execute(query, placeholders)
+            return result.fetchone()['found']
+
+    def format(self, prefix):
+        query, placeholders = self._query(prefix)
+        query = ("SELECT substring(object_id FROM '[^/]*$') "
+                 "FROM (%s) AS accessible" % query)
+        return query, placeholders
+
+
+def _perms_placeholders(perms):
+    """Split the list of ``(object_id, permission)`` tuples into two arrays,
+    so that queries texts do not depend on the number of permissions.
+    """
+    return {
+        'object_ids': [object_id for (object_id, permission) in perms],
+        'permissions': [permission for (object_id, permission) in perms]
+    }
+
+
+# Greatest unicode character, for the upper bound of patterns without prefix.
+_MAX_CHARACTER = u'\U0010ffff'
+
+
+def _like_pattern(object_id_match):
+    """Convert the ``*`` wildcards of `object_id_match` into a ``LIKE``
+    pattern, where other characters are matched literally.
+    """
+    escaped = object_id_match.replace('\\', '\\\\')
+    escaped = escaped.replace('%', '\\%').replace('_', '\\_')
+    return escaped.replace('*', '%')
+
+
+def _pattern_bounds(object_id_match):
+    """Obtain the range of object ids starting with the prefix of
+    `object_id_match` (i.e. before the first wildcard).
+
+    :returns: a tuple with the inclusive lower bound and the exclusive upper
+        bound.
+    """
+    prefix = object_id_match.split('*', 1)[0]
+    if not prefix:
+        return (u'', _MAX_CHARACTER)
+    following = six.unichr(ord(prefix[-1]) + 1)
+    return (prefix, prefix[:-1] + following)
+
+
 def load_from_config(config):
     client = create_from_config(config, prefix='permission_')
     return Permission(client=client)
@@ -0,0 +1,33 @@
+--
+-- Automated script, we do not need NOTICE and WARNING
+--
+SET client_min_messages TO ERROR;
+
+-- Superseded by the primary key and the composite index.
+DROP INDEX IF EXISTS idx_access_control_entries_object_id;
+DROP INDEX IF EXISTS idx_access_control_entries_permission;
+DROP INDEX IF EXISTS idx_access_control_entries_object_id_pattern;
+
+DO $$
+BEGIN
+
+  IF NOT EXISTS (
+    SELECT 1 FROM pg_indexes
+       WHERE indexname = 'idx_access_control_entries_permission_object_id_principal'
+       AND tablename = 'access_control_entries'
+  ) THEN
+  CREATE INDEX idx_access_control_entries_permission_object_id_principal
+    ON access_control_entries(permission, object_id text_pattern_ops,
+                              principal);
+  END IF;
+
+END$$;
+
+-- The metadata table can be shared with the storage backend.
+CREATE TABLE IF NOT EXISTS metadata (
+    name VARCHAR(128) NOT NULL,
+    value VARCHAR(512) NOT NULL
+);
+
+-- Bump permission schema version.
+INSERT INTO metadata (name, value) VALUES ('permission_schema_version', '2');
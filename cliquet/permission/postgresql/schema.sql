@@ -10,6 +10,10 @@ CREATE TABLE IF NOT EXISTS user_principals (
     PRIMARY KEY (user_id, principal)
 );
 
+--
+-- The primary key also covers the lookups of principals by object id and
+-- permission (e.g. permission checks).
+--
 CREATE TABLE IF NOT EXISTS access_control_entries (
     object_id TEXT,
     permission TEXT,
@@ -18,37 +22,24 @@ CREATE TABLE IF NOT EXISTS access_control_entries (
     PRIMARY KEY (object_id, permission, principal)
 );
 
---
--- CREATE INDEX IF NOT EXISTS will be available in PostgreSQL 9.5
--- http://www.postgresql.org/docs/9.5/static/sql-createindex.html
-DO $$
-BEGIN
-
-  IF NOT EXISTS (
-    SELECT 1 FROM pg_indexes
-       WHERE indexname = 'idx_access_control_entries_object_id'
-       AND tablename = 'access_control_entries'
-  ) THEN
-  CREATE INDEX idx_access_control_entries_object_id
-    ON access_control_entries(object_id);
-  END IF;
-
-  IF NOT EXISTS (
-    SELECT 1 FROM pg_indexes
-       WHERE indexname = 'idx_access_control_entries_permission'
-       AND tablename = 'access_control_entries'
-  ) THEN
-  CREATE INDEX idx_access_control_entries_permission
-    ON access_control_entries(permission);
-  END IF;
-
-  IF NOT EXISTS (
-    SELECT 1 FROM pg_indexes
-       WHERE indexname = 'idx_access_control_entries_principal'
-       AND tablename = 'access_control_entries'
-  ) THEN
-  CREATE INDEX idx_access_control_entries_principal
+CREATE INDEX idx_access_control_entries_principal
     ON access_control_entries(principal);
-  END IF;
 
-END$$;
+--
+-- Lookups of objects by permission and object id prefix (e.g.
+-- ``LIKE '/buckets/%'``), comparing object ids byte-wise whatever the
+-- collation of the database, and filtering principals from the index.
+--
+CREATE INDEX idx_access_control_entries_permission_object_id_principal
+    ON access_control_entries(permission, object_id text_pattern_ops,
+                              principal);
+
+
+CREATE TABLE IF NOT EXISTS metadata (
+    name VARCHAR(128) NOT NULL,
+    value VARCHAR(512) NOT NULL
+);
+
+-- Set permission schema version.
+-- Should match ``cliquet.permission.postgresql.Permission.schema_version``
+INSERT INTO metadata (name, value) VALUES ('permission_schema_version', '2');
@@ -1,11 +1,121 @@
 from __future__ import absolute_import
 
+import re
 from collections import defaultdict
 
+from cliquet import logger
 from cliquet.permission import PermissionBase
 from cliquet.storage.redis import create_from_config, wrap_redis_error
 
 
+# Set once every entry is indexed.
+_INDEXED_KEY = 'permissions.indexed'
+
+# Flag the Access Control Entries (``KEYS``) having any of the principals
+# (``ARGV``) as member, without transferring their members.
+MATCHING_ACES_SCRIPT = """
+local matching = {}
+for i, key in ipairs(KEYS) do
+    matching[i] = 0
+    for _, principal in ipairs(ARGV) do
+        if redis.call('SISMEMBER', key, principal) == 1 then
+            matching[i] = 1
+            break
+        end
+    end
+end
+return matching
+"""
+
+# Access Control Entries helpers. Like in the storage backend scripts, keys
+# are built server-side: the principals of each entry, the objects ids of each
+# principal (sorted lexicographically) and the permissions of each object.
+ACES_FUNCTIONS = """
+local function ace_key(object_id, permission)
+    return 'permission:' .. object_id .. ':' .. permission
+end
+
+local function objects_key(principal, permission)
+    return 'principal:' .. principal .. ':' .. permission
+end
+
+local function permissions_key(object_id)
+    return 'object:' .. object_id .. ':permissions'
+end
+
+local function add_principal(object_id, permission, principal)
+    redis.call('SADD', ace_key(object_id, permission), principal)
+    redis.call('ZADD', objects_key(principal, permission), 0, object_id)
+    redis.call('SADD', permissions_key(object_id), permission)
+end
+
+local function replace_principals(object_id, permission, principals)
+    local key = ace_key(object_id, permission)
+    for _, principal in ipairs(redis.call('SMEMBERS', key)) do
+        redis.call('ZREM', objects_key(principal, permission), object_id)
+    end
+    redis.call('DEL', key)
+    redis.call('SREM', permissions_key(object_id), permission)
+    for _, principal in ipairs(principals) do
+        add_principal(object_id, permission, principal)
+    end
+end
+
+-- Replace the permissions listed in ``ARGV`` from index ``start``: for each
+-- permission, its name, the number of principals and the principals.
+local function replace_permissions(object_id, start)
+    local i = start
+    while i <= #ARGV do
+        local count = tonumber(ARGV[i + 1])
+        replace_principals(object_id, ARGV[i],
+                           {unpack(ARGV, i + 2, i + 1 + count)})
+        i = i + 2 + count
+    end
+end
+
+local function object_permissions(object_id)
+    local permissions = {}
+    for _, permission in ipairs(redis.call('SMEMBERS',
+                                           permissions_key(object_id))) do
+        local principals = redis.call('SMEMBERS',
+                                      ace_key(object_id, permission))
+        if #principals > 0 then
+            table.insert(permissions, {permission, principals})
+        end
+    end
+    return permissions
+end
+"""
+
+OBJECT_PERMISSIONS_SCRIPT = ACES_FUNCTIONS + """
+return object_permissions(ARGV[1])
+"""
+
+REPLACE_PERMISSIONS_SCRIPT = ACES_FUNCTIONS + """
+replace_permissions(ARGV[1], 2)
+"""
+
+# The owner (``ARGV[2]``) is empty if not specified.
+SET_PERMISSIONS_SCRIPT = ACES_FUNCTIONS + """
+local object_id, owner = ARGV[1], ARGV[2]
+replace_permissions(object_id, 3)
+if owner ~= '' then
+    add_principal(object_id, 'write', owner)
+end
+return object_permissions(object_id)
+"""
+
+DELETE_PERMISSIONS_SCRIPT = ACES_FUNCTIONS + """
+for _, object_id in ipairs(ARGV) do
+    for _, permission in ipairs(redis.call('SMEMBERS',
+                                           permissions_key(object_id))) do
+        replace_principals(object_id, permission, {})
+    end
+    redis.call('DEL', permissions_key(object_id))
+end
+"""
+
+
 class Permission(PermissionBase):
     """Permission backend implementation using Redis.
 
@@ -21,20 +131,91 @@ class Permission(PermissionBase):
 
         cliquet.permission_pool_size = 50
 
+    .. note::
+
+        The objects of each principal and the permissions of each object are
+        indexed, in order to look them up without scanning the whole
+        database. The entries stored by previous versions are indexed when
+        ``cliquet migrate`` is run. Until then, the database is scanned
+        like before.
+
     :noindex:
     """
 
     def __init__(self, client, *args, **kwargs):
         super(Permission, self).__init__(*args, **kwargs)
         self._client = client
+        self._indexed = False
+        self._index_checked = False
+        self._matching_aces_script = client.register_script(
+            MATCHING_ACES_SCRIPT)
+        self._object_permissions_script = client.register_script(
+            OBJECT_PERMISSIONS_SCRIPT)
+        self._replace_permissions_script = client.register_script(
+            REPLACE_PERMISSIONS_SCRIPT)
+        self._set_permissions_script = client.register_script(
+            SET_PERMISSIONS_SCRIPT)
+        self._delete_permissions_script = client.register_script(
+            DELETE_PERMISSIONS_SCRIPT)
 
     @property
     def settings(self):
         return dict(self._client.connection_pool.connection_kwargs)
 
     def initialize_schema(self):
-        # Nothing to do.
-        pass
+        # Index the entries stored by previous versions.
+        keys = self._client.scan_iter(match='permission:*', count=1000)
+        batch = []
+        for key in keys:
+            batch.append(key.decode('utf-8'))
+            if len(batch) == 1000:
+                self._reindex(batch)
+                batch = []
+        self._reindex(batch)
+        self._client.set(_INDEXED_KEY, '1')
+        self._indexed = True
+
+    def _is_indexed(self):
+        """Whether every entry is indexed, i.e. the entries stored by previous
+        versions were indexed by ``cliquet migrate``, or there was none.
+        """
+        if self._indexed:
+            return True
+        if self._client.exists(_INDEXED_KEY):
+            self._indexed = True
+        elif not self._index_checked:
+            # The database is only looked up once for entries.
+            self._index_checked = True
+            if next(self._client.scan_iter(match='permission:*', count=1000),
+                    None) is None:
+                self._client.set(_INDEXED_KEY, '1')
+                self._indexed = True
+            else:
+                logger.warning('Permission entries are not indexed. Run the '
+                               '``cliquet migrate`` command.')
+        return self._indexed
+
+    def _reindex(self, keys):
+        """Add the objects of Access Control Entries `keys` to the sets of
+        objects ids of their principals, and their permissions to the sets of
+        permissions of their objects.
+        """
+        if not keys:
+            return
+        with self._client.pipeline(transaction=False) as pipe:
+            for key in keys:
+                pipe.smembers(key)
+            results = pipe.execute()
+        with self._client.pipeline(transaction=False) as pipe:
+            for key, principals in zip(keys, results):
+                object_id, permission = _parse_key(key)
+                pipe.sadd(_permissions_key(object_id), permission)
+                for principal in self._decode_set(principals):
+                    pipe.execute_command('ZADD',
+                                         _objects_key(principal, permission),
+                                         0, object_id)
+            pipe.execute()
+        logger.info('Indexed %s permission entries' % len(keys))
 
     def _decode_set(self, results):
         return set([r.decode('utf-8') for r in results])
@@ -70,14 +251,23 @@ class Permission(PermissionBase):
     @wrap_redis_error
     def add_principal_to_ace(self, object_id, permission, principal):
         permission_key = 'permission:%s:%s' % (object_id, permission)
-        self._client.sadd(permission_key, principal)
+        with self._client.pipeline() as multi:
+            multi.sadd(permission_key, principal)
+            multi.execute_command('ZADD',
+                                  _objects_key(principal, permission),
+                                  0, object_id)
+            multi.sadd(_permissions_key(object_id), permission)
+            multi.execute()
 
     @wrap_redis_error
     def remove_principal_from_ace(self, object_id, permission, principal):
         permission_key = 'permission:%s:%s' % (object_id, permission)
-        self._client.srem(permission_key, principal)
-        if self._client.scard(permission_key) == 0:
-            self._client.delete(permission_key)
+        # Empty sets are deleted by Redis. Permissions without principal are
+        # ignored in the sets of permissions of objects.
+        with self._client.pipeline() as multi:
+            multi.srem(permission_key, principal)
+            multi.zrem(_objects_key(principal, permission), object_id)
+            multi.execute()
 
     @wrap_redis_error
     def object_permission_principals(self, object_id, permission):
@@ -96,21 +286,57 @@ class Permission(PermissionBase):
             def get_bound_permissions(object_id, permission):
                 return [(object_id, permission)]
 
-        keys = get_bound_permissions(object_id_match, permission)
-        keys = ['permission:%s:%s' % key for key in keys
-                if key[0].endswith(object_id_match)]
-        principals = set(principals)
-        objects = set()
-        for key_pattern in keys:
-            matched = self._client.scan_iter(match=key_pattern)
-            for key in matched:
-                authorized = self._decode_set(self._client.smembers(key))
-                if len(authorized & principals) > 0:
-                    object_id = key.decode('utf-8').split(':')[1]
-                    objects.add(object_id)
+        perms = [(o, p) for (o, p) in get_bound_permissions(object_id_match,
+                                                            permission)
+                 if o.endswith(object_id_match)]
+
+        if not self._is_indexed():
+            return self._scan_accessible_objects(principals, perms)
+
+        # Only the objects of the principals are looked up, in the range of
+        # the pattern prefix.
+        queries = []
+        with self._client.pipeline(transaction=False) as pipe:
+            for pattern, perm in perms:
+                lower, upper = _lex_range(pattern)
+                for principal in principals:
+                    pipe.zrangebylex(_objects_key(principal, perm),
+                                     lower, upper)
+                    queries.append(pattern)
+            results = pipe.execute()
 
+        objects = set()
+        for pattern, object_ids in zip(queries, results):
+            regexp = _pattern_regexp(pattern)
+            objects.update([o for o in self._decode_set(object_ids)
+                            if regexp.match(o)])
         return objects
 
+    def _scan_accessible_objects(self, principals, perms):
+        """Look up the objects of entries matching `perms` in the whole
+        database, for entries that may not be indexed.
+        """
+        keys = []
+        for pattern, perm in perms:
+            match = 'permission:%s:%s' % (pattern, _escape_pattern(perm))
+            matched = self._client.scan_iter(match=match, count=1000)
+            keys.extend([key.decode('utf-8') for key in matched])
+        matching = self._matching_aces(keys, principals)
+        return set([_parse_key(key)[0]
+                    for key, match in zip(keys, matching) if match])
+
+    def _matching_aces(self, keys, principals):
+        """Check in a single round trip if any of the `principals` is member
+        of each ACE of `keys`.
+
+        :returns: a list of booleans, in the order of `keys`.
+        """
+        principals = list(principals)
+        if not keys or not principals:
+            return [False] * len(keys)
+        matching = self._matching_aces_script(keys=keys, args=principals)
+        return [bool(m) for m in matching]
+
     @wrap_redis_error
     def object_permission_authorized_principals(self, object_id, permission,
                                                 get_bound_permissions=None):
@@ -124,15 +350,27 @@ class Permission(PermissionBase):
             return self._decode_set(self._client.sunion(*list(keys)))
         return set()
 
+    @wrap_redis_error
+    def check_permission(self, object_id, permission, principals,
+                         get_bound_permissions=None):
+        if get_bound_permissions is None:
+            def get_bound_permissions(object_id, permission):
+                return [(object_id, permission)]
+
+        keys = get_bound_permissions(object_id, permission)
+        keys = ['permission:%s:%s' % key for key in keys]
+        return any(self._matching_aces(keys, principals))
+
     @wrap_redis_error
     def object_permissions(self, object_id, permissions=None):
-        if permissions is not None:
-            keys = ['permission:%s:%s' % (object_id, permission)
-                    for permission in permissions]
-        else:
-            keys = [key.decode('utf-8') for key in self._client.scan_iter(
-                match='permission:%s:*' % object_id)]
+        if permissions is None:
+            if not self._is_indexed():
+                return self._scan_object_permissions(object_id)
+            results = self._object_permissions_script(args=[object_id])
+            return self._decode_permissions(results)
 
+        keys = ['permission:%s:%s' % (object_id, permission)
+                for permission in permissions]
         with self._client.pipeline() as pipe:
             for permission_key in keys:
                 pipe.smembers(permission_key)
@@ -146,28 +384,115 @@ class Permission(PermissionBase):
 
         return permissions
 
+    def _scan_object_permissions(self, object_id):
+        """Look up the permissions of `object_id` in the whole database, for
+        entries that may not be indexed.
+        """
+        pattern = 'permission:%s:*' % _escape_pattern(object_id)
+        keys = [key.decode('utf-8')
+                for key in self._client.scan_iter(match=pattern, count=1000)]
+        permissions = {_parse_key(key)[1]: principals
+                       for key, principals in zip(keys, self._smembers(keys))
+                       if principals}
+        return defaultdict(set, permissions)
+
+    def _smembers(self, keys):
+        with self._client.pipeline(transaction=False) as pipe:
+            for key in keys:
+                pipe.smembers(key)
+            results = pipe.execute()
+        return [self._decode_set(result) for result in results]
+
+    def _decode_permissions(self, results):
+        permissions = defaultdict(set)
+        for permission, principals in results:
+            permission = permission.decode('utf-8')
+            permissions[permission] = self._decode_set(principals)
+        return permissions
+
     @wrap_redis_error
     def replace_object_permissions(self, object_id, permissions):
-        keys = ['permission:%s:%s' % (object_id, permission)
-                for permission in permissions]
-        with self._client.pipeline() as pipe:
-            for key in keys:
-                pipe.delete(key)
-                permission = key.split(':', 2)[-1]
-                principals = permissions[permission]
-                if len(principals) > 0:
-                    pipe.sadd(key, *principals)
-            pipe.execute()
+        args = [object_id] + _permissions_args(permissions)
+        self._replace_permissions_script(args=args)
+
+    @wrap_redis_error
+    def set_object_permissions(self, object_id, permissions, owner=None):
+        args = [object_id, owner or ''] + _permissions_args(permissions)
+        results = self._set_permissions_script(args=args)
+        if not self._is_indexed():
+            return self._scan_object_permissions(object_id)
+        return self._decode_permissions(results)
 
     @wrap_redis_error
     def delete_object_permissions(self, *object_id_list):
-        with self._client.pipeline() as pipe:
+        if len(object_id_list) == 0:
+            return
+        if not self._is_indexed():
+            # The entries of previous versions are not in the sets of
+            # permissions of objects.
             for object_id in object_id_list:
-                keys = list(self._client.scan_iter(
-                    match='permission:%s:*' % object_id))
-                if len(keys) > 0:
-                    pipe.delete(*keys)
-            pipe.execute()
+                permissions = self._scan_object_permissions(object_id)
+                self.replace_object_permissions(
+                    object_id, {perm: [] for perm in permissions})
+        self._delete_permissions_script(args=list(object_id_list))
+
+
+def _permissions_args(permissions):
+    """Flatten the principals of `permissions`, as expected by the
+    ``replace_permissions()`` Lua function.
+    """
+    args = []
+    for permission, principals in permissions.items():
+        principals = set(principals)
+        args.extend([permission, len(principals)])
+        args.extend(principals)
+    return args
+
+
+def _parse_key(permission_key):
+    """Obtain the object id and the permission of an Access Control Entry
+    key.
+    """
+    object_id, permission = permission_key.rsplit(':', 1)
+    return object_id[len('permission:'):], permission
+
+
+def _objects_key(principal, permission):
+    """Key of the objects ids on which `principal` has `permission`, sorted
+    lexicographically.
+    """
+    return 'principal:%s:%s' % (principal, permission)
+
+
+def _permissions_key(object_id):
+    """Key of the permissions of `object_id`.
+    """
+    return 'object:%s:permissions' % object_id
+
+
+def _escape_pattern(value):
+    """Escape the wildcards of ``SCAN`` patterns in `value`.
+    """
+    return re.sub(r'([*?\[\]\\])', r'\\\1', value)
+
+
+def _lex_range(pattern):
+    """Obtain the ``ZRANGEBYLEX`` range of the object ids starting with the
+    prefix of `pattern` (i.e. before the first wildcard).
+    """
+    prefix = pattern.split('*', 1)[0]
+    if not prefix:
+        return ('-', '+')
+    prefix = prefix.encode('utf-8')
+    # No UTF-8 encoded character contains the ``0xff`` byte.
+    return (b'[' + prefix, b'[' + prefix + b'\xff')
+
+
+def _pattern_regexp(pattern):
+    """Compile `pattern`, where ``*`` is the only wildcard.
+    """
+    parts = [re.escape(part) for part in pattern.split('*')]
+    return re.compile('^' + '.*'.join(parts) + '$', re.DOTALL)
 
 
 def load_from_config(config):
@@ -1,5 +1,8 @@
 import re
 import functools
+import itertools
+import tempfile
+import uuid
 import warnings
 
 import colander
@@ -7,6 +10,8 @@ import venusian
 import six
 from pyramid import exceptions as pyramid_exceptions
 from pyramid.decorator import reify
+from pyramid.response import FileIter
+from pyramid.settings import asbool
 from pyramid.httpexceptions import (HTTPNotModified, HTTPPreconditionFailed,
                                     HTTPNotFound, HTTPConflict,
                                     HTTPServiceUnavailable)
@@ -18,7 +23,7 @@ from cliquet.events import ACTIONS
 from cliquet.storage import exceptions as storage_exceptions, Filter, Sort
 from cliquet.utils import (
     COMPARISON, classname, native_value, decode64, encode64, json,
-    encode_header, decode_header, DeprecatedMeta, dict_subset
+    json_serializer, encode_header, decode_header, DeprecatedMeta, dict_subset
 )
 
 from .model import Model, ShareableModel
@@ -26,6 +31,63 @@ from .schema import ResourceSchema
 from .viewset import ViewSet, ShareableViewSet
 
 
+STREAMING_SPOOL_SIZE = 1024 * 1024
+"""Size (*in bytes*) above which streamed collections bodies are written on
+disk (see ``stream_collections`` setting)."""
+
+
+STREAMING_CHUNK_SIZE = 1000
+"""Number of records notified (or deleted) at once by streamed collections."""
+
+
+def _iter_chunks(records, size):
+    """Iterate on lists of at most `size` records."""
+    records = iter(records)
+    while True:
+        chunk = list(itertools.islice(records, size))
+        if not chunk:
+            break
+        yield chunk
+
+
+def _iter_body(before, body_file, after):
+    """Iterate on the response body blocks, and close the temporary file
+    once the response is sent."""
+    try:
+        yield before
+        for block in FileIter(body_file):
+            yield block
+        yield after
+    finally:
+        body_file.close()
+
+
+class DeferredCreations(object):
+    """Records of ``POST`` requests on the same collection, created at once
+    with :meth:`cliquet.resource.Model.create_records` when :meth:`flush` is
+    called (e.g. consecutive subrequests of a batch).
+
+    Requests are processed as usual (validation, permissions, hooks), except
+    that their responses bodies are rendered once the records are created.
+    They must have the same path and headers: records are created with the
+    model of the first request.
+    """
+    def __init__(self):
+        self._pending = []
+
+    def add(self, resource, record):
+        self._pending.append((resource, record))
+
+    def flush(self):
+        pending, self._pending = self._pending, []
+        if not pending:
+            return
+        model = pending[0][0].model
+        created = model.create_records([record for _, record in pending])
+        for (resource, _), record in zip(pending, created):
+            resource._render_created(record)
+
+
 def register(depth=1, **kwargs):
     """Ressource class decorator.
 
@@ -149,7 +211,9 @@ class UserResource(object):
             id_generator=request.registry.id_generator,
             collection_id=classname(self),
             parent_id=parent_id,
-            auth=auth)
+            auth=auth,
+            timestamps=request.bound_data.setdefault(
+                'collection_timestamps', {}))
 
         self.request = request
         self.context = context
@@ -164,8 +228,19 @@ class UserResource(object):
     def timestamp(self):
         """Return the current collection timestamp.
 
+        The value is shared by the resources of the current request (e.g.
+        batch subrequests), until records of the collection are written
+        through the model.
+
         :rtype: int
         """
+        timestamps = self.model.timestamps
+        cache_key = (self.model.collection_id, self.model.parent_id)
+        if cache_key not in timestamps:
+            timestamps[cache_key] = self._fetch_timestamp()
+        return timestamps[cache_key]
+
+    def _fetch_timestamp(self):
         try:
             return self.model.timestamp()
         except storage_exceptions.BackendError as e:
@@ -253,22 +328,50 @@ class UserResource(object):
         filter_fields = [f.field for f in filters]
         include_deleted = self.model.modified_field in filter_fields
 
-        pagination_rules, offset = self._extract_pagination_rules_from_token(
-            limit, sorting)
-
-        records, total_records = self.model.get_records(
+        pagination_rules, offset, total_records = (
+            self._extract_pagination_rules_from_token(limit, sorting))
+
+        settings = self.request.registry.settings
+        if not limit and asbool(settings['stream_collections']):
+            # Like rendered collections, streamed ones are capped by the
+            # storage safety limit.
+            max_fetch_size = int(settings['storage_max_fetch_size'])
+            records = self.model.iter_records(
+                filters=filters,
+                sorting=sorting,
+                pagination_rules=pagination_rules,
+                limit=max_fetch_size,
+                include_deleted=include_deleted)
+            chunks = _iter_chunks(records, STREAMING_CHUNK_SIZE)
+            return self._stream_records(chunks,
+                                        partial_fields=partial_fields,
+                                        limit=max_fetch_size,
+                                        filters=filters,
+                                        sorting=sorting,
+                                        include_deleted=include_deleted)
+
+        # When following a pagination token, the total was already counted
+        # on the first page: only fetch the page.
+        count_total = total_records is None
+
+        records, count = self.model.get_records(
             filters=filters,
             sorting=sorting,
             limit=limit,
             pagination_rules=pagination_rules,
-            include_deleted=include_deleted)
+            include_deleted=include_deleted,
+            count_total=count_total)
+
+        if count_total:
+            total_records = count
 
         offset = offset + len(records)
         next_page = None
 
         if limit and len(records) == limit and offset < total_records:
             lastrecord = records[-1]
-            next_page = self._next_page_url(sorting, limit, lastrecord, offset)
+            next_page = self._next_page_url(sorting, limit, lastrecord, offset,
+                                            total_records)
             headers['Next-Page'] = encode_header(next_page)
 
         if partial_fields:
@@ -314,8 +417,18 @@ class UserResource(object):
         self._raise_412_if_modified(record=existing)
 
         new_record = self.process_record(new_record)
+        unique_fields = self.mapping.get_option('unique_fields')
+
+        deferred = getattr(self.request, 'deferred_creations', None)
+        if (isinstance(deferred, DeferredCreations) and
+                self._can_defer_creation(new_record, unique_fields)):
+            # The record is created along others, and the response body is
+            # rendered once it is (see :class:`DeferredCreations`).
+            deferred.add(self, new_record)
+            self.request.response.status_code = 201
+            return self.request.response
+
         try:
-            unique_fields = self.mapping.get_option('unique_fields')
             record = self.model.create_record(new_record,
                                               unique_fields=unique_fields)
             self.request.response.status_code = 201
@@ -341,6 +454,12 @@ class UserResource(object):
         self._raise_412_if_modified()
 
         filters = self._extract_filters()
+
+        settings = self.request.registry.settings
+        if asbool(settings['stream_collections']):
+            deleted = self._delete_records_by_chunks(filters)
+            return self._stream_records(deleted, action=ACTIONS.DELETE)
+
         deleted = self.model.delete_records(filters=filters)
 
         action = len(deleted) > 0 and ACTIONS.DELETE or ACTIONS.READ
@@ -362,6 +481,13 @@ class UserResource(object):
             in the iterim.
         """
         self._raise_400_if_invalid_id(self.record_id)
+        if self.request.headers.get('If-None-Match'):
+            # Conditional requests (e.g. polling clients) are mostly answered
+            # with ``304 Not Modified``: read the record data only if needed.
+            timestamp = self._get_record_timestamp_or_404(self.record_id)
+            minimal = {self.model.modified_field: timestamp}
+            self._raise_304_if_not_modified(minimal)
+
         record = self._get_record_or_404(self.record_id)
         timestamp = record[self.model.modified_field]
         self._add_timestamp_header(self.request.response, timestamp=timestamp)
@@ -662,6 +788,119 @@ class UserResource(object):
     # Internals
     #
 
+    def _stream_records(self, chunks, action=ACTIONS.READ,
+                        partial_fields=None, limit=None, filters=None,
+                        sorting=None, include_deleted=False):
+        """Encode the records one by one in the response body, as they are
+        fetched from storage.
+
+        Each chunk of records is post-processed like a rendered collection
+        (i.e. its records are notified along the previous ones), and then
+        written in a temporary file, which is kept in memory until it
+        exceeds :data:`STREAMING_SPOOL_SIZE` bytes.
+
+        If the read records reach the `limit` they were fetched with, the
+        total of records matching `filters` is counted, and a link to the
+        next ones is given, like for a paginated collection.
+
+        :param chunks: an iterator on lists of records.
+        :returns: the current response.
+        """
+        response = self.request.response
+
+        spool_size = STREAMING_SPOOL_SIZE
+        body_file = tempfile.SpooledTemporaryFile(max_size=spool_size)
+        nb_records = 0
+        total_records = 0
+        body = None
+        last_record = None
+        for chunk in chunks:
+            last_record = chunk[-1]
+            total_records += len([r for r in chunk
+                                  if not r.get(self.model.deleted_field)])
+            if partial_fields:
+                chunk = [dict_subset(r, partial_fields) for r in chunk]
+            body = self.postprocess(chunk, action=action)
+            for record in chunk:
+                encoded = json_serializer(record).encode('utf-8')
+                body_file.write(b',' + encoded if nb_records else encoded)
+                nb_records += 1
+
+        if body is None:
+            # Nothing was read or changed.
+            body = self.postprocess([], action=ACTIONS.READ)
+
+        if action == ACTIONS.READ:
+            # Bind metric about response size.
+            logger.bind(nb_records=nb_records, limit=None)
+            if limit and nb_records == limit:
+                # Records were truncated by the storage safety limit.
+                _, total_records = self.model.get_records(
+                    filters=filters,
+                    limit=1,
+                    include_deleted=include_deleted)
+                if nb_records < total_records:
+                    next_page = self._next_page_url(sorting, limit,
+                                                    last_record, nb_records,
+                                                    total_records)
+                    headers = response.headers
+                    headers['Next-Page'] = encode_header(next_page)
+            total_header = encode_header('%s' % total_records)
+            response.headers['Total-Records'] = total_header
+
+        # Render the body around the list of records, e.g. including
+        # attributes added by ``postprocess()``.
+        placeholder = uuid.uuid4().hex
+        body['data'] = placeholder
+        before, after = json_serializer(body).split('"%s"' % placeholder)
+        before = before.encode('utf-8') + b'['
+        after = b']' + after.encode('utf-8')
+
+        response.content_type = 'application/json'
+        response.content_length = len(before) + body_file.tell() + len(after)
+        body_file.seek(0)
+        response.app_iter = _iter_body(before, body_file, after)
+        return response
+
+    def _delete_records_by_chunks(self, filters):
+        """Delete the records matching `filters` by chunks.
+
+        Only the ids of the matching records are kept in memory: they are
+        all read before deleting anything, since the deletions may close
+        the connection of the storage iterator (e.g. when transactions are
+        committed manually).
+
+        :returns: an iterator on the lists of deleted records.
+        """
+        id_field = self.model.id_field
+        records = self.model.iter_records(filters=filters)
+        all_ids = [record[id_field] for record in records]
+        for ids in _iter_chunks(all_ids, STREAMING_CHUNK_SIZE):
+            chunk_filters = (filters or []) + [
+                Filter(id_field, ids, COMPARISON.IN)]
+            deleted = self.model.delete_records(filters=chunk_filters)
+            if deleted:
+                yield deleted
+
+    def _can_defer_creation(self, record, unique_fields):
+        """Records can be created along others if they do not depend on
+        existing ones, and if the model creates them as usual.
+        """
+        if unique_fields or self.model.id_field in record:
+            return False
+        create_record = type(self.model).create_record
+        return create_record in (Model.create_record,
+                                 ShareableModel.create_record)
+
+    def _render_created(self, record):
+        """Render the response of a deferred creation (see
+        :class:`DeferredCreations`)."""
+        body = self.postprocess(record, action=ACTIONS.CREATE)
+        response = self.request.response
+        response.content_type = 'application/json'
+        response.body = json_serializer(body).encode('utf-8')
+        return response
+
     def _get_record_or_404(self, record_id):
         """Retrieve record from storage and raise ``404 Not found`` if missing.
 
@@ -679,6 +918,25 @@ class UserResource(object):
                                   errno=ERRORS.INVALID_RESOURCE_ID)
             raise response
 
+    def _get_record_timestamp_or_404(self, record_id):
+        """Retrieve record timestamp from storage, without its data, and
+        raise ``404 Not found`` if missing.
+
+        :raises: :exc:`~pyramid:pyramid.httpexceptions.HTTPNotFound` if
+            the record is not found.
+        """
+        if self.context and self.context.current_record:
+            # Set during authorization. Save a storage hit.
+            record = self.context.current_record
+            return record[self.model.modified_field]
+
+        try:
+            return self.model.get_record_timestamp(record_id)
+        except storage_exceptions.RecordNotFoundError:
+            response = http_error(HTTPNotFound(),
+                                  errno=ERRORS.INVALID_RESOURCE_ID)
+            raise response
+
     def _add_timestamp_header(self, response, timestamp=None):
         """Add current timestamp in response headers, when request comes in.
 
@@ -758,7 +1016,7 @@ class UserResource(object):
         if record:
             current_timestamp = record[self.model.modified_field]
         else:
-            current_timestamp = self.model.timestamp()
+            current_timestamp = self.timestamp
 
         if current_timestamp <= modified_since:
             response = HTTPNotModified()
@@ -805,7 +1063,7 @@ class UserResource(object):
         if record:
             current_timestamp = record[self.model.modified_field]
         else:
-            current_timestamp = self.model.timestamp()
+            current_timestamp = self.timestamp
 
         if current_timestamp > modified_since:
             error_msg = 'Resource was modified meanwhile'
@@ -1026,11 +1284,18 @@ class UserResource(object):
         return self._build_pagination_rules(next_sorting, last_record, rules)
 
     def _extract_pagination_rules_from_token(self, limit, sorting):
-        """Get pagination params."""
+        """Get pagination params.
+
+        :returns: the pagination rules, the current offset and the total
+            number of records counted on the first page (``None`` if
+            unknown).
+        :rtype: tuple
+        """
         queryparams = self.request.GET
         token = queryparams.get('_token', None)
         filters = []
         offset = 0
+        total_records = None
         if token:
             try:
                 tokeninfo = json.loads(decode64(token))
@@ -1038,6 +1303,11 @@ class UserResource(object):
                     raise ValueError()
                 last_record = tokeninfo['last_record']
                 offset = tokeninfo['offset']
+                # Tokens emitted by previous versions have no total.
+                total_records = tokeninfo.get('total_records')
+                if total_records is not None and \
+                   not isinstance(total_records, six.integer_types):
+                    raise ValueError()
             except (ValueError, KeyError, TypeError):
                 error_msg = '_token has invalid content'
                 error_details = {
@@ -1047,11 +1317,13 @@ class UserResource(object):
                 raise_invalid(self.request, **error_details)
 
             filters = self._build_pagination_rules(sorting, last_record)
-        return filters, offset
+        return filters, offset, total_records
 
-    def _next_page_url(self, sorting, limit, last_record, offset):
+    def _next_page_url(self, sorting, limit, last_record, offset,
+                       total_records=None):
         """Build the Next-Page header from where we stopped."""
-        token = self._build_pagination_token(sorting, last_record, offset)
+        token = self._build_pagination_token(sorting, last_record, offset,
+                                             total_records)
 
         params = self.request.GET.copy()
         params['_limit'] = limit
@@ -1062,17 +1334,23 @@ class UserResource(object):
                                                **self.request.matchdict)
         return next_page_url
 
-    def _build_pagination_token(self, sorting, last_record, offset):
+    def _build_pagination_token(self, sorting, last_record, offset,
+                                total_records=None):
         """Build a pagination token.
 
         It is a base64 JSON object with the sorting fields values of
         the last_record.
 
+        The total number of records is kept, in order to avoid counting
+        the whole result set again when following the next pages.
+
         """
         token = {
             'last_record': {},
             'offset': offset
         }
+        if total_records is not None:
+            token['total_records'] = total_records
 
         for field, _ in sorting:
             token['last_record'][field] = last_record[field]
@@ -1127,7 +1405,8 @@ class ShareableResource(UserResource):
         """
         filters = super(ShareableResource, self)._extract_filters(queryparams)
 
-        ids = self.context.shared_ids
+        # Shared records may be joined by the storage backend.
+        ids = self.context.shared_objects or self.context.shared_ids
         if ids:
             filter_by_id = Filter(self.model.id_field, ids, COMPARISON.IN)
             filters.insert(0, filter_by_id)
@@ -25,7 +25,7 @@ class Model(object):
     """Name of `deleted` field in deleted records"""
 
     def __init__(self, storage, id_generator=None, collection_id='',
-                 parent_id='', auth=None):
+                 parent_id='', auth=None, timestamps=None):
         """
         :param storage: an instance of storage
         :type storage: :class:`cliquet.storage.Storage`
@@ -34,12 +34,16 @@ class Model(object):
 
         :param str collection_id: the collection id
         :param str parent_id: the default parent id
+        :param dict timestamps: collections timestamps cached by the caller
+            (e.g. for the current request), by collection and parent ids.
+            Entries are removed when records are written through the model.
         """
         self.storage = storage
         self.id_generator = id_generator
         self.parent_id = parent_id
         self.collection_id = collection_id
         self.auth = auth
+        self.timestamps = timestamps if timestamps is not None else {}
 
     def timestamp(self, parent_id=None):
         """Fetch the collection current timestamp.
@@ -53,8 +57,21 @@ class Model(object):
             parent_id=parent_id,
             auth=self.auth)
 
+    def _drop_timestamp(self, parent_id):
+        """Remove the cached timestamp of the collection, before writing
+        records of this `parent_id`.
+        """
+        if parent_id and '*' in parent_id:
+            # Records of several parents may be written.
+            for key in [k for k in self.timestamps
+                        if k[0] == self.collection_id]:
+                del self.timestamps[key]
+        else:
+            self.timestamps.pop((self.collection_id, parent_id), None)
+
     def get_records(self, filters=None, sorting=None, pagination_rules=None,
-                    limit=None, include_deleted=False, parent_id=None):
+                    limit=None, include_deleted=False, parent_id=None,
+                    count_total=True):
         """Fetch the collection records.
 
         Override to post-process records after feching them from storage.
@@ -85,8 +102,12 @@ class Model(object):
 
         :param str parent_id: optional filter for parent id
 
+        :param bool count_total: Optionnally skip the count of records
+            in the result set.
+
         :returns: A tuple with the list of records in the current page,
-            the total number of records in the result set.
+            the total number of records in the result set (``None`` if
+            `count_total` is ``False``).
         :rtype: tuple
         """
         parent_id = parent_id or self.parent_id
@@ -101,9 +122,35 @@ class Model(object):
             id_field=self.id_field,
             modified_field=self.modified_field,
             deleted_field=self.deleted_field,
-            auth=self.auth)
+            auth=self.auth,
+            count_total=count_total)
         return records, total_records
 
+    def iter_records(self, filters=None, sorting=None, pagination_rules=None,
+                     limit=None, include_deleted=False, parent_id=None):
+        """Iterate on the collection records, as they are fetched from
+        storage.
+
+        Override to post-process records after feching them from storage.
+
+        Parameters are the same as :meth:`get_records`.
+
+        :returns: an iterator on all records of the collection.
+        """
+        parent_id = parent_id or self.parent_id
+        return self.storage.iter_all(
+            collection_id=self.collection_id,
+            parent_id=parent_id,
+            filters=filters,
+            sorting=sorting,
+            pagination_rules=pagination_rules,
+            limit=limit,
+            include_deleted=include_deleted,
+            id_field=self.id_field,
+            modified_field=self.modified_field,
+            deleted_field=self.deleted_field,
+            auth=self.auth)
+
     def delete_records(self, filters=None, parent_id=None):
         """Delete multiple collection records.
 
@@ -120,6 +167,7 @@ class Model(object):
         :returns: The list of deleted records from storage.
         """
         parent_id = parent_id or self.parent_id
+        self._drop_timestamp(parent_id)
         return self.storage.delete_all(collection_id=self.collection_id,
                                        parent_id=parent_id,
                                        filters=filters,
@@ -145,6 +193,25 @@ class Model(object):
                                 modified_field=self.modified_field,
                                 auth=self.auth)
 
+    def get_record_timestamp(self, record_id, parent_id=None):
+        """Fetch the timestamp of the current view related record, without
+        its data.
+
+        :param str record_id: record identifier
+        :param str parent_id: optional filter for parent id
+
+        :returns: the record timestamp from storage
+        :rtype: integer
+        """
+        parent_id = parent_id or self.parent_id
+        return self.storage.object_timestamp(
+            collection_id=self.collection_id,
+            parent_id=parent_id,
+            object_id=record_id,
+            id_field=self.id_field,
+            modified_field=self.modified_field,
+            auth=self.auth)
+
     def create_record(self, record, parent_id=None, unique_fields=None):
         """Create a record in the collection.
 
@@ -167,6 +234,7 @@ class Model(object):
         :rtype: dict
         """
         parent_id = parent_id or self.parent_id
+        self._drop_timestamp(parent_id)
         return self.storage.create(collection_id=self.collection_id,
                                    parent_id=parent_id,
                                    record=record,
@@ -176,6 +244,28 @@ class Model(object):
                                    modified_field=self.modified_field,
                                    auth=self.auth)
 
+    def create_records(self, records, parent_id=None):
+        """Create several records in the collection at once (e.g. from
+        consecutive requests of a batch).
+
+        Unlike :meth:`create_record`, unicity of fields is not checked.
+
+        :param list records: records to store
+        :param str parent_id: optional filter for parent id
+
+        :returns: the newly created records, in the same order.
+        :rtype: list of dict
+        """
+        parent_id = parent_id or self.parent_id
+        self._drop_timestamp(parent_id)
+        return self.storage.create_many(collection_id=self.collection_id,
+                                        parent_id=parent_id,
+                                        records=records,
+                                        id_generator=self.id_generator,
+                                        id_field=self.id_field,
+                                        modified_field=self.modified_field,
+                                        auth=self.auth)
+
     def update_record(self, record, parent_id=None, unique_fields=None):
         """Update a record in the collection.
 
@@ -199,6 +289,7 @@ class Model(object):
         :rtype: dict
         """
         parent_id = parent_id or self.parent_id
+        self._drop_timestamp(parent_id)
         record_id = record[self.id_field]
         return self.storage.update(collection_id=self.collection_id,
                                    parent_id=parent_id,
@@ -230,6 +321,7 @@ class Model(object):
         :rtype: dict
         """
         parent_id = parent_id or self.parent_id
+        self._drop_timestamp(parent_id)
         record_id = record[self.id_field]
         return self.storage.delete(collection_id=self.collection_id,
                                    parent_id=parent_id,
@@ -255,13 +347,6 @@ class ShareableModel(Model):
         # Current user main principal.
         self.current_principal = None
 
-    def _allow_write(self, perm_object_id):
-        """Helper to give the ``write`` permission to the current user.
-        """
-        self.permission.add_principal_to_ace(perm_object_id,
-                                             'write',
-                                             self.current_principal)
-
     def delete_records(self, filters=None, parent_id=None):
         """Delete permissions when collection records are deleted in bulk.
         """
@@ -294,14 +379,34 @@ class ShareableModel(Model):
                                                            unique_fields)
         record_id = record[self.id_field]
         perm_object_id = self.get_permission_object_id(record_id)
-        self.permission.replace_object_permissions(perm_object_id, permissions)
-        self._allow_write(perm_object_id)
-        permissions = self.permission.object_permissions(perm_object_id)
+        permissions = self.permission.set_object_permissions(
+            perm_object_id, permissions, owner=self.current_principal)
 
         annotated = record.copy()
         annotated[self.permissions_field] = permissions
         return annotated
 
+    def create_records(self, records, parent_id=None):
+        """Create records and set their specified permissions.
+
+        The current principal is added to the owners (``write`` permission).
+        """
+        permissions = [record.pop(self.permissions_field, {})
+                       for record in records]
+        records = super(ShareableModel, self).create_records(records,
+                                                             parent_id)
+        annotated = []
+        for record, record_permissions in zip(records, permissions):
+            perm_object_id = self.get_permission_object_id(
+                record[self.id_field])
+            record_permissions = self.permission.set_object_permissions(
+                perm_object_id, record_permissions,
+                owner=self.current_principal)
+            record = record.copy()
+            record[self.permissions_field] = record_permissions
+            annotated.append(record)
+        return annotated
+
     def update_record(self, record, parent_id=None, unique_fields=None):
         """Update record and the specified permissions.
 
@@ -316,9 +421,8 @@ class ShareableModel(Model):
                                                            unique_fields)
         record_id = record[self.id_field]
         perm_object_id = self.get_permission_object_id(record_id)
-        self.permission.replace_object_permissions(perm_object_id, permissions)
-        self._allow_write(perm_object_id)
-        permissions = self.permission.object_permissions(perm_object_id)
+        permissions = self.permission.set_object_permissions(
+            perm_object_id, permissions, owner=self.current_principal)
 
         annotated = record.copy()
         annotated[self.permissions_field] = permissions
@@ -47,6 +47,14 @@ class ResourceSchema(colander.MappingSchema):
                 class Options:
                     preserve_unknown = True
         """
+
+        indexed_fields = tuple()
+        """Fields that are frequently used for filtering or sorting the
+        collection. When supported by the storage backend, dedicated
+        indices are created (and maintained) by the ``cliquet migrate``
+        command.
+        """
+
     def get_option(self, attr):
         default_value = getattr(ResourceSchema.Options, attr)
         return getattr(self.Options, attr,  default_value)
@@ -69,6 +77,37 @@ class ResourceSchema(colander.MappingSchema):
         return colander.Mapping(unknown=unknown)
 
 
+class StaticSchemaMixin(object):
+    """Mixin for schemas that skips their binding if there is nothing to
+    resolve.
+
+    Cornice binds the schema to each request, which clones every node of
+    the schema, even when none of them has deferred values or
+    ``after_bind`` callbacks.
+
+    .. note::
+
+        Nodes are then shared between requests: their ``deserialize()``
+        methods must not alter them.
+    """
+    def bind(self, **kw):
+        static = self.__dict__.get('_static')
+        if static is None:
+            static = self._static = _is_static(self)
+        if static:
+            return self
+        return super(StaticSchemaMixin, self).bind(**kw)
+
+
+def _is_static(node):
+    if getattr(node, 'after_bind', None) is not None:
+        return False
+    for name in dir(node):
+        if isinstance(getattr(node, name, None), colander.deferred):
+            return False
+    return all(_is_static(child) for child in node.children)
+
+
 class PermissionsSchema(colander.SchemaNode):
     """A permission mapping defines ACEs.
 
@@ -97,18 +136,18 @@ class PermissionsSchema(colander.SchemaNode):
         if permissions in (colander.null, colander.drop):
             return permissions
 
-        # Remove potential extra children from previous deserialization.
-        self.children = []
+        # Work on a copy, since the schema can be shared between requests.
+        node = self.clone()
         for perm in permissions.keys():
             # If know permissions is limited, then validate inline.
             if self.known_perms:
                 colander.OneOf(choices=self.known_perms)(self, perm)
 
             # Add a String list child node with the name of ``perm``.
-            self.add(self._get_node_principals(perm))
+            node.add(self._get_node_principals(perm))
 
         # End up by deserializing a mapping whose keys are now known.
-        return super(PermissionsSchema, self).deserialize(permissions)
+        return super(PermissionsSchema, node).deserialize(permissions)
 
     def _get_node_principals(self, perm):
         principal = colander.SchemaNode(colander.String())
@@ -5,7 +5,7 @@ import six
 from pyramid.settings import asbool
 
 from cliquet import authorization
-from cliquet.resource.schema import PermissionsSchema
+from cliquet.resource.schema import PermissionsSchema, StaticSchemaMixin
 from cliquet.utils import DeprecatedMeta
 
 CONTENT_TYPES = ["application/json"]
@@ -121,7 +121,7 @@ class ViewSet(object):
             except colander.Invalid:
                 pass
 
-        class PayloadSchema(colander.MappingSchema):
+        class PayloadSchema(StaticSchemaMixin, colander.MappingSchema):
             data = record_mapping
 
             def schema_type(self, **kw):
@@ -32,6 +32,33 @@ def init_schema(env):
             else:
                 getattr(registry, backend).initialize_schema()
 
+    if hasattr(registry, 'storage') and not readonly_mode:
+        update_field_indices(registry)
+
+
+def purge_cache(env):
+    registry = env['registry']
+    if hasattr(registry, 'cache'):
+        registry.cache.purge_expired()
+
+
+def update_field_indices(registry):
+    """Index the fields declared in the ``indexed_fields`` option of the
+    registered resources schemas.
+    """
+    resources = set([getattr(service, 'resource', None)
+                     for service in registry.cornice_services.values()])
+    resources.discard(None)
+
+    for resource in resources:
+        model = resource.default_model
+        fields = resource.mapping.get_option('indexed_fields')
+        registry.storage.update_field_indices(
+            collection_id=resource.__name__.lower(),
+            fields=fields,
+            id_field=model.id_field,
+            modified_field=model.modified_field)
+
 
 def main():
     description = """\
@@ -54,6 +81,8 @@ def main():
     parser_deprecated_init.set_defaults(func=deprecated_init)
     parser_init_schema = subparsers.add_parser('migrate')
     parser_init_schema.set_defaults(func=init_schema)
+    parser_purge_cache = subparsers.add_parser('purge-cache')
+    parser_purge_cache.set_defaults(func=purge_cache)
 
     args = parser.parse_args(sys.argv[1:])
 
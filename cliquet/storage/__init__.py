@@ -37,6 +37,12 @@ class StorageBase(object):
 
     id_generator = generators.UUID4()
 
+    #: Name of the id field of stored objects, when not specified.
+    id_field = DEFAULT_ID_FIELD
+
+    #: Name of the timestamp field of stored objects, when not specified.
+    modified_field = DEFAULT_MODIFIED_FIELD
+
     def initialize_schema(self):
         """Create every necessary objects (like tables or indices) in the
         backend.
@@ -50,6 +56,27 @@ class StorageBase(object):
         """
         raise NotImplementedError
 
+    def update_field_indices(self, collection_id, fields,
+                             id_field=DEFAULT_ID_FIELD,
+                             modified_field=DEFAULT_MODIFIED_FIELD):
+        """Create the necessary objects in the backend to speed up filtering
+        and sorting on the specified fields of the objects in this
+        `collection_id`. Those previously created for other fields are
+        removed.
+
+        This is executed when the ``cliquet migrate`` command is ran, with the
+        fields declared in the ``indexed_fields`` option of resources schemas.
+
+        .. note::
+
+            Backends that do not support indexing ignore it.
+
+        :param str collection_id: the collection id.
+        :param fields: the list of fields to index.
+        :type fields: list of str
+        """
+        pass
+
     def collection_timestamp(self, collection_id, parent_id, auth=None):
         """Get the highest timestamp of every objects in this `collection_id` for
         this `parent_id`.
@@ -109,6 +136,33 @@ class StorageBase(object):
         """
         raise NotImplementedError
 
+    def object_timestamp(self, collection_id, parent_id, object_id,
+                         id_field=DEFAULT_ID_FIELD,
+                         modified_field=DEFAULT_MODIFIED_FIELD,
+                         auth=None):
+        """Retrieve the timestamp of the object with specified `object_id`,
+        or raise error if not found (e.g. to answer conditional requests
+        without reading the object data).
+
+        By default, the whole object is retrieved. Backends can override it
+        to read the timestamp only.
+
+        :raises: :exc:`cliquet.storage.exceptions.RecordNotFoundError`
+
+        :param str collection_id: the collection id.
+        :param str parent_id: the collection parent.
+
+        :param str object_id: unique identifier of the object
+
+        :returns: the timestamp of the object.
+        :rtype: int
+        """
+        existing = self.get(collection_id, parent_id, object_id,
+                            id_field=id_field,
+                            modified_field=modified_field,
+                            auth=auth)
+        return existing[modified_field]
+
     def update(self, collection_id, parent_id, object_id, object,
                unique_fields=None, id_field=DEFAULT_ID_FIELD,
                modified_field=DEFAULT_MODIFIED_FIELD,
@@ -183,6 +237,97 @@ class StorageBase(object):
         """
         raise NotImplementedError
 
+    def create_many(self, collection_id, parent_id, records,
+                    id_generator=None, unique_fields=None,
+                    id_field=DEFAULT_ID_FIELD,
+                    modified_field=DEFAULT_MODIFIED_FIELD,
+                    auth=None):
+        """Create the specified `records` in this `collection_id` for this
+        `parent_id` (see :meth:`cliquet.storage.StorageBase.create`).
+
+        By default, objects are created one by one. Backends can override it
+        to create them in a single operation.
+
+        :raises: :exc:`cliquet.storage.exceptions.UnicityError`
+
+        :param str collection_id: the collection id.
+        :param str parent_id: the collection parent.
+
+        :param records: the objects to create.
+        :type records: list of dict
+
+        :returns: the newly created objects, in the same order.
+        :rtype: list of dict
+        """
+        return [self.create(collection_id, parent_id, obj,
+                            id_generator=id_generator,
+                            unique_fields=unique_fields,
+                            id_field=id_field,
+                            modified_field=modified_field,
+                            auth=auth)
+                for obj in records]
+
+    def update_many(self, collection_id, parent_id, records,
+                    unique_fields=None, id_field=DEFAULT_ID_FIELD,
+                    modified_field=DEFAULT_MODIFIED_FIELD,
+                    auth=None):
+        """Overwrite the specified `records`, identified by their
+        :attr:`cliquet.resource.Model.id_field` attribute (see
+        :meth:`cliquet.storage.StorageBase.update`).
+
+        By default, objects are updated one by one. Backends can override it
+        to update them in a single operation.
+
+        :raises: :exc:`cliquet.storage.exceptions.UnicityError`
+
+        :param str collection_id: the collection id.
+        :param str parent_id: the collection parent.
+
+        :param records: the objects to update or create.
+        :type records: list of dict
+
+        :returns: the updated objects, in the same order.
+        :rtype: list of dict
+        """
+        return [self.update(collection_id, parent_id, obj[id_field], obj,
+                            unique_fields=unique_fields,
+                            id_field=id_field,
+                            modified_field=modified_field,
+                            auth=auth)
+                for obj in records]
+
+    def delete_many(self, collection_id, parent_id, object_ids,
+                    with_deleted=True, id_field=DEFAULT_ID_FIELD,
+                    modified_field=DEFAULT_MODIFIED_FIELD,
+                    deleted_field=DEFAULT_DELETED_FIELD,
+                    auth=None):
+        """Delete the objects with specified `object_ids`, and raise error
+        if one of them is not found (see
+        :meth:`cliquet.storage.StorageBase.delete`).
+
+        By default, objects are deleted one by one. Backends can override it
+        to delete them in a single operation.
+
+        :raises: :exc:`cliquet.storage.exceptions.RecordNotFoundError`
+
+        :param str collection_id: the collection id.
+        :param str parent_id: the collection parent.
+
+        :param object_ids: unique identifiers of the objects
+        :type object_ids: list of str
+        :param bool with_deleted: track deleted records with a tombstone
+
+        :returns: the deleted objects, with minimal set of attributes.
+        :rtype: list of dict
+        """
+        return [self.delete(collection_id, parent_id, object_id,
+                            with_deleted=with_deleted,
+                            id_field=id_field,
+                            modified_field=modified_field,
+                            deleted_field=deleted_field,
+                            auth=auth)
+                for object_id in object_ids]
+
     def purge_deleted(self, collection_id, parent_id, before=None,
                       id_field=DEFAULT_ID_FIELD,
                       modified_field=DEFAULT_MODIFIED_FIELD,
@@ -206,7 +351,7 @@ class StorageBase(object):
                 id_field=DEFAULT_ID_FIELD,
                 modified_field=DEFAULT_MODIFIED_FIELD,
                 deleted_field=DEFAULT_DELETED_FIELD,
-                auth=None):
+                auth=None, count_total=True):
         """Retrieve all objects in this `collection_id` for this `parent_id`.
 
         :param str collection_id: the collection id.
@@ -236,12 +381,43 @@ class StorageBase(object):
         :param bool include_deleted: Optionnally include the deleted objects
             that match the filters.
 
+        :param bool count_total: Optionnally skip the count of matching
+            objects (e.g. when following a pagination token).
+
         :returns: the limited list of objects, and the total number of
-            matching objects in the collection (deleted ones excluded).
+            matching objects in the collection (deleted ones excluded), or
+            ``None`` if `count_total` is ``False``.
         :rtype: tuple (list, integer)
         """
         raise NotImplementedError
 
+    def iter_all(self, collection_id, parent_id, filters=None, sorting=None,
+                 pagination_rules=None, limit=None, include_deleted=False,
+                 id_field=DEFAULT_ID_FIELD,
+                 modified_field=DEFAULT_MODIFIED_FIELD,
+                 deleted_field=DEFAULT_DELETED_FIELD,
+                 auth=None):
+        """Iterate on all objects in this `collection_id` for this
+        `parent_id`, as they are fetched from the backend.
+
+        Parameters are the same as :meth:`get_all`. Matching objects are not
+        counted, and backends do not limit their number.
+
+        By default, the objects are obtained with :meth:`get_all`.
+
+        :returns: an iterator on the objects.
+        """
+        objects, _ = self.get_all(collection_id, parent_id, filters=filters,
+                                  sorting=sorting,
+                                  pagination_rules=pagination_rules,
+                                  limit=limit,
+                                  include_deleted=include_deleted,
+                                  id_field=id_field,
+                                  modified_field=modified_field,
+                                  deleted_field=deleted_field,
+                                  auth=auth, count_total=False)
+        return iter(objects)
+
 
 def heartbeat(backend):
     def ping(request):
@@ -33,12 +33,11 @@ class MemoryBasedStorage(StorageBase):
                                       id_field=id_field,
                                       modified_field=modified_field,
                                       deleted_field=deleted_field)
-        deleted = [self.delete(collection_id, parent_id, r[id_field],
-                               id_field=id_field, with_deleted=with_deleted,
-                               modified_field=modified_field,
-                               deleted_field=deleted_field)
-                   for r in records]
-        return deleted
+        object_ids = [r[id_field] for r in records]
+        return self.delete_many(collection_id, parent_id, object_ids,
+                                id_field=id_field, with_deleted=with_deleted,
+                                modified_field=modified_field,
+                                deleted_field=deleted_field)
 
     def strip_deleted_record(self, resource, parent_id, record,
                              id_field=DEFAULT_ID_FIELD,
@@ -184,33 +183,9 @@ class Storage(MemoryBasedStorage):
             the time will slide into the future. It is not problematic since
             the timestamp notion is opaque, and behaves like a revision number.
         """
-        # XXX factorize code from memory and redis backends.
-        is_specified = (record is not None and
-                        modified_field in record or
-                        last_modified is not None)
-        if is_specified:
-            # If there is a timestamp in the new record, try to use it.
-            if last_modified is not None:
-                current = last_modified
-            else:
-                current = record[modified_field]
-        else:
-            # Otherwise, use a new one.
-            current = utils.msec_time()
-
-        # Bump the timestamp only if it's more than the previous one.
         previous = self._timestamps[collection_id].get(parent_id)
-        if previous and previous >= current:
-            collection_timestamp = previous + 1
-        else:
-            collection_timestamp = current
-
-        # In case the timestamp was specified, the collection timestamp will
-        # be different from the updated timestamp. As such, we want to return
-        # the one of the record, and not the collection one.
-        if not is_specified:
-            current = collection_timestamp
-
+        current, collection_timestamp = bump_timestamp(
+            previous, record, modified_field, last_modified=last_modified)
         self._timestamps[collection_id][parent_id] = collection_timestamp
         return current
 
@@ -299,7 +274,7 @@ class Storage(MemoryBasedStorage):
                 id_field=DEFAULT_ID_FIELD,
                 modified_field=DEFAULT_MODIFIED_FIELD,
                 deleted_field=DEFAULT_DELETED_FIELD,
-                auth=None):
+                auth=None, count_total=True):
         records = list(self._store[collection_id][parent_id].values())
 
         deleted = []
@@ -312,9 +287,48 @@ class Storage(MemoryBasedStorage):
                                                  id_field, deleted_field,
                                                  pagination_rules, limit)
 
+        if not count_total:
+            count = None
+
         return records, count
 
 
+def bump_timestamp(previous, record=None, modified_field=None,
+                   last_modified=None):
+    """Compute the timestamp of the `record` and the new timestamp of its
+    collection, given the `previous` one.
+
+    :returns: the record timestamp, and the collection timestamp.
+    :rtype: tuple
+    """
+    is_specified = (record is not None and
+                    modified_field in record or
+                    last_modified is not None)
+    if is_specified:
+        # If there is a timestamp in the new record, try to use it.
+        if last_modified is not None:
+            current = last_modified
+        else:
+            current = record[modified_field]
+    else:
+        # Otherwise, use a new one.
+        current = utils.msec_time()
+
+    # Bump the timestamp only if it's more than the previous one.
+    if previous and previous >= current:
+        collection_timestamp = previous + 1
+    else:
+        collection_timestamp = current
+
+    # In case the timestamp was specified, the collection timestamp will
+    # be different from the updated timestamp. As such, we want to return
+    # the one of the record, and not the collection one.
+    if not is_specified:
+        current = collection_timestamp
+
+    return current, collection_timestamp
+
+
 def get_unicity_rules(collection_id, parent_id, record, unique_fields,
                       id_field, for_creation):
     """Build filter to target existing records that violate the resource
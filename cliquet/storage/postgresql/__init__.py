@@ -1,3 +1,4 @@
+import hashlib
 import os
 import warnings
 from collections import defaultdict
@@ -9,7 +10,27 @@ from cliquet.storage import (
     StorageBase, exceptions, Filter,
     DEFAULT_ID_FIELD, DEFAULT_MODIFIED_FIELD, DEFAULT_DELETED_FIELD)
 from cliquet.storage.postgresql.client import create_from_config
-from cliquet.utils import COMPARISON, json
+from cliquet.utils import COMPARISON, json, sqlalchemy
+
+
+class SubQuery(object):
+    """Value of a filter which is looked up by PostgreSQL with a sub-query,
+    instead of being sent as a list of values (e.g.
+    :class:`cliquet.permission.postgresql.AccessibleObjects`).
+
+    Only relevant if the sub-query tables are in the database of the
+    storage backend.
+    """
+    def format(self, prefix):
+        """Format the sub-query in SQL, with placeholders for safe escaping.
+
+        :param str prefix: prefix of placeholders names, to avoid conflicts
+            with those of the enclosing query.
+        :returns: A SQL string with placeholders, and a dict mapping
+            placeholders to actual values.
+        :rtype: tuple
+        """
+        raise NotImplementedError
 
 
 class Storage(StorageBase):
@@ -66,12 +87,14 @@ class Storage(StorageBase):
 
     """  # NOQA
 
-    schema_version = 11
+    schema_version = 12
 
-    def __init__(self, client, max_fetch_size, *args, **kwargs):
+    def __init__(self, client, max_fetch_size, itersize=1000, *args,
+                 **kwargs):
         super(Storage, self).__init__(*args, **kwargs)
         self.client = client
         self._max_fetch_size = max_fetch_size
+        self._itersize = itersize
 
     def _execute_sql_file(self, filepath):
         here = os.path.abspath(os.path.dirname(__file__))
@@ -146,13 +169,20 @@ class Storage(StorageBase):
     def _get_installed_version(self):
         """Return current version of schema or None if not any found.
         """
-        query = "SELECT tablename FROM pg_tables WHERE tablename = 'metadata';"
+        # The metadata table may have been created by the permission backend.
+        query = """
+        SELECT to_regclass('records') IS NOT NULL AS records,
+               to_regclass('metadata') IS NOT NULL AS metadata;
+        """
         with self.client.connect() as conn:
             result = conn.execute(query)
-            tables_exist = result.rowcount > 0
+            tables = result.fetchone()
 
-        if not tables_exist:
+        if not tables['records']:
             return
+        if not tables['metadata']:
+            # In the first versions of Cliquet, there was no migration.
+            return 1
 
         query = """
         SELECT value AS version
@@ -165,8 +195,13 @@ class Storage(StorageBase):
             if result.rowcount > 0:
                 return int(result.fetchone()['version'])
             else:
-                # Guess current version.
-                query = "SELECT COUNT(*) FROM metadata;"
+                # Guess current version (the metadata table may be shared
+                # with the permission backend).
+                query = """
+                SELECT COUNT(*)
+                  FROM metadata
+                 WHERE name != 'permission_schema_version';
+                """
                 result = conn.execute(query)
                 was_flushed = int(result.fetchone()[0]) == 0
                 if was_flushed:
@@ -191,12 +226,85 @@ class Storage(StorageBase):
             conn.execute(query)
         logger.debug('Flushed PostgreSQL storage tables')
 
+    def update_field_indices(self, collection_id, fields,
+                             id_field=DEFAULT_ID_FIELD,
+                             modified_field=DEFAULT_MODIFIED_FIELD):
+        """Create partial indices on the records of `collection_id`, using
+        the exact same expressions as filters and sorting in queries.
+
+        .. note::
+
+            Filters on numeric values, which cast the field value, are not
+            covered by these indices.
+        """
+        fields = set(fields) - set([id_field, modified_field])
+
+        # Index names are limited in length: use hashes of ids.
+        prefix = 'idx_records_%s_' % _short_hash(collection_id)
+        expected = {}
+        for field in fields:
+            for kind, template in (('filter', _FILTER_FIELD_SQL),
+                                   ('sort', _SORT_FIELD_SQL)):
+                name = '%s%s_%s' % (prefix, _short_hash(field), kind)
+                expected[name] = (field, template % 'field')
+
+        # Indices left invalid by an interrupted build are built again.
+        query_existing = """
+        SELECT relname AS indexname, indisvalid AS valid
+          FROM pg_index
+          JOIN pg_class ON pg_class.oid = pg_index.indexrelid
+         WHERE indrelid = 'records'::regclass
+           AND relname LIKE :pattern;
+        """
+        query_create = """
+        CREATE INDEX CONCURRENTLY %(name)s
+            ON records(parent_id, (%(expression)s), last_modified DESC)
+         WHERE collection_id = :collection_id;
+        """
+        # Build and drop indices without locking the records table against
+        # writes, which is not possible inside a transaction block.
+        with self.client.connect_autocommit() as conn:
+            result = conn.execute(sqlalchemy.text(query_existing),
+                                  dict(pattern=prefix + '%'))
+            rows = result.fetchall()
+            existing = set([row['indexname'] for row in rows if row['valid']])
+            invalid = set([row['indexname'] for row in rows
+                           if not row['valid']])
+
+            obsolete = (existing - set(expected.keys())) | invalid
+            for name in obsolete:
+                conn.execute('DROP INDEX CONCURRENTLY IF EXISTS %s;' % name)
+                logger.info('Dropped index %s on %s.' % (name, collection_id))
+
+            for name, (field, expression) in expected.items():
+                if name in existing:
+                    continue
+                safeholders = dict(name=name, expression=expression)
+                placeholders = dict(collection_id=collection_id, field=field)
+                query = sqlalchemy.text(query_create % safeholders)
+                conn.execute(query, placeholders)
+                logger.info('Created index %s on %s (%s).' % (
+                    name, collection_id, field))
+
     def collection_timestamp(self, collection_id, parent_id, auth=None):
+        query_existing = """
+        SELECT as_epoch(last_modified) AS last_modified
+          FROM timestamps
+         WHERE parent_id = :parent_id
+           AND collection_id = :collection_id;
+        """
         query = """
         SELECT as_epoch(collection_timestamp(:parent_id, :collection_id))
             AS last_modified;
         """
         placeholders = dict(parent_id=parent_id, collection_id=collection_id)
+        with self.client.connect(readonly=True) as conn:
+            result = conn.execute(query_existing, placeholders)
+            existing = result.fetchone()
+        if existing:
+            return existing['last_modified']
+
+        # First access on this collection: the timestamp is initialized.
         with self.client.connect(readonly=False) as conn:
             result = conn.execute(query, placeholders)
             record = result.fetchone()
@@ -265,6 +373,28 @@ class Storage(StorageBase):
         record[modified_field] = existing['last_modified']
         return record
 
+    def object_timestamp(self, collection_id, parent_id, object_id,
+                         id_field=DEFAULT_ID_FIELD,
+                         modified_field=DEFAULT_MODIFIED_FIELD,
+                         auth=None):
+        # The JSONB data is neither transferred nor decoded.
+        query = """
+        SELECT as_epoch(last_modified) AS last_modified
+          FROM records
+         WHERE id = :object_id
+           AND parent_id = :parent_id
+           AND collection_id = :collection_id;
+        """
+        placeholders = dict(object_id=object_id,
+                            parent_id=parent_id,
+                            collection_id=collection_id)
+        with self.client.connect(readonly=True) as conn:
+            result = conn.execute(query, placeholders)
+            existing = result.fetchone()
+        if existing is None:
+            raise exceptions.RecordNotFoundError(object_id)
+        return existing['last_modified']
+
     def update(self, collection_id, parent_id, object_id, record,
                unique_fields=None, id_field=DEFAULT_ID_FIELD,
                modified_field=DEFAULT_MODIFIED_FIELD,
@@ -418,6 +548,223 @@ class Storage(StorageBase):
 
         return records
 
+    def create_many(self, collection_id, parent_id, records,
+                    id_generator=None, unique_fields=None,
+                    id_field=DEFAULT_ID_FIELD,
+                    modified_field=DEFAULT_MODIFIED_FIELD,
+                    auth=None):
+        if unique_fields:
+            # Unicity rules are checked record by record.
+            return super(Storage, self).create_many(
+                collection_id, parent_id, records,
+                id_generator=id_generator, unique_fields=unique_fields,
+                id_field=id_field, modified_field=modified_field, auth=auth)
+        if not records:
+            return []
+
+        id_generator = id_generator or self.id_generator
+        records = [record.copy() for record in records]
+        by_id = {}
+        for record in records:
+            record_id = record.setdefault(id_field, id_generator())
+            if record_id in by_id:
+                raise exceptions.UnicityError(id_field, by_id[record_id])
+            by_id[record_id] = record
+
+        query_existing = """
+        SELECT id
+          FROM records
+         WHERE id = ANY((:object_ids)::TEXT[])
+           AND parent_id = :parent_id
+           AND collection_id = :collection_id
+         LIMIT 1;
+        """
+        query = """
+        WITH new_records AS (
+            SELECT id, data, last_modified, rank
+              FROM unnest((:object_ids)::TEXT[],
+                          (:data)::TEXT[],
+                          (:last_modified)::BIGINT[])
+              WITH ORDINALITY AS r(id, data, last_modified, rank)
+        ),
+        delete_potential_tombstones AS (
+            DELETE FROM deleted
+             WHERE id IN (SELECT id FROM new_records)
+               AND parent_id = :parent_id
+               AND collection_id = :collection_id
+        )
+        INSERT INTO records (id, parent_id, collection_id, data, last_modified)
+        SELECT id, :parent_id, :collection_id, (data)::JSONB,
+               from_epoch(last_modified)
+          FROM new_records
+         ORDER BY rank
+        RETURNING id, as_epoch(last_modified) AS last_modified;
+        """
+        placeholders = dict(parent_id=parent_id,
+                            collection_id=collection_id,
+                            **_unnest_records(records, id_field,
+                                              modified_field))
+        with self.client.connect() as conn:
+            # Check that no record already has one of these ids.
+            result = conn.execute(query_existing, placeholders)
+            if result.rowcount > 0:
+                existing = result.fetchone()
+                record = self.get(collection_id, parent_id, existing['id'])
+                raise exceptions.UnicityError(id_field, record)
+
+            result = conn.execute(query, placeholders)
+            inserted = result.fetchall()
+
+        for row in inserted:
+            by_id[row['id']][modified_field] = row['last_modified']
+        return records
+
+    def update_many(self, collection_id, parent_id, records,
+                    unique_fields=None, id_field=DEFAULT_ID_FIELD,
+                    modified_field=DEFAULT_MODIFIED_FIELD,
+                    auth=None):
+        records = [record.copy() for record in records]
+        by_id = dict([(record[id_field], record) for record in records])
+        if unique_fields or len(by_id) < len(records):
+            # Unicity rules are checked, and duplicates applied, one by one.
+            return super(Storage, self).update_many(
+                collection_id, parent_id, records,
+                unique_fields=unique_fields, id_field=id_field,
+                modified_field=modified_field, auth=auth)
+        if not records:
+            return []
+
+        # An UPDATE statement modifies rows in no particular order: the
+        # increasing timestamps are assigned explicitly, in the order of the
+        # records, after the current collection timestamp (whose row is
+        # locked until the end of the transaction).
+        query = """
+        WITH previous AS (
+            SELECT as_epoch(last_modified) AS epoch
+              FROM timestamps
+             WHERE parent_id = :parent_id
+               AND collection_id = :collection_id
+               FOR UPDATE
+        ),
+        start AS (
+            SELECT GREATEST(as_epoch(clock_timestamp()::TIMESTAMP),
+                            (SELECT epoch + 1 FROM previous)) AS epoch
+        ),
+        new_records AS (
+            SELECT r.id, (r.data)::JSONB AS data,
+                   from_epoch(COALESCE(r.last_modified,
+                                       start.epoch + r.rank - 1))
+                     AS last_modified
+              FROM unnest((:object_ids)::TEXT[],
+                          (:data)::TEXT[],
+                          (:last_modified)::BIGINT[])
+                   WITH ORDINALITY AS r(id, data, last_modified, rank),
+                   start
+        ),
+        updated AS (
+            UPDATE records
+               SET data = new_records.data,
+                   last_modified = new_records.last_modified
+              FROM new_records
+             WHERE records.id = new_records.id
+               AND records.parent_id = :parent_id
+               AND records.collection_id = :collection_id
+            RETURNING records.id, records.last_modified
+        ),
+        inserted AS (
+            INSERT INTO records (id, parent_id, collection_id, data,
+                                 last_modified)
+            SELECT id, :parent_id, :collection_id, data, last_modified
+              FROM new_records
+             WHERE id NOT IN (SELECT id FROM updated)
+            RETURNING id, last_modified
+        )
+        SELECT id, as_epoch(last_modified) AS last_modified,
+               (SELECT epoch FROM start) AS start
+          FROM updated
+         UNION ALL
+        SELECT id, as_epoch(last_modified) AS last_modified,
+               (SELECT epoch FROM start) AS start
+          FROM inserted;
+        """
+        # Rows were not bumped in order by the trigger: the collection
+        # timestamp may be ahead of the assigned ones.
+        query_timestamp = """
+        UPDATE timestamps SET last_modified = from_epoch(:last_modified)
+         WHERE parent_id = :parent_id
+           AND collection_id = :collection_id;
+        """
+        placeholders = dict(parent_id=parent_id,
+                            collection_id=collection_id,
+                            **_unnest_records(records, id_field,
+                                              modified_field))
+        with self.client.connect() as conn:
+            result = conn.execute(query, placeholders)
+            updated = result.fetchall()
+            timestamp = max([row['start'] for row in updated] +
+                            [row['last_modified'] for row in updated])
+            conn.execute(query_timestamp, dict(parent_id=parent_id,
+                                               collection_id=collection_id,
+                                               last_modified=timestamp))
+
+        for row in updated:
+            by_id[row['id']][modified_field] = row['last_modified']
+        return records
+
+    def delete_many(self, collection_id, parent_id, object_ids,
+                    with_deleted=True, id_field=DEFAULT_ID_FIELD,
+                    modified_field=DEFAULT_MODIFIED_FIELD,
+                    deleted_field=DEFAULT_DELETED_FIELD,
+                    auth=None):
+        if not object_ids:
+            return []
+
+        if with_deleted:
+            query = """
+            WITH deleted_records AS (
+                DELETE
+                FROM records
+                WHERE id = ANY((:object_ids)::TEXT[])
+                  AND parent_id = :parent_id
+                  AND collection_id = :collection_id
+                RETURNING id
+            )
+            INSERT INTO deleted (id, parent_id, collection_id)
+            SELECT id, :parent_id, :collection_id
+              FROM deleted_records
+            RETURNING id, as_epoch(last_modified) AS last_modified;
+            """
+        else:
+            query = """
+                DELETE
+                FROM records
+                WHERE id = ANY((:object_ids)::TEXT[])
+                  AND parent_id = :parent_id
+                  AND collection_id = :collection_id
+                RETURNING id, as_epoch(last_modified) AS last_modified;
+            """
+        placeholders = dict(object_ids=list(object_ids),
+                            parent_id=parent_id,
+                            collection_id=collection_id)
+
+        with self.client.connect() as conn:
+            result = conn.execute(query, placeholders)
+            deleted = dict([(row['id'], row['last_modified'])
+                            for row in result.fetchall()])
+            # Leave the transaction uncommitted if a record is missing.
+            for object_id in object_ids:
+                if object_id not in deleted:
+                    raise exceptions.RecordNotFoundError(object_id)
+
+        records = []
+        for object_id in object_ids:
+            record = {}
+            record[modified_field] = deleted[object_id]
+            record[id_field] = object_id
+            record[deleted_field] = True
+            records.append(record)
+        return records
+
     def purge_deleted(self, collection_id, parent_id, before=None,
                       id_field=DEFAULT_ID_FIELD,
                       modified_field=DEFAULT_MODIFIED_FIELD,
@@ -451,7 +798,79 @@ class Storage(StorageBase):
                 id_field=DEFAULT_ID_FIELD,
                 modified_field=DEFAULT_MODIFIED_FIELD,
                 deleted_field=DEFAULT_DELETED_FIELD,
-                auth=None):
+                auth=None, count_total=True):
+        fetch_limit = self._max_fetch_size
+        if limit:
+            assert isinstance(limit, six.integer_types)  # asserted in resource
+            fetch_limit = min(limit, fetch_limit)
+
+        query, placeholders = self._format_get_all(
+            collection_id, parent_id, filters, sorting, pagination_rules,
+            fetch_limit, include_deleted, id_field, modified_field,
+            deleted_field, count_total)
+
+        with self.client.connect(readonly=True) as conn:
+            result = conn.execute(query, placeholders)
+            retrieved = result.fetchmany(self._max_fetch_size)
+
+        if not len(retrieved):
+            return [], 0 if count_total else None
+
+        count_total = retrieved[0]['count_total']
+
+        records = []
+        for result in retrieved:
+            record = result['data']
+            record[id_field] = result['id']
+            record[modified_field] = result['last_modified']
+            records.append(record)
+
+        return records, count_total
+
+    def iter_all(self, collection_id, parent_id, filters=None, sorting=None,
+                 pagination_rules=None, limit=None, include_deleted=False,
+                 id_field=DEFAULT_ID_FIELD,
+                 modified_field=DEFAULT_MODIFIED_FIELD,
+                 deleted_field=DEFAULT_DELETED_FIELD,
+                 auth=None):
+        fetch_limit = 'ALL'
+        if limit:
+            assert isinstance(limit, six.integer_types)  # asserted in resource
+            fetch_limit = limit
+
+        query, placeholders = self._format_get_all(
+            collection_id, parent_id, filters, sorting, pagination_rules,
+            fetch_limit, include_deleted, id_field, modified_field,
+            deleted_field, count_total=False)
+
+        # Rows are read through a server-side cursor: they are transferred
+        # and converted chunk by chunk, while they are consumed.
+        with self.client.connect(readonly=True) as conn:
+            cursor = conn.connection().execution_options(
+                stream_results=True, max_row_buffer=self._itersize)
+            result = cursor.execute(sqlalchemy.text(query), placeholders)
+            while True:
+                retrieved = result.fetchmany(self._itersize)
+                if not retrieved:
+                    break
+                for result_row in retrieved:
+                    record = result_row['data']
+                    record[id_field] = result_row['id']
+                    record[modified_field] = result_row['last_modified']
+                    yield record
+
+    def _format_get_all(self, collection_id, parent_id, filters, sorting,
+                        pagination_rules, fetch_limit, include_deleted,
+                        id_field, modified_field, deleted_field, count_total):
+        """Build the query that lists records and tombstones.
+
+        :returns: the query and its placeholders.
+        :rtype: tuple
+        """
+        # Filtering, sorting and pagination are applied to records and
+        # tombstones separately, so that PostgreSQL can walk the
+        # ``(parent_id, collection_id, last_modified DESC)`` indices
+        # and stop as soon as the page is full.
         query = """
         WITH total_filtered AS (
             SELECT COUNT(id) AS count
@@ -466,7 +885,9 @@ class Storage(StorageBase):
              WHERE parent_id = :parent_id
                AND collection_id = :collection_id
                %(conditions_filter)s
-             LIMIT %(max_fetch_size)s
+               %(pagination_rules)s
+             %(sorting)s
+             LIMIT %(fetch_limit)s
         ),
         fake_deleted AS (
             SELECT (:deleted_field)::JSONB AS data
@@ -477,24 +898,21 @@ class Storage(StorageBase):
              WHERE parent_id = :parent_id
                AND collection_id = :collection_id
                %(conditions_filter)s
-               %(deleted_limit)s
+               %(pagination_rules)s
+             %(sorting)s
+             LIMIT %(deleted_limit)s
         ),
         all_records AS (
             SELECT * FROM filtered_deleted
              UNION ALL
             SELECT * FROM collection_filtered
-        ),
-        paginated_records AS (
-            SELECT DISTINCT id
-              FROM all_records
-              %(pagination_rules)s
         )
-        SELECT total_filtered.count AS count_total,
+        SELECT %(count_total)s AS count_total,
                a.id, as_epoch(a.last_modified) AS last_modified, a.data
-          FROM paginated_records AS p JOIN all_records AS a ON (a.id = p.id),
-               total_filtered
+          FROM all_records AS a
+               %(total_filtered)s
           %(sorting)s
-          %(pagination_limit)s;
+         LIMIT %(fetch_limit)s;
         """
         deleted_field = json.dumps(dict([(deleted_field, True)]))
 
@@ -505,7 +923,17 @@ class Storage(StorageBase):
 
         # Safe strings
         safeholders = defaultdict(six.text_type)
-        safeholders['max_fetch_size'] = self._max_fetch_size
+
+        safeholders['fetch_limit'] = fetch_limit
+        safeholders['deleted_limit'] = fetch_limit if include_deleted else 0
+
+        if count_total:
+            safeholders['count_total'] = 'total_filtered.count'
+            safeholders['total_filtered'] = ', total_filtered'
+        else:
+            # Since the ``total_filtered`` CTE is not referenced, PostgreSQL
+            # does not evaluate it (i.e. no scan of the filtered collection).
+            safeholders['count_total'] = 'NULL'
 
         if filters:
             safe_sql, holders = self._format_conditions(filters,
@@ -514,9 +942,6 @@ class Storage(StorageBase):
             safeholders['conditions_filter'] = 'AND %s' % safe_sql
             placeholders.update(**holders)
 
-        if not include_deleted:
-            safeholders['deleted_limit'] = 'LIMIT 0'
-
         if sorting:
             sql, holders = self._format_sorting(sorting, id_field,
                                                 modified_field)
@@ -526,30 +951,10 @@ class Storage(StorageBase):
         if pagination_rules:
             sql, holders = self._format_pagination(pagination_rules, id_field,
                                                    modified_field)
-            safeholders['pagination_rules'] = 'WHERE %s' % sql
+            safeholders['pagination_rules'] = 'AND (%s)' % sql
             placeholders.update(**holders)
 
-        if limit:
-            assert isinstance(limit, six.integer_types)  # asserted in resource
-            safeholders['pagination_limit'] = 'LIMIT %s' % limit
-
-        with self.client.connect(readonly=True) as conn:
-            result = conn.execute(query % safeholders, placeholders)
-            retrieved = result.fetchmany(self._max_fetch_size)
-
-        if not len(retrieved):
-            return [], 0
-
-        count_total = retrieved[0]['count_total']
-
-        records = []
-        for result in retrieved:
-            record = result['data']
-            record[id_field] = result['id']
-            record[modified_field] = result['last_modified']
-            records.append(record)
-
-        return records, count_total
+        return query % safeholders, placeholders
 
     def _format_conditions(self, filters, id_field, modified_field,
                            prefix='filters'):
@@ -566,54 +971,82 @@ class Storage(StorageBase):
             placeholders to actual values.
         :rtype: tuple
         """
-        operators = {
-            COMPARISON.EQ: '=',
-            COMPARISON.NOT: '<>',
-            COMPARISON.IN: 'IN',
-            COMPARISON.EXCLUDE: 'NOT IN',
-        }
-
         conditions = []
         holders = {}
         for i, filtr in enumerate(filters):
-            value = filtr.value
-
-            if filtr.field == id_field:
-                sql_field = 'id'
-            elif filtr.field == modified_field:
-                sql_field = 'as_epoch(last_modified)'
-            else:
-                # Safely escape field name
-                field_holder = '%s_field_%s' % (prefix, i)
-                holders[field_holder] = filtr.field
-
-                # JSON operator ->> retrieves values as text.
-                # If field is missing, we default to ''.
-                sql_field = "coalesce(data->>:%s, '')" % field_holder
-                if isinstance(value, (int, float)) and \
-                   value not in (True, False):
-                    sql_field = "(data->>:%s)::numeric" % field_holder
-
-            if filtr.operator not in (COMPARISON.IN, COMPARISON.EXCLUDE):
-                # For the IN operator, let psycopg escape the values list.
-                # Otherwise JSON-ify the native value (e.g. True -> 'true')
-                if not isinstance(filtr.value, six.string_types):
-                    value = json.dumps(filtr.value).strip('"')
+            sql_field, value_holder, operands = self._format_operands(
+                filtr, id_field, modified_field, prefix, i)
+            holders.update(**operands)
+
+            sql_operator = _SQL_OPERATORS.get(filtr.operator,
+                                              filtr.operator.value)
+            if isinstance(filtr.value, SubQuery):
+                # Values are looked up by PostgreSQL (e.g. semi-join).
+                sql, operands = filtr.value.format(prefix=value_holder + '_')
+                holders.update(**operands)
+                cond = "%s %s (%s)" % (sql_field, sql_operator, sql)
             else:
-                value = tuple(value)
+                cond = "%s %s :%s" % (sql_field, sql_operator, value_holder)
 
-            # Safely escape value
-            value_holder = '%s_value_%s' % (prefix, i)
-            holders[value_holder] = value
+            is_range = filtr.operator in (COMPARISON.LT, COMPARISON.GT)
+            if filtr.field == modified_field and is_range:
+                # Epochs are rounded to the millisecond: comparing the raw
+                # column gives a superset, which can be served by the
+                # timestamp indices.
+                cond = "last_modified %s from_epoch(:%s) AND %s" % (
+                    sql_operator, value_holder, cond)
 
-            sql_operator = operators.setdefault(filtr.operator,
-                                                filtr.operator.value)
-            cond = "%s %s :%s" % (sql_field, sql_operator, value_holder)
             conditions.append(cond)
 
         safe_sql = ' AND '.join(conditions)
         return safe_sql, holders
 
+    def _format_operands(self, filtr, id_field, modified_field, prefix, i):
+        """Format the field and the value of a filter in SQL, with
+        placeholders for safe escaping.
+
+        :returns: A SQL expression for the field, the name of the value
+            placeholder, and a dict mapping placeholders to actual values.
+        :rtype: tuple
+        """
+        holders = {}
+        value = filtr.value
+
+        if filtr.field == id_field:
+            sql_field = 'id'
+        elif filtr.field == modified_field:
+            sql_field = 'as_epoch(last_modified)'
+        else:
+            # Safely escape field name
+            field_holder = '%s_field_%s' % (prefix, i)
+            holders[field_holder] = filtr.field
+
+            # JSON operator ->> retrieves values as text.
+            # If field is missing, we default to ''.
+            sql_field = _FILTER_FIELD_SQL % field_holder
+            if isinstance(value, (int, float)) and \
+               value not in (True, False):
+                sql_field = "(data->>:%s)::numeric" % field_holder
+
+        # Safely escape value
+        value_holder = '%s_value_%s' % (prefix, i)
+
+        if isinstance(value, SubQuery):
+            # Placeholders of the sub-query are obtained when formatted.
+            return sql_field, value_holder, holders
+
+        if filtr.operator not in (COMPARISON.IN, COMPARISON.EXCLUDE):
+            # For the IN operator, let psycopg escape the values list.
+            # Otherwise JSON-ify the native value (e.g. True -> 'true')
+            if not isinstance(filtr.value, six.string_types):
+                value = json.dumps(filtr.value).strip('"')
+        else:
+            value = tuple(value)
+
+        holders[value_holder] = value
+
+        return sql_field, value_holder, holders
+
     def _format_pagination(self, pagination_rules, id_field, modified_field):
         """Format the pagination rules in SQL, with placeholders for
         safe escaping.
@@ -630,9 +1063,28 @@ class Storage(StorageBase):
             placeholders to actual values.
         :rtype: tuple
         """
-        rules = []
         placeholders = {}
 
+        keyset = _pagination_keyset(pagination_rules)
+        if keyset is not None:
+            # ``(a < x) OR (a = x AND b < y)`` is expressed with the
+            # equivalent row-value comparison ``(a, b) < (x, y)``.
+            filters, operator = keyset
+            fields = []
+            values = []
+            for i, filtr in enumerate(filters):
+                sql_field, value_holder, holders = self._format_operands(
+                    filtr, id_field, modified_field, 'keyset', i)
+                fields.append(sql_field)
+                values.append(':%s' % value_holder)
+                placeholders.update(**holders)
+
+            safe_sql = '(%s) %s (%s)' % (', '.join(fields),
+                                         operator.value,
+                                         ', '.join(values))
+            return safe_sql, placeholders
+
+        rules = []
         for i, rule in enumerate(pagination_rules):
             prefix = 'rules_%s' % i
             safe_sql, holders = self._format_conditions(rule,
@@ -667,7 +1119,7 @@ class Storage(StorageBase):
             else:
                 field_holder = 'sort_field_%s' % i
                 holders[field_holder] = sort.field
-                sql_field = 'data->(:%s)' % field_holder
+                sql_field = _SORT_FIELD_SQL % field_holder
 
             sql_direction = 'ASC' if sort.direction > 0 else 'DESC'
             sql_sort = "%s %s" % (sql_field, sql_direction)
@@ -741,8 +1193,66 @@ class Storage(StorageBase):
             raise exceptions.UnicityError(unique_fields[0], record)
 
 
+# SQL expressions of records fields, used for filtering, sorting and indexing.
+_FILTER_FIELD_SQL = "coalesce(data->>:%s, '')"
+_SORT_FIELD_SQL = "data->(:%s)"
+
+_SQL_OPERATORS = {
+    COMPARISON.EQ: '=',
+    COMPARISON.NOT: '<>',
+    COMPARISON.IN: 'IN',
+    COMPARISON.EXCLUDE: 'NOT IN',
+}
+
+
+def _unnest_records(records, id_field, modified_field):
+    """Build the placeholders of the records arrays, unnested as rows in
+    bulk queries.
+    """
+    return dict(object_ids=[r[id_field] for r in records],
+                data=[json.dumps(r) for r in records],
+                last_modified=[r.get(modified_field) for r in records])
+
+
+def _short_hash(value):
+    return hashlib.md5(value.encode('utf-8')).hexdigest()[:12]
+
+
+def _pagination_keyset(pagination_rules):
+    """Detect if the pagination rules were built from a sorting with a
+    single direction (see
+    :meth:`cliquet.resource.UserResource._build_pagination_rules`).
+
+    :returns: the list of filters and the comparison of the equivalent
+        row-value comparison, or ``None`` if not applicable.
+    :rtype: tuple
+    """
+    rules = sorted(pagination_rules, key=len, reverse=True)
+    keyset = rules[0]
+    operator = keyset[-1].operator
+    if operator not in (COMPARISON.LT, COMPARISON.GT):
+        return None
+    # With a single field, the rule is already a simple comparison.
+    sizes = [len(rule) for rule in rules]
+    if len(keyset) < 2 or sizes != list(range(len(keyset), 0, -1)):
+        return None
+
+    for rule in rules:
+        size = len(rule)
+        expected = [Filter(f.field, f.value, COMPARISON.EQ)
+                    for f in keyset[:size - 1]]
+        last = keyset[size - 1]
+        expected.append(Filter(last.field, last.value, operator))
+        if list(rule) != expected:
+            return None
+
+    return keyset, operator
+
+
 def load_from_config(config):
     settings = config.get_settings()
     max_fetch_size = int(settings['storage_max_fetch_size'])
+    itersize = int(settings['storage_itersize'])
     client = create_from_config(config, prefix='storage_')
-    return Storage(client=client, max_fetch_size=max_fetch_size)
+    return Storage(client=client, max_fetch_size=max_fetch_size,
+                   itersize=itersize)
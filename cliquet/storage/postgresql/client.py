@@ -8,18 +8,22 @@ from cliquet.utils import sqlalchemy
 import transaction as zope_transaction
 
 
+# Settings of the backends that are given to the SQLAlchemy engine
+# (e.g. ``storage_pool_size``). Other ones are used by Cliquet.
+ENGINE_SETTINGS = ('url', 'poolclass', 'pool_size', 'max_overflow',
+                   'max_backlog', 'pool_timeout', 'pool_recycle',
+                   'pool_reset_on_return', 'echo', 'echo_pool',
+                   'isolation_level', 'encoding', 'label_length')
+
+
 class PostgreSQLClient(object):
-    def __init__(self, session_factory, commit_manually=True, invalidate=None):
+    def __init__(self, session_factory, commit_manually=True, invalidate=None,
+                 engine=None):
         self.session_factory = session_factory
+        self.engine = engine
         self.commit_manually = commit_manually
         self.invalidate = invalidate or (lambda session: None)
 
-        # # Register ujson, globally for all futur cursors
-        # with self.connect() as cursor:
-        #     psycopg2.extras.register_json(cursor,
-        #                                   globally=True,
-        #                                   loads=json.loads)
-
     @contextlib.contextmanager
     def connect(self, readonly=False, force_commit=False):
         """
@@ -57,6 +61,20 @@ class PostgreSQLClient(object):
                 # Give back to pool if commit done manually.
                 session.close()
 
+    @contextlib.contextmanager
+    def connect_autocommit(self):
+        """
+        Pulls a connection in autocommit mode from the pool, outside of any
+        transaction, for statements that cannot run inside a transaction
+        block (e.g. ``CREATE INDEX CONCURRENTLY``).
+        """
+        try:
+            with self.engine.connect() as conn:
+                yield conn.execution_options(isolation_level='AUTOCOMMIT')
+        except sqlalchemy.exc.SQLAlchemyError as e:
+            logger.error(e)
+            raise exceptions.BackendError(original=e)
+
 # Reuse existing client if same URL.
 _CLIENTS = defaultdict(dict)
 
@@ -72,12 +90,8 @@ def create_from_config(config, prefix=''):
     from zope.sqlalchemy import ZopeTransactionExtension, invalidate
     from sqlalchemy.orm import sessionmaker, scoped_session
 
-    settings = config.get_settings().copy()
-    # Custom Cliquet settings, unsupported by SQLAlchemy.
-    settings.pop(prefix + 'backend', None)
-    settings.pop(prefix + 'max_fetch_size', None)
-    settings.pop(prefix + 'prefix', None)
-    transaction_per_request = settings.pop('transaction_per_request', False)
+    settings = config.get_settings()
+    transaction_per_request = settings.get('transaction_per_request', False)
 
     url = settings[prefix + 'url']
     existing_client = _CLIENTS[transaction_per_request].get(url)
@@ -87,12 +101,18 @@ def create_from_config(config, prefix=''):
         warnings.warn(msg)
         return existing_client
 
-    # Initialize SQLAlchemy engine from settings.
+    # Initialize SQLAlchemy engine from settings, leaving out the custom
+    # Cliquet ones, which it does not support.
+    engine_settings = dict((prefix + key, settings[prefix + key])
+                           for key in ENGINE_SETTINGS
+                           if prefix + key in settings)
     poolclass_key = prefix + 'poolclass'
-    settings.setdefault(poolclass_key, ('cliquet.storage.postgresql.'
-                                        'pool.QueuePoolWithMaxBacklog'))
-    settings[poolclass_key] = config.maybe_dotted(settings[poolclass_key])
-    engine = sqlalchemy.engine_from_config(settings, prefix=prefix, url=url)
+    engine_settings.setdefault(poolclass_key, ('cliquet.storage.postgresql.'
+                                               'pool.QueuePoolWithMaxBacklog'))
+    engine_settings[poolclass_key] = config.maybe_dotted(
+        engine_settings[poolclass_key])
+    engine = sqlalchemy.engine_from_config(engine_settings, prefix=prefix,
+                                           url=url)
 
     # Initialize thread-safe session factory.
     options = {}
@@ -103,6 +123,7 @@ def create_from_config(config, prefix=''):
 
     # Store one client per URI.
     commit_manually = (not transaction_per_request)
-    client = PostgreSQLClient(session_factory, commit_manually, invalidate)
+    client = PostgreSQLClient(session_factory, commit_manually, invalidate,
+                              engine=engine)
     _CLIENTS[transaction_per_request][url] = client
     return client
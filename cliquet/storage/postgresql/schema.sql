@@ -189,9 +189,13 @@ BEGIN
     -- an error (operation is cancelled).
     -- See https://github.com/mozilla-services/cliquet/issues/25
     --
+    -- Timestamps are compared as epochs (milliseconds), like in the HTTP
+    -- API, so that rows written in the same millisecond (e.g. by a multi-row
+    -- INSERT) are bumped too.
+    --
     current := clock_timestamp();
-    IF previous IS NOT NULL AND previous >= current THEN
-        current := previous + INTERVAL '1 milliseconds';
+    IF previous IS NOT NULL AND as_epoch(previous) >= as_epoch(current) THEN
+        current := from_epoch(as_epoch(previous) + 1);
     END IF;
 
 
@@ -241,4 +245,4 @@ INSERT INTO metadata (name, value) VALUES ('created_at', NOW()::TEXT);
 
 -- Set storage schema version.
 -- Should match ``cliquet.storage.postgresql.PostgreSQL.schema_version``
-INSERT INTO metadata (name, value) VALUES ('storage_schema_version', '11');
+INSERT INTO metadata (name, value) VALUES ('storage_schema_version', '12');
@@ -2,12 +2,14 @@ from __future__ import absolute_import, unicode_literals
 from functools import wraps
 
 import redis
+import six
 from six.moves.urllib import parse as urlparse
 
 from cliquet import utils, logger
 from cliquet.storage import (
     exceptions, DEFAULT_ID_FIELD,
     DEFAULT_MODIFIED_FIELD, DEFAULT_DELETED_FIELD)
+from cliquet.utils import COMPARISON
 from cliquet.storage.memory import MemoryBasedStorage
 
 
@@ -40,6 +42,126 @@ def create_from_config(config, prefix=''):
     return redis.StrictRedis(connection_pool=connection_pool)
 
 
+# Compute the records timestamps and bump the collection timestamp, with the
+# same logic as :func:`cliquet.storage.memory.bump_timestamp`. The current
+# time is given by the client, since scripts have to be deterministic.
+BUMP_TIMESTAMPS_FUNCTION = """
+local function bump_timestamps(key, now, specified)
+    local previous = tonumber(redis.call('GET', key))
+    local timestamps = {}
+    for i, value in ipairs(specified) do
+        local current = tonumber(value) or now
+        local collection = current
+        if previous and previous >= current then
+            collection = previous + 1
+        end
+        if value == '' then
+            current = collection
+        end
+        timestamps[i] = current
+        previous = collection
+    end
+    redis.call('SET', key, string.format('%d', previous))
+    return timestamps
+end
+
+-- Records are decoded to be checked, but not re-encoded: cjson would turn
+-- empty lists into objects and round numbers to 14 significant digits.
+local function check_record(encoded)
+    local record = cjson.decode(encoded)
+    local _, start = string.find(encoded, '^%s*{')
+    if type(record) ~= 'table' or not start then
+        error('Record is not a JSON object: ' .. encoded)
+    end
+    return next(record) == nil
+end
+
+local function with_timestamp(encoded, is_empty, field, timestamp)
+    local member = cjson.encode({[field] = timestamp})
+    if is_empty then
+        return member
+    end
+    local _, start = string.find(encoded, '^%s*{')
+    return string.sub(member, 1, -2) .. ',' .. string.sub(encoded, start + 1)
+end
+"""
+
+# KEYS: collection timestamp.
+# ARGV: current time, then a timestamp (or empty) per record.
+BUMP_TIMESTAMPS_SCRIPT = BUMP_TIMESTAMPS_FUNCTION + """
+return bump_timestamps(KEYS[1], tonumber(ARGV[1]),
+                       {unpack(ARGV, 2)})
+"""
+
+# KEYS: collection timestamp, set of records ids, set of tombstones ids.
+# ARGV: current time, records keys prefix, modified field, ``1`` to remove
+# tombstones, then for each record its id, its timestamp (or empty) and its
+# JSON encoding without timestamp.
+WRITE_RECORDS_SCRIPT = BUMP_TIMESTAMPS_FUNCTION + """
+local prefix, field, undelete = ARGV[2], ARGV[3], ARGV[4] == '1'
+local ids, specified, encoded, empty = {}, {}, {}, {}
+for i = 5, #ARGV, 3 do
+    table.insert(ids, ARGV[i])
+    table.insert(specified, ARGV[i + 1])
+    table.insert(encoded, ARGV[i + 2])
+    table.insert(empty, check_record(ARGV[i + 2]))
+end
+
+local timestamps = bump_timestamps(KEYS[1], tonumber(ARGV[1]), specified)
+for i, id in ipairs(ids) do
+    local timestamp = string.format('%d', timestamps[i])
+    redis.call('SET', prefix .. id .. '.records',
+               with_timestamp(encoded[i], empty[i], field, timestamps[i]))
+    redis.call('SADD', KEYS[2], id)
+    redis.call('ZADD', KEYS[2] .. '.timestamps', timestamp, id)
+    if undelete then
+        redis.call('DEL', prefix .. id .. '.deleted')
+        redis.call('SREM', KEYS[3], id)
+        redis.call('ZREM', KEYS[3] .. '.timestamps', id)
+    end
+end
+return timestamps
+"""
+
+# KEYS: collection timestamp, set of records ids, set of tombstones ids.
+# ARGV: current time, records keys prefix, modified field, timestamp of
+# deletion (or empty), ``1`` to keep tombstones, then for each record its id
+# and its JSON encoded tombstone without timestamp.
+# Returns the id of the first unknown record, if any.
+DELETE_RECORDS_SCRIPT = BUMP_TIMESTAMPS_FUNCTION + """
+local prefix, field, with_deleted = ARGV[2], ARGV[3], ARGV[5] == '1'
+local ids, specified, tombstones, empty = {}, {}, {}, {}
+for i = 6, #ARGV, 2 do
+    table.insert(ids, ARGV[i])
+    table.insert(specified, ARGV[4])
+    table.insert(tombstones, ARGV[i + 1])
+    table.insert(empty, check_record(ARGV[i + 1]))
+end
+
+for _, id in ipairs(ids) do
+    if redis.call('EXISTS', prefix .. id .. '.records') == 0 then
+        return id
+    end
+end
+
+local timestamps = bump_timestamps(KEYS[1], tonumber(ARGV[1]), specified)
+for i, id in ipairs(ids) do
+    redis.call('DEL', prefix .. id .. '.records')
+    redis.call('SREM', KEYS[2], id)
+    redis.call('ZREM', KEYS[2] .. '.timestamps', id)
+    if with_deleted then
+        local timestamp = string.format('%d', timestamps[i])
+        redis.call('SET', prefix .. id .. '.deleted',
+                   with_timestamp(tombstones[i], empty[i], field,
+                                  timestamps[i]))
+        redis.call('SADD', KEYS[3], id)
+        redis.call('ZADD', KEYS[3] .. '.timestamps', timestamp, id)
+    end
+end
+return timestamps
+"""
+
+
 class Storage(MemoryBasedStorage):
     """Storage backend implementation using Redis.
 
@@ -48,6 +170,10 @@ class Storage(MemoryBasedStorage):
         Useful for very low server load, but won't scale since records sorting
         and filtering are performed in memory.
 
+        Only the records of the current page are fetched when they are
+        filtered on their timestamp and sorted by timestamp (e.g.
+        synchronization), using an index sorted by timestamps.
+
     Enable in configuration::
 
         cliquet.storage_backend = cliquet.storage.redis
@@ -64,6 +190,13 @@ class Storage(MemoryBasedStorage):
     def __init__(self, client, *args, **kwargs):
         super(Storage, self).__init__(*args, **kwargs)
         self._client = client
+        # Scripts are sent to the server the first time they are run.
+        self._bump_timestamps_script = client.register_script(
+            BUMP_TIMESTAMPS_SCRIPT)
+        self._write_records_script = client.register_script(
+            WRITE_RECORDS_SCRIPT)
+        self._delete_records_script = client.register_script(
+            DELETE_RECORDS_SCRIPT)
 
     @property
     def settings(self):
@@ -75,6 +208,42 @@ class Storage(MemoryBasedStorage):
     def _decode(self, record):
         return utils.json.loads(record.decode('utf-8'))
 
+    @wrap_redis_error
+    def initialize_schema(self):
+        # Index the records and tombstones stored by previous versions.
+        for key in self._client.scan_iter(match='*.records'):
+            key = key.decode('utf-8')
+            if self._client.type(key) != b'set':
+                continue
+            prefix = key[:-len('records')]
+            for kind in ('records', 'deleted'):
+                self._reindex(prefix, kind)
+
+    def _reindex(self, prefix, kind):
+        ids = [_id.decode('utf-8')
+               for _id in self._client.smembers(prefix + kind)]
+        if not ids:
+            return
+        keys = ['{0}{1}.{2}'.format(prefix, _id, kind) for _id in ids]
+        encoded_results = self._client.mget(keys)
+        with self._client.pipeline() as multi:
+            multi.delete(prefix + kind + '.timestamps')
+            for _id, encoded in zip(ids, encoded_results):
+                if encoded:
+                    record = self._decode(encoded)
+                    self._index(multi, prefix + kind, _id,
+                                record[self.modified_field])
+            multi.execute()
+        logger.info('Indexed %s %s of %s' % (len(ids), kind, prefix[:-1]))
+
+    def _index(self, pipe, ids_key, object_id, timestamp):
+        """Index the object in the set of ids sorted by timestamp.
+        """
+        # Unlike ``zadd()``, arguments order does not depend on redis-py
+        # version.
+        pipe.execute_command('ZADD', ids_key + '.timestamps',
+                             timestamp, object_id)
+
     @wrap_redis_error
     def flush(self, auth=None):
         self._client.flushdb()
@@ -87,49 +256,92 @@ class Storage(MemoryBasedStorage):
             return int(timestamp)
         return self._bump_timestamp(collection_id, parent_id)
 
-    @wrap_redis_error
     def _bump_timestamp(self, collection_id, parent_id, record=None,
                         modified_field=None, last_modified=None):
+        timestamps = self._bump_timestamps(collection_id, parent_id, [record],
+                                           modified_field=modified_field,
+                                           last_modified=last_modified)
+        return timestamps[0]
 
-        key = '{0}.{1}.timestamp'.format(collection_id, parent_id)
-        while 1:
-            with self._client.pipeline() as pipe:
-                try:
-                    pipe.watch(key)
-                    previous = pipe.get(key)
-                    pipe.multi()
-                    # XXX factorize code from memory and redis backends.
-                    is_specified = (record is not None and
-                                    modified_field in record or
-                                    last_modified is not None)
-                    if is_specified:
-                        # If there is a timestamp in the new record,
-                        # try to use it.
-                        if last_modified is not None:
-                            current = last_modified
-                        else:
-                            current = record[modified_field]
-                    else:
-                        current = utils.msec_time()
-
-                    if previous and int(previous) >= current:
-                        collection_timestamp = int(previous) + 1
-                    else:
-                        collection_timestamp = current
-
-                    # Return the newly generated timestamp as the current one
-                    # only if nothing else was specified.
-                    if not is_specified:
-                        current = collection_timestamp
-
-                    pipe.set(key, collection_timestamp)
-                    pipe.execute()
-                    return current
-                except redis.WatchError:  # pragma: no cover
-                    # Our timestamp has been modified by someone else, let's
-                    # retry.
-                    # XXX: untested.
-                    continue
+    @wrap_redis_error
+    def _bump_timestamps(self, collection_id, parent_id, records,
+                         modified_field=None, last_modified=None):
+        """Bump the collection timestamp once for each of the specified
+        `records`, atomically.
+
+        :returns: the list of records timestamps.
+        """
+        specified = []
+        for record in records:
+            timestamp = last_modified
+            if timestamp is None and record is not None:
+                timestamp = record.get(modified_field)
+            specified.append('' if timestamp is None else timestamp)
+        keys = ['{0}.{1}.timestamp'.format(collection_id, parent_id)]
+        return self._bump_timestamps_script(
+            keys=keys, args=[utils.msec_time()] + specified)
+
+    def _write_records(self, collection_id, parent_id, records,
+                       id_field, modified_field, undelete):
+        """Store the specified records, index them and bump their timestamps,
+        in a single atomic round trip.
+
+        :param bool undelete: remove the tombstones of the records.
+        :returns: copies of the records, with their timestamps.
+        """
+        args = [utils.msec_time(),
+                '{0}.{1}.'.format(collection_id, parent_id),
+                modified_field,
+                '1' if undelete else '']
+        stored = []
+        for record in records:
+            record = record.copy()
+            timestamp = record.pop(modified_field, None)
+            args += [record[id_field],
+                     '' if timestamp is None else timestamp,
+                     self._encode(record)]
+            stored.append(record)
+
+        timestamps = self._write_records_script(
+            keys=_script_keys(collection_id, parent_id), args=args)
+        for record, timestamp in zip(stored, timestamps):
+            record[modified_field] = timestamp
+        return stored
+
+    def _delete_records(self, collection_id, parent_id, object_ids,
+                        with_deleted, id_field, modified_field, deleted_field,
+                        last_modified=None):
+        """Delete the specified records, store their tombstones and bump
+        their timestamps, in a single atomic round trip.
+
+        :raises: :exc:`cliquet.storage.exceptions.RecordNotFoundError` if
+            one of the records does not exist. Nothing is deleted then.
+        :returns: the tombstones of the records.
+        """
+        args = [utils.msec_time(),
+                '{0}.{1}.'.format(collection_id, parent_id),
+                modified_field,
+                '' if last_modified is None else last_modified,
+                '1' if with_deleted else '']
+        tombstones = []
+        for object_id in object_ids:
+            tombstone = self.strip_deleted_record(
+                collection_id, parent_id,
+                {id_field: object_id, modified_field: None},
+                id_field=id_field, modified_field=modified_field,
+                deleted_field=deleted_field)
+            del tombstone[modified_field]
+            args += [object_id, self._encode(tombstone)]
+            tombstones.append(tombstone)
+
+        result = self._delete_records_script(
+            keys=_script_keys(collection_id, parent_id), args=args)
+        if not isinstance(result, list):
+            raise exceptions.RecordNotFoundError(result.decode('utf-8'))
+
+        for tombstone, timestamp in zip(tombstones, result):
+            tombstone[modified_field] = timestamp
+        return tombstones
 
     @wrap_redis_error
     def create(self, collection_id, parent_id, record, id_generator=None,
@@ -142,29 +354,11 @@ class Storage(MemoryBasedStorage):
 
         record = record.copy()
         id_generator = id_generator or self.id_generator
-        _id = record.setdefault(id_field, id_generator())
-        self.set_record_timestamp(collection_id, parent_id, record,
-                                  modified_field=modified_field)
-
-        record_key = '{0}.{1}.{2}.records'.format(collection_id,
-                                                  parent_id,
-                                                  _id)
-        with self._client.pipeline() as multi:
-            multi.set(
-                record_key,
-                self._encode(record)
-            )
-            multi.sadd(
-                '{0}.{1}.records'.format(collection_id, parent_id),
-                _id
-            )
-            multi.srem(
-                '{0}.{1}.deleted'.format(collection_id, parent_id),
-                _id
-            )
-            multi.execute()
-
-        return record
+        record.setdefault(id_field, id_generator())
+        created = self._write_records(collection_id, parent_id, [record],
+                                      id_field, modified_field,
+                                      undelete=True)
+        return created[0]
 
     @wrap_redis_error
     def get(self, collection_id, parent_id, object_id,
@@ -180,6 +374,18 @@ class Storage(MemoryBasedStorage):
 
         return self._decode(encoded_item)
 
+    @wrap_redis_error
+    def object_timestamp(self, collection_id, parent_id, object_id,
+                         id_field=DEFAULT_ID_FIELD,
+                         modified_field=DEFAULT_MODIFIED_FIELD,
+                         auth=None):
+        # Read from the index of records sorted by timestamp.
+        ids_key = '{0}.{1}.records'.format(collection_id, parent_id)
+        timestamp = self._client.zscore(ids_key + '.timestamps', object_id)
+        if timestamp is None:
+            raise exceptions.RecordNotFoundError(object_id)
+        return int(timestamp)
+
     @wrap_redis_error
     def update(self, collection_id, parent_id, object_id, record,
                unique_fields=None, id_field=DEFAULT_ID_FIELD,
@@ -190,24 +396,10 @@ class Storage(MemoryBasedStorage):
         self.check_unicity(collection_id, parent_id, record,
                            unique_fields=unique_fields, id_field=id_field)
 
-        self.set_record_timestamp(collection_id, parent_id, record,
-                                  modified_field=modified_field)
-
-        record_key = '{0}.{1}.{2}.records'.format(collection_id,
-                                                  parent_id,
-                                                  object_id)
-        with self._client.pipeline() as multi:
-            multi.set(
-                record_key,
-                self._encode(record)
-            )
-            multi.sadd(
-                '{0}.{1}.records'.format(collection_id, parent_id),
-                object_id
-            )
-            multi.execute()
-
-        return record
+        updated = self._write_records(collection_id, parent_id, [record],
+                                      id_field, modified_field,
+                                      undelete=False)
+        return updated[0]
 
     @wrap_redis_error
     def delete(self, collection_id, parent_id, object_id,
@@ -215,49 +407,95 @@ class Storage(MemoryBasedStorage):
                modified_field=DEFAULT_MODIFIED_FIELD,
                deleted_field=DEFAULT_DELETED_FIELD,
                auth=None, last_modified=None):
-        record_key = '{0}.{1}.{2}.records'.format(collection_id,
-                                                  parent_id,
-                                                  object_id)
+        deleted = self._delete_records(collection_id, parent_id, [object_id],
+                                       with_deleted, id_field,
+                                       modified_field, deleted_field,
+                                       last_modified=last_modified)
+        return deleted[0]
+
+    @wrap_redis_error
+    def create_many(self, collection_id, parent_id, records,
+                    id_generator=None, unique_fields=None,
+                    id_field=DEFAULT_ID_FIELD,
+                    modified_field=DEFAULT_MODIFIED_FIELD,
+                    auth=None):
+        if unique_fields:
+            # Unicity is checked on records filtered in memory, one by one.
+            return super(Storage, self).create_many(
+                collection_id, parent_id, records,
+                id_generator=id_generator, unique_fields=unique_fields,
+                id_field=id_field, modified_field=modified_field, auth=auth)
+
+        if not records:
+            return []
+
+        id_generator = id_generator or self.id_generator
+        records = [record.copy() for record in records]
+        self._check_ids_unicity(collection_id, parent_id,
+                                [r for r in records if id_field in r],
+                                id_field, modified_field)
+        for record in records:
+            record.setdefault(id_field, id_generator())
+
+        return self._write_records(collection_id, parent_id, records,
+                                   id_field, modified_field, undelete=True)
+
+    def _check_ids_unicity(self, collection_id, parent_id, records,
+                           id_field, modified_field):
+        """Check that the ids of the specified records are not used twice,
+        nor by existing records.
+        """
+        seen = {}
+        for record in records:
+            object_id = record[id_field]
+            if object_id in seen:
+                raise exceptions.UnicityError(id_field, seen[object_id])
+            seen[object_id] = record
+
+        object_ids = list(seen.keys())
+        records_ids_key = '{0}.{1}.records'.format(collection_id, parent_id)
         with self._client.pipeline() as multi:
-            multi.get(record_key)
-            multi.delete(record_key)
-            multi.srem(
-                '{0}.{1}.records'.format(collection_id, parent_id),
-                object_id
-            )
-            responses = multi.execute()
-
-        encoded_item = responses[0]
-        if encoded_item is None:
-            raise exceptions.RecordNotFoundError(object_id)
+            for object_id in object_ids:
+                multi.sismember(records_ids_key, object_id)
+            exist = multi.execute()
 
-        existing = self._decode(encoded_item)
-
-        # Need to delete the last_modified field.
-        del existing[modified_field]
-
-        self.set_record_timestamp(collection_id, parent_id, existing,
-                                  modified_field=modified_field,
-                                  last_modified=last_modified)
-        existing = self.strip_deleted_record(collection_id, parent_id,
-                                             existing)
-
-        if with_deleted:
-            deleted_record_key = '{0}.{1}.{2}.deleted'.format(collection_id,
-                                                              parent_id,
-                                                              object_id)
-            with self._client.pipeline() as multi:
-                multi.set(
-                    deleted_record_key,
-                    self._encode(existing)
-                )
-                multi.sadd(
-                    '{0}.{1}.deleted'.format(collection_id, parent_id),
-                    object_id
-                )
-                multi.execute()
-
-        return existing
+        for object_id, exists in zip(object_ids, exist):
+            if exists:
+                existing = self.get(collection_id, parent_id, object_id,
+                                    id_field=id_field,
+                                    modified_field=modified_field)
+                raise exceptions.UnicityError(id_field, existing)
+
+    @wrap_redis_error
+    def update_many(self, collection_id, parent_id, records,
+                    unique_fields=None, id_field=DEFAULT_ID_FIELD,
+                    modified_field=DEFAULT_MODIFIED_FIELD,
+                    auth=None):
+        if unique_fields:
+            # Unicity is checked on records filtered in memory, one by one.
+            return super(Storage, self).update_many(
+                collection_id, parent_id, records,
+                unique_fields=unique_fields, id_field=id_field,
+                modified_field=modified_field, auth=auth)
+
+        if not records:
+            return []
+
+        return self._write_records(collection_id, parent_id, records,
+                                   id_field, modified_field, undelete=False)
+
+    @wrap_redis_error
+    def delete_many(self, collection_id, parent_id, object_ids,
+                    with_deleted=True, id_field=DEFAULT_ID_FIELD,
+                    modified_field=DEFAULT_MODIFIED_FIELD,
+                    deleted_field=DEFAULT_DELETED_FIELD,
+                    auth=None):
+        if not object_ids:
+            return []
+
+        return self._delete_records(collection_id, parent_id, object_ids,
+                                    with_deleted, id_field, modified_field,
+                                    deleted_field)
 
     @wrap_redis_error
     def purge_deleted(self, collection_id, parent_id, before=None,
@@ -287,6 +525,7 @@ class Storage(MemoryBasedStorage):
                 pipe.delete(*['{0}.{1}.{2}.deleted'.format(
                     collection_id, parent_id, _id) for _id in to_remove])
                 pipe.srem(deleted_ids, *to_remove)
+                pipe.zrem(deleted_ids + '.timestamps', *to_remove)
                 pipe.execute()
         number_deleted = len(to_remove)
         return number_deleted
@@ -297,13 +536,24 @@ class Storage(MemoryBasedStorage):
                 id_field=DEFAULT_ID_FIELD,
                 modified_field=DEFAULT_MODIFIED_FIELD,
                 deleted_field=DEFAULT_DELETED_FIELD,
-                auth=None):
+                auth=None, count_total=True):
+        timestamps_range = _timestamps_range(filters, sorting,
+                                             pagination_rules,
+                                             modified_field)
+        if timestamps_range is not None:
+            result = self._get_all_from_index(collection_id, parent_id,
+                                              timestamps_range, limit,
+                                              include_deleted,
+                                              modified_field, count_total)
+            if result is not None:
+                return result
+
         records_ids_key = '{0}.{1}.records'.format(collection_id, parent_id)
         ids = self._client.smembers(records_ids_key)
 
-        keys = ('{0}.{1}.{2}.records'.format(collection_id, parent_id,
+        keys = ['{0}.{1}.{2}.records'.format(collection_id, parent_id,
                                              _id.decode('utf-8'))
-                for _id in ids)
+                for _id in ids]
 
         if len(ids) == 0:
             records = []
@@ -332,9 +582,140 @@ class Storage(MemoryBasedStorage):
                                                  id_field, deleted_field,
                                                  pagination_rules, limit)
 
+        if not count_total:
+            count = None
+
+        return records, count
+
+    def _get_all_from_index(self, collection_id, parent_id, timestamps_range,
+                            limit, include_deleted, modified_field,
+                            count_total):
+        """Fetch only the records of the page, using the indices of ids
+        sorted by timestamps.
+
+        :returns: ``None`` if the indices are not complete (e.g. records
+            stored by previous versions), see :meth:`initialize_schema`.
+        """
+        filtered_bounds, page_bounds, direction = timestamps_range
+        lower, upper = page_bounds
+        kinds = ('records', 'deleted') if include_deleted else ('records',)
+
+        with self._client.pipeline() as pipe:
+            for kind in kinds:
+                ids_key = '{0}.{1}.{2}'.format(collection_id, parent_id, kind)
+                pipe.scard(ids_key)
+                pipe.zcard(ids_key + '.timestamps')
+                if direction < 0:
+                    pipe.zrevrangebyscore(ids_key + '.timestamps',
+                                          upper, lower,
+                                          start=0 if limit else None,
+                                          num=limit)
+                else:
+                    pipe.zrangebyscore(ids_key + '.timestamps',
+                                       lower, upper,
+                                       start=0 if limit else None,
+                                       num=limit)
+            pipe.zcount('{0}.{1}.records.timestamps'.format(collection_id,
+                                                            parent_id),
+                        *filtered_bounds)
+            responses = pipe.execute()
+
+        records = []
+        for i, kind in enumerate(kinds):
+            size, indexed, ids = responses[i * 3:(i + 1) * 3]
+            if size != indexed:
+                return None
+            if not ids:
+                continue
+            keys = ['{0}.{1}.{2}.{3}'.format(collection_id, parent_id,
+                                             _id.decode('utf-8'), kind)
+                    for _id in ids]
+            encoded_results = self._client.mget(keys)
+            records += [self._decode(r) for r in encoded_results if r]
+
+        # Merge records and tombstones pages.
+        records = sorted(records, key=lambda r: r[modified_field],
+                         reverse=direction < 0)
+        if limit:
+            records = records[:limit]
+
+        count = responses[-1] if count_total else None
         return records, count
 
 
+def _timestamps_range(filters, sorting, pagination_rules, modified_field):
+    """Convert the filters and pagination rules into ranges of timestamps,
+    if they only apply to timestamps and if records are sorted by timestamp.
+
+    :returns: the bounds of the filtered records (for ``ZCOUNT``), the
+        bounds of the current page (for ``ZRANGEBYSCORE``), and the sorting
+        direction, or ``None`` if not applicable.
+    :rtype: tuple
+    """
+    sorting = sorting or []
+    if len(sorting) > 1:
+        return None
+    if sorting and sorting[0].field != modified_field:
+        return None
+    direction = sorting[0].direction if sorting else -1
+
+    pagination_rules = pagination_rules or []
+    if len(pagination_rules) > 1:
+        return None
+    filters = list(filters or [])
+    pagination_filters = [f for rule in pagination_rules for f in rule]
+
+    filtered_bounds = _timestamps_bounds(filters, modified_field)
+    page_bounds = _timestamps_bounds(filters + pagination_filters,
+                                     modified_field)
+    if filtered_bounds is None or page_bounds is None:
+        return None
+    return filtered_bounds, page_bounds, direction
+
+
+def _timestamps_bounds(filters, modified_field):
+    """Combine the filters on timestamps into the bounds of a range of
+    scores (e.g. ``(1234`` for an exclusive bound).
+    """
+    lower = upper = None
+    lower_exclusive = upper_exclusive = False
+    for filtr in filters:
+        if filtr.field != modified_field:
+            return None
+        if not isinstance(filtr.value, six.integer_types):
+            return None
+        value = filtr.value
+        if filtr.operator in (COMPARISON.GT, COMPARISON.MIN, COMPARISON.EQ):
+            exclusive = filtr.operator == COMPARISON.GT
+            if (lower is None or value > lower or
+                    (value == lower and exclusive)):
+                lower, lower_exclusive = value, exclusive
+        if filtr.operator in (COMPARISON.LT, COMPARISON.MAX, COMPARISON.EQ):
+            exclusive = filtr.operator == COMPARISON.LT
+            if (upper is None or value < upper or
+                    (value == upper and exclusive)):
+                upper, upper_exclusive = value, exclusive
+        if filtr.operator not in (COMPARISON.GT, COMPARISON.MIN,
+                                  COMPARISON.LT, COMPARISON.MAX,
+                                  COMPARISON.EQ):
+            return None
+
+    def score(value, exclusive, default):
+        if value is None:
+            return default
+        return '({0}'.format(value) if exclusive else value
+
+    return (score(lower, lower_exclusive, '-inf'),
+            score(upper, upper_exclusive, '+inf'))
+
+
+def _script_keys(collection_id, parent_id):
+    """Keys of the collection accessed by the write scripts.
+    """
+    return ['{0}.{1}.{2}'.format(collection_id, parent_id, key)
+            for key in ('timestamp', 'records', 'deleted')]
+
+
 def load_from_config(config):
     client = create_from_config(config, prefix='storage_')
     return Storage(client)
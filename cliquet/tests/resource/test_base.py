@@ -36,6 +36,35 @@ class ResourceTest(BaseTest):
                 self.resource_class(request)
                 self.assertIn('writable', cm.exception.message)
 
+    def test_timestamp_is_shared_by_resources_of_the_same_request(self):
+        request = self.get_request()
+        resource = self.resource_class(request)
+        with mock.patch.object(request.registry.storage,
+                               'collection_timestamp') as mocked:
+            other = self.resource_class(request)
+            self.assertFalse(mocked.called)
+        self.assertEqual(other.timestamp, resource.timestamp)
+
+    def test_timestamp_is_fetched_again_after_a_write(self):
+        request = self.get_request()
+        resource = self.resource_class(request)
+        resource.model.create_record({})
+        other = self.resource_class(request)
+        self.assertGreater(other.timestamp, resource.timestamp)
+
+    def test_timestamps_are_dropped_on_deletions_of_every_parent(self):
+        request = self.get_request()
+        resource = self.resource_class(request)
+        self.assertNotEqual(resource.model.timestamps, {})
+        resource.model.delete_records(parent_id='*')
+        self.assertEqual(resource.model.timestamps, {})
+
+    def test_timestamp_is_not_shared_between_requests(self):
+        resource = self.resource_class(self.get_request())
+        resource.model.create_record({})
+        other = self.resource_class(self.get_request())
+        self.assertGreater(other.timestamp, resource.timestamp)
+
 
 class ShareableResourceTest(BaseTest):
     resource_class = ShareableResource
@@ -1,4 +1,5 @@
 import mock
+import time
 import uuid
 from contextlib import contextmanager
 
@@ -7,6 +8,7 @@ from pyramid.config import Configurator
 
 from cliquet.events import (ResourceChanged, AfterResourceChanged,
                             ResourceRead, AfterResourceRead, ACTIONS)
+from cliquet.resource import UserResource
 from cliquet.storage.exceptions import BackendError
 from cliquet.tests.testapp import main as testapp
 from cliquet.tests.support import unittest, BaseWebTest, get_request_class
@@ -298,6 +300,57 @@ class ImpactedRecordsTest(BaseEventTest, unittest.TestCase):
         self.assertEqual(impacted_records[0]['old']['deleted'], True)
 
 
+class StreamedCollectionTest(BaseEventTest, unittest.TestCase):
+
+    subscribed = (ResourceChanged, ResourceRead)
+
+    def get_app_settings(self, extras=None):
+        parent = super(StreamedCollectionTest, self)
+        settings = parent.get_app_settings(extras)
+        settings['stream_collections'] = 'true'
+        return settings
+
+    def setUp(self):
+        super(StreamedCollectionTest, self).setUp()
+        for i in range(3):
+            self.app.post_json(self.collection_url, self.body,
+                               headers=self.headers)
+        self.events = []
+
+    def test_read_of_every_chunk_is_sent_in_one_event(self):
+        with mock.patch('cliquet.resource.STREAMING_CHUNK_SIZE', 2):
+            resp = self.app.get(self.collection_url, headers=self.headers)
+
+        self.assertEqual(len(self.events), 1)
+        self.assertEqual(self.events[0].payload['action'],
+                         ACTIONS.READ.value)
+        self.assertEqual(self.events[0].read_records, resp.json['data'])
+
+    def test_deletion_of_every_chunk_is_sent_in_one_event(self):
+        with mock.patch('cliquet.resource.STREAMING_CHUNK_SIZE', 2):
+            self.app.delete(self.collection_url, headers=self.headers)
+
+        self.assertEqual(len(self.events), 1)
+        self.assertEqual(self.events[0].payload['action'],
+                         ACTIONS.DELETE.value)
+        self.assertEqual(len(self.events[0].impacted_records), 3)
+
+    def test_deletion_is_notified_once_per_chunk(self):
+        postprocess = UserResource.postprocess
+        with mock.patch.object(UserResource, 'postprocess', autospec=True,
+                               side_effect=postprocess) as mocked:
+            with mock.patch('cliquet.resource.STREAMING_CHUNK_SIZE', 2):
+                self.app.delete(self.collection_url, headers=self.headers)
+        self.assertEqual(mocked.call_count, 2)
+
+    def test_deletion_of_nothing_sends_no_change_event(self):
+        self.app.delete(self.collection_url, headers=self.headers)
+        self.events = []
+        self.app.delete(self.collection_url, headers=self.headers)
+        changes = [e for e in self.events if isinstance(e, ResourceChanged)]
+        self.assertEqual(len(changes), 0)
+
+
 class BatchEventsTest(BaseEventTest, unittest.TestCase):
 
     subscribed = (ResourceChanged, ResourceRead)
@@ -352,6 +405,18 @@ class BatchEventsTest(BaseEventTest, unittest.TestCase):
         self.app.post_json("/batch", body, headers=self.headers)
         self.assertEqual(len(self.events), 2)
 
+    def test_records_created_at_once_are_impacted_in_requests_order(self):
+        body = {
+            "defaults": {"method": "POST", "path": '/mushrooms'},
+            "requests": [{"body": {'data': {'name': name}}}
+                         for name in ('foo', 'bar', 'baz')]
+        }
+        resp = self.app.post_json("/batch", body, headers=self.headers)
+        created = [r['body']['data'] for r in resp.json['responses']]
+        self.assertEqual(len(self.events), 1)
+        impacted = self.events[0].impacted_records
+        self.assertEqual([r['new'] for r in impacted], created)
+
     def test_one_event_is_sent_per_action(self):
         body = {
             "defaults": {
@@ -391,6 +456,40 @@ class BatchEventsTest(BaseEventTest, unittest.TestCase):
         self.assertEqual(len(self.events), 0)
 
 
+class ParallelBatchEventsTest(BaseEventTest, unittest.TestCase):
+
+    subscribed = (ResourceRead,)
+
+    def get_app_settings(self, extras=None):
+        settings = super(ParallelBatchEventsTest,
+                         self).get_app_settings(extras)
+        settings['batch_parallel_requests'] = 4
+        return settings
+
+    def test_read_records_are_merged_in_requests_order(self):
+        records = []
+        for i in range(2):
+            resp = self.app.post_json(self.collection_url, self.body,
+                                      headers=self.headers)
+            records.append(resp.json['data'])
+        first = records[0]['id']
+        original = self.storage.get
+
+        def slow_get(*args, **kwargs):
+            # The first subrequest finishes after the second one.
+            if kwargs.get('object_id') == first:
+                time.sleep(0.1)
+            return original(*args, **kwargs)
+
+        body = {'requests': [{'path': self.get_item_url(r['id'])}
+                             for r in records]}
+        with mock.patch.object(self.storage, 'get', side_effect=slow_get):
+            self.app.post_json('/batch', body, headers=self.headers)
+        self.assertEqual(len(self.events), 1)
+        read_ids = [r['id'] for r in self.events[0].read_records]
+        self.assertEqual(read_ids, [r['id'] for r in records])
+
+
 def load_from_config(config, prefix):
     class ClassListener(object):
         def __call__(self, event):
@@ -27,6 +27,17 @@ class ModelTest(BaseTest):
         self.assertEqual(len(records), 1)
         self.assertDictEqual(records[0], self.record)
 
+    def test_iter_records_yields_all_records(self):
+        records = list(self.model.iter_records())
+        self.assertEqual(records, [self.record])
+
+    def test_create_records_creates_them_in_specified_order(self):
+        created = self.model.create_records([{'field': 'a'},
+                                             {'field': 'b'}])
+        self.assertEqual([r['field'] for r in created], ['a', 'b'])
+        for record in created:
+            self.assertEqual(self.model.get_record(record['id']), record)
+
 
 class CreateTest(BaseTest):
     def setUp(self):
@@ -149,6 +149,19 @@ class SpecifyRecordPermissionTest(PermissionTest):
         self.assertEqual(sorted(result['permissions']['write']),
                          ['basicauth:userid', 'jean-louis'])
 
+    def test_permissions_are_set_in_a_single_backend_call(self):
+        perms = {'write': ['jean-louis']}
+        self.resource.request.validated['permissions'] = perms
+        self.resource.request.method = 'PUT'
+        with mock.patch.object(self.permission, 'set_object_permissions',
+                               wraps=self.permission.set_object_permissions
+                               ) as mocked:
+            result = self.resource.put()
+        mocked.assert_called_once_with(self.record_uri, perms,
+                                       owner='basicauth:userid')
+        self.assertEqual(sorted(result['permissions']['write']),
+                         ['basicauth:userid', 'jean-louis'])
+
     def test_412_errors_do_not_put_permission_in_record(self):
         self.resource.request.headers['If-Match'] = '"1234567"'  # invalid
         try:
@@ -113,6 +113,65 @@ class PaginationTest(BaseTest):
         self.resource.collection_get()
         self.assertNotIn('Next-Page', self.last_response.headers)
 
+    def test_total_records_is_not_counted_again_on_next_pages(self):
+        self.resource.request.GET = {'_limit': '10'}
+        self.resource.collection_get()
+        self._setup_next_page()
+        with mock.patch.object(self.model.storage, 'get_all',
+                               wraps=self.model.storage.get_all) as mocked:
+            self.resource.collection_get()
+            self.assertFalse(mocked.call_args[1]['count_total'])
+        self.assertEqual(self.last_response.headers['Total-Records'], '20')
+
+    def test_next_page_is_detected_without_counting_records(self):
+        self.resource.request.GET = {'_limit': '5'}
+        self.resource.collection_get()
+        self._setup_next_page()
+        self.resource.collection_get()
+        self.assertIn('Next-Page', self.last_response.headers)
+        self._setup_next_page()
+        self.resource.collection_get()
+        self._setup_next_page()
+        results = self.resource.collection_get()
+        self.assertEqual(len(results['data']), 5)
+        self.assertNotIn('Next-Page', self.last_response.headers)
+
+    def test_next_pages_are_given_if_limit_is_storage_max_fetch_size(self):
+        # Like the PostgreSQL backend, never return more than this number
+        # of records.
+        get_records = self.model.get_records
+
+        def capped_get_records(**kwargs):
+            kwargs['limit'] = min(kwargs['limit'], 5)
+            return get_records(**kwargs)
+
+        settings = self.resource.request.registry.settings
+        with mock.patch.dict(settings, [('storage_max_fetch_size', 5)]):
+            with mock.patch.object(self.model, 'get_records',
+                                   side_effect=capped_get_records):
+                self.resource.request.GET = {'_limit': '5'}
+                results = self.resource.collection_get()
+                records = results['data']
+                while 'Next-Page' in self.last_response.headers:
+                    self._setup_next_page()
+                    records += self.resource.collection_get()['data']
+        self.assertEqual(len(set(r['id'] for r in records)), 20)
+
+    def test_limit_is_not_capped_by_storage_max_fetch_size(self):
+        settings = self.resource.request.registry.settings
+        with mock.patch.dict(settings, [('storage_max_fetch_size', 5)]):
+            self.resource.request.GET = {'_limit': '5'}
+            results = self.resource.collection_get()
+        self.assertEqual(len(results['data']), 5)
+
+    def test_tokens_without_total_records_are_still_supported(self):
+        token = self.resource._build_pagination_token(
+            [('last_modified', -1)], {'last_modified': 2 ** 62}, 0)
+        self.resource.request.GET = {'_limit': '10', '_token': token}
+        self.resource.collection_get()
+        self.assertEqual(self.last_response.headers['Total-Records'], '20')
+        self.assertIn('Next-Page', self.last_response.headers)
+
     def test_handle_simple_sorting(self):
         self.resource.request.GET = {'_sort': '-status', '_limit': '20'}
         expected_results = self.resource.collection_get()
@@ -186,6 +245,14 @@ class PaginationTest(BaseTest):
             '_token': b64encode(badtoken.encode('ascii')).decode('ascii')}
         self.assertRaises(HTTPBadRequest, self.resource.collection_get)
 
+    def test_raises_bad_request_if_token_has_invalid_total(self):
+        invalid_token = json.dumps({'last_record': {}, 'offset': 0,
+                                    'total_records': 'abc'})
+        self.resource.request.GET = {
+            '_since': '123', '_limit': '20',
+            '_token': b64encode(invalid_token.encode('ascii')).decode('ascii')}
+        self.assertRaises(HTTPBadRequest, self.resource.collection_get)
+
     def test_raises_bad_request_if_token_has_bad_data_structure(self):
         invalid_token = json.dumps([[('last_modified', 0, '>')]])
         self.resource.request.GET = {
@@ -210,6 +277,13 @@ class BuildPaginationTokenTest(BaseTest):
         tokeninfo = json.loads(b64decode(token).decode('ascii'))
         self.assertEqual(tokeninfo['offset'], 42)
 
+    def test_token_contains_total_records_if_provided(self):
+        token = self.resource._build_pagination_token([('last_modified', -1)],
+                                                      self.record,
+                                                      42, 120)
+        tokeninfo = json.loads(b64decode(token).decode('ascii'))
+        self.assertEqual(tokeninfo['total_records'], 120)
+
     def test_no_sorting_default_to_modified_field(self):
         token = self.resource._build_pagination_token([('last_modified', -1)],
                                                       self.record,
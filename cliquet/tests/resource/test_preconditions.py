@@ -1,3 +1,4 @@
+import mock
 from pyramid import httpexceptions
 
 from cliquet.errors import ERRORS
@@ -28,6 +29,12 @@ class NotModifiedTest(BaseTest):
         self.assertIsNotNone(error.headers.get('ETag'))
         self.assertIsNotNone(error.headers.get('Last-Modified'))
 
+    def test_collection_timestamp_is_not_fetched_again_for_304(self):
+        with mock.patch.object(self.storage, 'collection_timestamp') as m:
+            self.assertRaises(httpexceptions.HTTPNotModified,
+                              self.resource.collection_get)
+            self.assertFalse(m.called)
+
     def test_single_record_returns_304_if_no_change_meanwhile(self):
         self.resource.record_id = self.stored['id']
         try:
@@ -38,6 +45,24 @@ class NotModifiedTest(BaseTest):
         self.assertIsNotNone(error.headers.get('ETag'))
         self.assertIsNotNone(error.headers.get('Last-Modified'))
 
+    def test_single_record_data_is_not_fetched_for_304(self):
+        self.resource.record_id = self.stored['id']
+        with mock.patch.object(self.resource.model, 'get_record') as mocked:
+            self.assertRaises(httpexceptions.HTTPNotModified,
+                              self.resource.get)
+            self.assertFalse(mocked.called)
+
+    def test_single_record_is_returned_if_changed_meanwhile(self):
+        self.resource.request.headers['If-None-Match'] = '"42"'
+        self.resource.record_id = self.stored['id']
+        result = self.resource.get()
+        self.assertEqual(result['data']['id'], self.stored['id'])
+
+    def test_single_record_returns_404_if_missing_with_if_none_match(self):
+        self.resource.record_id = self.stored['id']
+        self.model.delete_record(self.stored)
+        self.assertRaises(httpexceptions.HTTPNotFound, self.resource.get)
+
     def test_single_record_last_modified_is_returned(self):
         self.resource.timestamp = 0
         self.resource.record_id = self.stored['id']
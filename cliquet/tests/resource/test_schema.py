@@ -70,6 +70,39 @@ class ResourceSchemaTest(unittest.TestCase):
         self.assertNotIn('foo', deserialized)
 
 
+class StaticSchemaMixinTest(unittest.TestCase):
+    def test_schema_is_not_cloned_if_nothing_is_deferred(self):
+        class Payload(schema.StaticSchemaMixin, colander.MappingSchema):
+            name = colander.SchemaNode(colander.String())
+
+        payload = Payload()
+        self.assertIs(payload.bind(request=None), payload)
+
+    def test_schema_is_bound_if_a_child_has_deferred_values(self):
+        @colander.deferred
+        def default_name(node, kw):
+            return kw['name']
+
+        class Payload(schema.StaticSchemaMixin, colander.MappingSchema):
+            name = colander.SchemaNode(colander.String(),
+                                       missing=default_name)
+
+        payload = Payload()
+        bound = payload.bind(name='mat')
+        self.assertIsNot(bound, payload)
+        self.assertEqual(bound.deserialize({}), {'name': 'mat'})
+
+    def test_schema_is_bound_if_it_has_an_after_bind_callback(self):
+        def after_bind(node, kw):
+            node.title = kw['title']
+
+        class Payload(schema.StaticSchemaMixin, colander.MappingSchema):
+            pass
+
+        payload = Payload(after_bind=after_bind)
+        self.assertEqual(payload.bind(title='Yo').title, 'Yo')
+
+
 class PermissionsSchemaTest(unittest.TestCase):
 
     def setUp(self):
@@ -97,6 +130,10 @@ class PermissionsSchemaTest(unittest.TestCase):
                           self.schema.deserialize,
                           perms)
 
+    def test_schema_is_not_altered_by_deserialization(self):
+        self.schema.deserialize({'can_cook': ['mat']})
+        self.assertEqual(self.schema.children, [])
+
     def test_raises_invalid_if_not_list(self):
         perms = {'can_cook': 3.14}
         self.assertRaises(colander.Invalid,
@@ -777,3 +777,114 @@ class SchemaLessPartialResponseTest(BaseWebTest, unittest.TestCase):
         resp = self.app.get(self.collection_url + '?_fields=nationality')
         result = resp.json['data'][0]
         self.assertNotIn('nationality', result)
+
+
+class StreamedCollectionTest(BaseWebTest, unittest.TestCase):
+    def get_app_settings(self, extras=None):
+        settings = super(StreamedCollectionTest, self).get_app_settings(extras)
+        settings['stream_collections'] = 'true'
+        return settings
+
+    def setUp(self):
+        super(StreamedCollectionTest, self).setUp()
+        for i in range(3):
+            body = {'data': {'name': 'Champignon %s' % i}}
+            self.app.post_json(self.collection_url, body,
+                               headers=self.headers)
+
+    def test_records_are_streamed_if_collection_is_not_paginated(self):
+        with mock.patch('cliquet.resource.Model.get_records') as get_records:
+            resp = self.app.get(self.collection_url, headers=self.headers)
+        self.assertFalse(get_records.called)
+        self.assertEqual(len(resp.json['data']), 3)
+        self.assertEqual(resp.headers['Total-Records'], '3')
+        self.assertEqual(resp.headers['Content-Type'],
+                         'application/json; charset=UTF-8')
+        self.assertEqual(int(resp.headers['Content-Length']), len(resp.body))
+
+    def test_streamed_records_are_the_same_as_rendered_ones(self):
+        url = self.collection_url + '?_sort=name&_fields=name'
+        streamed = self.app.get(url, headers=self.headers).json
+        with mock.patch.dict(self.app.app.registry.settings,
+                             [('stream_collections', 'false')]):
+            rendered = self.app.get(url, headers=self.headers).json
+        self.assertEqual(streamed, rendered)
+
+    def test_records_are_not_streamed_if_collection_is_paginated(self):
+        url = self.collection_url + '?_limit=2'
+        with mock.patch('cliquet.resource.Model.iter_records') as iterated:
+            resp = self.app.get(url, headers=self.headers)
+        self.assertFalse(iterated.called)
+        self.assertEqual(len(resp.json['data']), 2)
+        self.assertIn('Next-Page', resp.headers)
+
+    def test_streamed_records_are_limited_by_max_fetch_size(self):
+        with mock.patch.dict(self.app.app.registry.settings,
+                             [('storage_max_fetch_size', 2)]):
+            resp = self.app.get(self.collection_url, headers=self.headers)
+            self.assertEqual(len(resp.json['data']), 2)
+            self.assertEqual(resp.headers['Total-Records'], '3')
+            next_page = resp.headers['Next-Page'].replace(
+                'http://localhost/v0', '')
+            resp = self.app.get(next_page, headers=self.headers)
+        self.assertEqual(len(resp.json['data']), 1)
+        self.assertNotIn('Next-Page', resp.headers)
+
+    def test_no_next_page_is_given_if_max_fetch_size_is_not_exceeded(self):
+        with mock.patch.dict(self.app.app.registry.settings,
+                             [('storage_max_fetch_size', 3)]):
+            resp = self.app.get(self.collection_url, headers=self.headers)
+        self.assertEqual(len(resp.json['data']), 3)
+        self.assertEqual(resp.headers['Total-Records'], '3')
+        self.assertNotIn('Next-Page', resp.headers)
+
+    def test_deleted_records_are_not_counted(self):
+        resp = self.app.get(self.collection_url, headers=self.headers)
+        timestamp = resp.headers['ETag'][1:-1]
+        record = resp.json['data'][0]
+        self.app.delete(self.get_item_url(record['id']), headers=self.headers)
+        url = self.collection_url + '?_since=%s' % timestamp
+        resp = self.app.get(url, headers=self.headers)
+        self.assertEqual(resp.json['data'][0]['deleted'], True)
+        self.assertEqual(resp.headers['Total-Records'], '0')
+
+    def test_large_bodies_are_written_on_disk(self):
+        with mock.patch('cliquet.resource.STREAMING_SPOOL_SIZE', 10):
+            resp = self.app.get(self.collection_url, headers=self.headers)
+        self.assertEqual(len(resp.json['data']), 3)
+
+    def test_records_can_be_streamed_in_batch_requests(self):
+        body = {'requests': [{'method': 'GET', 'path': self.collection_url}]}
+        resp = self.app.post_json('/batch', body, headers=self.headers)
+        response, = resp.json['responses']
+        self.assertEqual(len(response['body']['data']), 3)
+
+    def test_collection_deletion_is_streamed(self):
+        with mock.patch('cliquet.resource.STREAMING_CHUNK_SIZE', 2):
+            resp = self.app.delete(self.collection_url, headers=self.headers)
+        self.assertEqual(len(resp.json['data']), 3)
+        self.assertTrue(all(r['deleted'] for r in resp.json['data']))
+        self.assertEqual(int(resp.headers['Content-Length']), len(resp.body))
+        resp = self.app.get(self.collection_url, headers=self.headers)
+        self.assertEqual(len(resp.json['data']), 0)
+
+    def test_collection_deletion_deletes_records_by_chunks(self):
+        from cliquet.resource import Model
+        delete_records = Model.delete_records
+        with mock.patch('cliquet.resource.STREAMING_CHUNK_SIZE', 2):
+            with mock.patch.object(Model, 'delete_records', autospec=True,
+                                   side_effect=delete_records) as deleted:
+                self.app.delete(self.collection_url, headers=self.headers)
+        self.assertEqual(deleted.call_count, 2)
+
+    def test_collection_deletion_of_nothing_is_streamed(self):
+        self.app.delete(self.collection_url, headers=self.headers)
+        resp = self.app.delete(self.collection_url, headers=self.headers)
+        self.assertEqual(resp.json['data'], [])
+
+    def test_collection_deletion_can_be_filtered(self):
+        url = self.collection_url + '?name=Champignon 1'
+        resp = self.app.delete(url, headers=self.headers)
+        self.assertEqual(len(resp.json['data']), 1)
+        resp = self.app.get(self.collection_url, headers=self.headers)
+        self.assertEqual(len(resp.json['data']), 2)
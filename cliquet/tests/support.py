@@ -42,6 +42,7 @@ class DummyRequest(mock.MagicMock):
         self.json = {}
         self.validated = {}
         self.matchdict = {}
+        self.bound_data = {}
         self.response = mock.MagicMock(headers={})
 
         def route_url(*a, **kw):
@@ -99,7 +100,7 @@ class BaseWebTest(object):
         settings = DEFAULT_SETTINGS.copy()
 
         settings['storage_backend'] = 'cliquet.storage.redis'
-        settings['cache_backend'] = 'cliquet.cache.redis'
+        settings['cache_backend'] = 'cliquet.cache.memory'
         settings['permission_backend'] = 'cliquet.permission.redis'
 
         settings['project_name'] = 'myapp'
@@ -97,6 +97,26 @@ class BasicAuthenticationPolicyTest(unittest.TestCase):
 
         self.assertNotEqual(user_id1, user_id2)
 
+    @mock.patch('cliquet.utils.hmac_digest')
+    def test_userid_is_computed_once_per_bound_data(self, mocked):
+        mocked.return_value = 'yeah'
+        self.request.bound_data = {}
+        self.policy.unauthenticated_userid(self.request)
+        subrequest = DummyRequest()
+        subrequest.headers['Authorization'] = 'Basic bWF0Og=='
+        subrequest.bound_data = self.request.bound_data
+        user_id = self.policy.unauthenticated_userid(subrequest)
+        self.assertEqual(user_id, 'yeah')
+        self.assertEqual(mocked.call_count, 1)
+
+    def test_userid_is_computed_again_if_credentials_differ(self):
+        self.request.bound_data = {}
+        user_id1 = self.policy.unauthenticated_userid(self.request)
+        auth_password = utils.encode64('user:secret', encoding='ascii')
+        self.request.headers['Authorization'] = 'Basic %s' % auth_password
+        user_id2 = self.policy.unauthenticated_userid(self.request)
+        self.assertNotEqual(user_id1, user_id2)
+
     def test_views_are_forbidden_if_basic_is_wrong(self):
         self.request.headers['Authorization'] = 'Basic abc'
         user_id = self.policy.unauthenticated_userid(self.request)
@@ -127,6 +127,75 @@ class RouteFactoryTest(unittest.TestCase):
 
             self.assertEquals(context.allowed_principals, ['fxa:user'])
 
+    def _collection_context(self, storage, permission):
+        with mock.patch('cliquet.utils.current_service') as current_service:
+            current_service().type = 'collection'
+            request = DummyRequest(method='get')
+            request.current_resource_name = 'record'
+            request.registry = mock.Mock(storage=storage,
+                                         permission=permission,
+                                         settings={})
+            with mock.patch.object(RouteFactory, 'get_permission_object_id',
+                                   return_value='/records/*'):
+                return RouteFactory(request)
+
+    def test_shared_records_are_joined_if_backends_share_database(self):
+        client = mock.sentinel.client
+        storage = mock.Mock(client=client)
+        permission = mock.Mock(client=client)
+        permission.accessible_objects.return_value.exists.return_value = True
+        context = self._collection_context(storage, permission)
+
+        shared = context.fetch_shared_records('read', ['alice'], None)
+
+        self.assertEqual(shared, permission.accessible_objects.return_value)
+        self.assertEqual(context.shared_objects, shared)
+        permission.accessible_objects.assert_called_with(
+            permission='read', principals=['alice'],
+            get_bound_permissions=None, object_id_match='/records/*')
+        self.assertFalse(permission.principals_accessible_objects.called)
+
+    def test_no_shared_records_are_joined_if_none_exists(self):
+        client = mock.sentinel.client
+        storage = mock.Mock(client=client)
+        permission = mock.Mock(client=client)
+        permission.accessible_objects.return_value.exists.return_value = False
+        context = self._collection_context(storage, permission)
+
+        shared = context.fetch_shared_records('read', ['alice'], None)
+
+        self.assertEqual(shared, [])
+        self.assertIsNone(context.shared_objects)
+
+    def test_joined_shared_records_ids_are_fetched_if_accessed(self):
+        client = mock.sentinel.client
+        storage = mock.Mock(client=client)
+        permission = mock.Mock(client=client)
+        accessible = permission.accessible_objects.return_value
+        accessible.exists.return_value = True
+        accessible.fetch.return_value = {'/records/abc'}
+        context = self._collection_context(storage, permission)
+
+        context.fetch_shared_records('read', ['alice'], None)
+        self.assertFalse(accessible.fetch.called)
+
+        self.assertEqual(context.shared_ids, ['abc'])
+        self.assertEqual(context.shared_ids, ['abc'])
+        self.assertEqual(accessible.fetch.call_count, 1)
+
+    def test_shared_records_ids_are_fetched_if_backends_differ(self):
+        storage = mock.Mock(client=mock.sentinel.storage_client)
+        permission = mock.Mock(client=mock.sentinel.permission_client)
+        permission.principals_accessible_objects.return_value = [
+            '/records/abc']
+        context = self._collection_context(storage, permission)
+
+        shared = context.fetch_shared_records('read', ['alice'], None)
+
+        self.assertEqual(shared, ['abc'])
+        self.assertIsNone(context.get_shared_objects)
+        self.assertFalse(permission.accessible_objects.called)
+
 
 class AuthorizationPolicyTest(unittest.TestCase):
     def setUp(self):
@@ -8,6 +8,7 @@ from pyramid.exceptions import ConfigurationError
 
 import cliquet
 from cliquet import initialization
+from cliquet.permission.cached import CachedPermission
 from .support import unittest
 
 
@@ -93,6 +94,31 @@ class InitializationTest(unittest.TestCase):
         self.assertFalse(hasattr(config.registry, 'cache'))
         self.assertFalse(hasattr(config.registry, 'permission'))
 
+    def test_permission_is_cached_if_enabled(self):
+        settings = {'cliquet.permission_backend': 'cliquet.permission.memory',
+                    'cliquet.cache_backend': 'cliquet.cache.memory',
+                    'cliquet.permission_cache_ttl_seconds': '10'}
+        config = Configurator(settings=settings)
+        cliquet.initialize(config, '0.0.1', 'project_name')
+        permission = config.registry.permission
+        self.assertIsInstance(permission, CachedPermission)
+        self.assertEqual(permission.cache, config.registry.cache)
+        self.assertEqual(permission.ttl, 10)
+
+    def test_permission_is_not_cached_by_default(self):
+        settings = {'cliquet.permission_backend': 'cliquet.permission.memory',
+                    'cliquet.cache_backend': 'cliquet.cache.memory'}
+        config = Configurator(settings=settings)
+        cliquet.initialize(config, '0.0.1', 'project_name')
+        self.assertNotIsInstance(config.registry.permission, CachedPermission)
+
+    def test_permission_is_not_cached_without_cache_backend(self):
+        settings = {'cliquet.permission_backend': 'cliquet.permission.memory',
+                    'cliquet.permission_cache_ttl_seconds': '10'}
+        config = Configurator(settings=settings)
+        cliquet.initialize(config, '0.0.1', 'project_name')
+        self.assertNotIsInstance(config.registry.permission, CachedPermission)
+
     def test_backends_type_is_checked_when_instantiated(self):
         def config_fails(settings):
             config = Configurator(settings=settings)
@@ -126,6 +152,26 @@ class InitializationTest(unittest.TestCase):
             mocked.assert_called_with(msg, DeprecationWarning)
 
 
+class JSONCodecConfigurationTest(unittest.TestCase):
+    def tearDown(self):
+        cliquet.utils.json.configure()
+
+    def test_ujson_codec_is_used_by_default(self):
+        config = Configurator()
+        cliquet.initialize(config, '0.0.1', 'name')
+        self.assertEqual(cliquet.utils.json.name, 'ujson')
+
+    def test_codec_can_be_specified_in_settings(self):
+        config = Configurator(settings={'cliquet.json_codec': 'json'})
+        cliquet.initialize(config, '0.0.1', 'name')
+        self.assertEqual(cliquet.utils.json.name, 'json')
+
+    def test_raises_configuration_error_if_codec_is_unknown(self):
+        config = Configurator(settings={'cliquet.json_codec': 'unknown'})
+        self.assertRaises(ConfigurationError,
+                          cliquet.initialize, config, '0.0.1', 'name')
+
+
 class ProjectSettingsTest(unittest.TestCase):
     def settings(self, provided):
         config = Configurator(settings=provided)
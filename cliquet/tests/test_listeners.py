@@ -2,7 +2,6 @@
 import json
 import uuid
 from contextlib import contextmanager
-from datetime import datetime
 
 import mock
 from pyramid import testing
@@ -192,9 +191,9 @@ class ListenerCalledTest(unittest.TestCase):
     def test_notification_is_broken(self):
         with self.redis_listening():
             # an event with a bad JSON should silently break and send nothing
-            # date time objects cannot be dumped
+            # arbitrary objects cannot be dumped
             event2 = ResourceChanged(ACTIONS.CREATE,
-                                     datetime.now(),
+                                     object(),
                                      [],
                                      Request())
             self.notify(event2)
@@ -1,13 +1,16 @@
 import mock
+import transaction
 
 import redis
 from pyramid import testing
 
 from cliquet.utils import sqlalchemy
 from cliquet.storage import exceptions
+from cliquet.cache import memory as memory_cache
 from cliquet.permission import (PermissionBase, redis as redis_backend,
                                 memory as memory_backend,
                                 postgresql as postgresql_backend, heartbeat)
+from cliquet.permission.cached import CachedPermission, _version_key
 
 from .support import unittest, skip_if_no_postgresql, DummyRequest
 
@@ -29,6 +32,7 @@ class PermissionBaseTest(unittest.TestCase):
             (self.permission.object_permission_principals, '', ''),
             (self.permission.object_permissions, ''),
             (self.permission.replace_object_permissions, '', {}),
+            (self.permission.set_object_permissions, '', {}),
             (self.permission.delete_object_permissions, ''),
             (self.permission.principals_accessible_objects, [], ''),
             (self.permission.object_permission_authorized_principals, '', ''),
@@ -75,6 +79,7 @@ class BaseTestPermission(object):
             (self.permission.object_permission_principals, '', ''),
             (self.permission.object_permissions, ''),
             (self.permission.replace_object_permissions, '', {'write': []}),
+            (self.permission.set_object_permissions, '', {'write': []}, ''),
             (self.permission.delete_object_permissions, ''),
             (self.permission.principals_accessible_objects, [], ''),
             (self.permission.object_permission_authorized_principals, '', ''),
@@ -432,6 +437,49 @@ class BaseTestPermission(object):
         object_permissions = self.permission.object_permissions('/url/a/id/1')
         self.assertEqual(len(object_permissions), 0)
 
+    def test_set_object_permissions_replaces_and_adds_owner(self):
+        self.permission.add_principal_to_ace('/url/a/id/1', 'write', 'user1')
+        self.permission.add_principal_to_ace('/url/a/id/1', 'read', 'user2')
+        self.permission.add_principal_to_ace('/url/a/id/1', 'read', 'user3')
+        self.permission.add_principal_to_ace('/url/a/id/1', 'obj:del', 'user1')
+
+        permissions = self.permission.set_object_permissions('/url/a/id/1', {
+            "read": ["user3", "user4"],
+            "obj:del": [],
+            "new": ["user2", "user2"]
+        }, owner='user5')
+
+        expected = {
+            "write": {"user1", "user5"},
+            "read": {"user3", "user4"},
+            "new": {"user2"}
+        }
+        self.assertDictEqual(permissions, expected)
+        object_permissions = self.permission.object_permissions('/url/a/id/1')
+        self.assertDictEqual(object_permissions, expected)
+
+    def test_set_object_permissions_keeps_owner_if_write_is_replaced(self):
+        self.permission.add_principal_to_ace('/url/a/id/1', 'write', 'user1')
+        permissions = self.permission.set_object_permissions('/url/a/id/1', {
+            "write": ["user1", "user2"]
+        }, owner='user1')
+        self.assertDictEqual(permissions, {"write": {"user1", "user2"}})
+        permissions = self.permission.set_object_permissions('/url/a/id/1', {
+            "write": ["user2"]
+        }, owner='user3')
+        self.assertDictEqual(permissions, {"write": {"user2", "user3"}})
+        object_permissions = self.permission.object_permissions('/url/a/id/1')
+        self.assertDictEqual(object_permissions, {"write": {"user2", "user3"}})
+
+    def test_set_object_permissions_supports_empty_input_and_no_owner(self):
+        self.permission.add_principal_to_ace('/url/a/id/1', 'read', 'user1')
+        permissions = self.permission.set_object_permissions('/url/a/id/1',
+                                                             {})
+        self.assertDictEqual(permissions, {"read": {"user1"}})
+        permissions = self.permission.set_object_permissions('/url/a/id/2',
+                                                             {})
+        self.assertDictEqual(permissions, {})
+
     def test_delete_object_permissions_remove_all_given_objects_acls(self):
         self.permission.add_principal_to_ace('/url/a/id/1', 'write', 'user1')
         self.permission.add_principal_to_ace('/url/a/id/1', 'write', 'user2')
@@ -467,6 +515,142 @@ class MemoryPermissionTest(BaseTestPermission, unittest.TestCase):
         pass
 
 
+class CachedPermissionTest(BaseTestPermission, unittest.TestCase):
+    backend = memory_backend
+
+    def setUp(self):
+        super(CachedPermissionTest, self).setUp()
+        self.cache = memory_cache.Cache(cache_prefix='')
+        self.permission = CachedPermission(self.permission, self.cache,
+                                           ttl=10)
+
+    def test_backend_error_is_raised_anywhere(self):
+        pass
+
+    def test_ping_returns_false_if_unavailable(self):
+        pass
+
+    def test_ping_logs_error_if_unavailable(self):
+        pass
+
+    def _get_bound_permissions(self, object_id, permission):
+        return [(object_id, permission), ('/parent', permission)]
+
+    def test_check_permission_is_read_from_cache(self):
+        self.permission.add_principal_to_ace('/obj', 'read', 'fxa:user')
+        self.permission.check_permission('/obj', 'read', {'fxa:user'})
+        backend = self.permission.backend
+        with mock.patch.object(
+                backend, 'object_permission_authorized_principals') as mocked:
+            allowed = self.permission.check_permission('/obj', 'read',
+                                                       {'fxa:user'})
+        self.assertTrue(allowed)
+        self.assertFalse(mocked.called)
+
+    def test_object_permission_principals_are_read_from_cache(self):
+        self.permission.add_principal_to_ace('/obj', 'read', 'fxa:user')
+        self.permission.object_permission_principals('/obj', 'read')
+        backend = self.permission.backend
+        with mock.patch.object(backend,
+                               'object_permission_principals') as mocked:
+            principals = self.permission.object_permission_principals(
+                '/obj', 'read')
+        self.assertEqual(principals, {'fxa:user'})
+        self.assertFalse(mocked.called)
+
+    def test_cache_is_invalidated_by_every_ace_change(self):
+        def check():
+            return self.permission.check_permission(
+                '/obj', 'read', {'fxa:user'},
+                get_bound_permissions=self._get_bound_permissions)
+
+        changes = [
+            (lambda: self.permission.add_principal_to_ace(
+                '/parent', 'read', 'fxa:user'), True),
+            (lambda: self.permission.remove_principal_from_ace(
+                '/parent', 'read', 'fxa:user'), False),
+            (lambda: self.permission.replace_object_permissions(
+                '/obj', {'read': ['fxa:user']}), True),
+            (lambda: self.permission.delete_object_permissions('/obj'),
+             False),
+        ]
+        for change, expected in changes:
+            check()
+            change()
+            self.assertEqual(check(), expected)
+
+    def test_changes_are_seen_by_other_processes_sharing_the_cache(self):
+        other = CachedPermission(self.permission.backend, self.cache, ttl=10)
+        self.assertFalse(other.check_permission('/obj', 'read', {'fxa:u'}))
+        self.permission.add_principal_to_ace('/obj', 'read', 'fxa:u')
+        self.assertTrue(other.check_permission('/obj', 'read', {'fxa:u'}))
+
+    def test_cache_is_invalidated_again_after_commit(self):
+        self.permission.add_principal_to_ace('/obj', 'read', 'fxa:user')
+        self.permission.object_permission_principals('/obj', 'read')
+        version = self.cache.get(_version_key('/obj'))
+        transaction.commit()
+        self.assertIsNotNone(version)
+        self.assertIsNone(self.cache.get(_version_key('/obj')))
+
+    def test_cache_is_not_invalidated_by_changes_on_other_objects(self):
+        self.permission.add_principal_to_ace('/obj', 'read', 'fxa:user')
+        self.permission.object_permission_principals('/obj', 'read')
+        self.permission.add_principal_to_ace('/other', 'read', 'fxa:user')
+        backend = self.permission.backend
+        with mock.patch.object(backend,
+                               'object_permission_principals') as mocked:
+            self.permission.object_permission_principals('/obj', 'read')
+        self.assertFalse(mocked.called)
+
+    def test_cache_is_invalidated_by_flush(self):
+        self.permission.add_principal_to_ace('/obj', 'read', 'fxa:user')
+        self.permission.object_permission_principals('/obj', 'read')
+        self.permission.flush()
+        principals = self.permission.object_permission_principals('/obj',
+                                                                  'read')
+        self.assertEqual(principals, set())
+
+    def test_authorized_principals_depend_on_bound_permissions(self):
+        self.permission.add_principal_to_ace('/parent', 'read', 'fxa:user')
+        self.assertFalse(self.permission.check_permission(
+            '/obj', 'read', {'fxa:user'},
+            get_bound_permissions=lambda o, p: [(o, p)]))
+        self.assertTrue(self.permission.check_permission(
+            '/obj', 'read', {'fxa:user'},
+            get_bound_permissions=self._get_bound_permissions))
+
+    def test_principals_are_fetched_if_version_is_missing(self):
+        self.permission.add_principal_to_ace('/obj', 'read', 'fxa:user')
+        self.permission.object_permission_principals('/obj', 'read')
+        self.cache.delete(_version_key('/obj'))
+        backend = self.permission.backend
+        with mock.patch.object(backend, 'object_permission_principals',
+                               return_value=set()) as mocked:
+            self.permission.object_permission_principals('/obj', 'read')
+        self.assertTrue(mocked.called)
+        self.assertIsNotNone(self.cache.get(_version_key('/obj')))
+        self.assertGreater(self.cache.ttl(_version_key('/obj')), 0)
+
+    def test_missing_versions_are_created_before_fetching(self):
+        def fetch(object_id, permission):
+            # A change is made while principals are fetched.
+            self.permission.add_principal_to_ace('/obj', 'read', 'fxa:user')
+            return set()
+
+        backend = self.permission.backend
+        with mock.patch.object(backend, 'object_permission_principals',
+                               side_effect=fetch):
+            self.permission.object_permission_principals('/obj', 'read')
+        principals = self.permission.object_permission_principals('/obj',
+                                                                  'read')
+        self.assertEqual(principals, {'fxa:user'})
+
+    def test_backend_attributes_are_available(self):
+        self.permission.backend.client = mock.sentinel.client
+        self.assertEqual(self.permission.client, mock.sentinel.client)
+
+
 class RedisPermissionTest(BaseTestPermission, unittest.TestCase):
     backend = redis_backend
     settings = {
@@ -494,6 +678,157 @@ class RedisPermissionTest(BaseTestPermission, unittest.TestCase):
             backend.settings,
             {'host': 'db.loc', 'password': 'pass', 'db': 5, 'port': 1234})
 
+    def _count_commands(self, method, *args, **kwargs):
+        # Scripts are loaded on the server when run for the first time.
+        client = self.permission._client
+        for script in (self.permission._matching_aces_script,
+                       self.permission._set_permissions_script):
+            script.sha = client.script_load(script.script)
+        with mock.patch.object(client, 'execute_command',
+                               wraps=client.execute_command) as mocked:
+            result = method(*args, **kwargs)
+        return result, [call[0][0] for call in mocked.call_args_list]
+
+    def test_check_permission_is_a_single_round_trip(self):
+        self.permission.add_principal_to_ace('/url/a', 'write', 'user1')
+
+        def get_bound_permissions(object_id, permission):
+            return [('/url', 'write'), ('/url', 'read'),
+                    ('/url/a', 'write'), ('/url/a', 'read'),
+                    ('/url/a/b', 'write'), ('/url/a/b', 'read')]
+        allowed, commands = self._count_commands(
+            self.permission.check_permission, '/url/a/b', 'read',
+            {'user1', 'group'}, get_bound_permissions=get_bound_permissions)
+        self.assertTrue(allowed)
+        self.assertEqual(commands, ['EVALSHA'])
+        allowed, commands = self._count_commands(
+            self.permission.check_permission, '/url/a/b', 'read',
+            {'user2', 'group'}, get_bound_permissions=get_bound_permissions)
+        self.assertFalse(allowed)
+        self.assertEqual(commands, ['EVALSHA'])
+
+    def test_set_object_permissions_is_a_single_round_trip(self):
+        self.permission.add_principal_to_ace('/url/a', 'read', 'user1')
+        permissions, commands = self._count_commands(
+            self.permission.set_object_permissions, '/url/a',
+            {'write': ['user2']}, owner='user3')
+        self.assertEqual(permissions, {'read': {'user1'},
+                                       'write': {'user2', 'user3'}})
+        self.assertEqual(commands, ['EVALSHA'])
+
+    def test_accessible_objects_do_not_scan_the_keyspace(self):
+        for i in range(20):
+            self.permission.add_principal_to_ace('/url/%s' % i, 'read',
+                                                 'user%s' % (i % 2))
+        with mock.patch.object(self.permission._client, 'scan_iter') as scan:
+            objects = self.permission.principals_accessible_objects(
+                ['user1'], 'read', object_id_match='/url/*')
+        self.assertFalse(scan.called)
+        self.assertEqual(len(objects), 10)
+
+    def test_accessible_objects_index_is_updated_on_changes(self):
+        self.permission.add_principal_to_ace('/url/a', 'read', 'user1')
+        self.permission.replace_object_permissions('/url/b', {
+            'read': ['user1', 'user2']})
+        self.permission.replace_object_permissions('/url/c', {
+            'read': ['user1']})
+        self.permission.replace_object_permissions('/url/c', {
+            'read': ['user2']})
+        self.permission.add_principal_to_ace('/url/d', 'read', 'user1')
+        self.permission.remove_principal_from_ace('/url/d', 'read', 'user1')
+        self.permission.delete_object_permissions('/url/b')
+        objects = self.permission.principals_accessible_objects(['user1'],
+                                                                'read')
+        self.assertEqual(objects, {'/url/a'})
+        objects = self.permission.principals_accessible_objects(['user2'],
+                                                                'read')
+        self.assertEqual(objects, {'/url/c'})
+        # No key is left for removed entries.
+        self.assertEqual(self.permission._client.keys('principal:user1:*'),
+                         [b'principal:user1:read'])
+
+    def test_accessible_objects_wildcard_is_the_only_special_character(self):
+        self.permission.add_principal_to_ace('/url/a?/1', 'read', 'user1')
+        self.permission.add_principal_to_ace('/url/ab/1', 'read', 'user1')
+        self.permission.add_principal_to_ace('/url/[a]/1', 'read', 'user1')
+        objects = self.permission.principals_accessible_objects(
+            ['user1'], 'read', object_id_match='/url/a?/*')
+        self.assertEqual(objects, {'/url/a?/1'})
+        objects = self.permission.principals_accessible_objects(
+            ['user1'], 'read', object_id_match='*[a]*')
+        self.assertEqual(objects, {'/url/[a]/1'})
+
+    def test_entries_of_previous_versions_are_indexed_on_migrate(self):
+        self.permission._client.sadd('permission:/url/a:read', 'user1')
+        self.permission._client.sadd('permission:/url/b:write', 'user1',
+                                     'user2')
+        self.permission.initialize_schema()
+        objects = self.permission.principals_accessible_objects(['user2'],
+                                                                'write')
+        self.assertEqual(objects, {'/url/b'})
+        objects = self.permission.principals_accessible_objects(['user1'],
+                                                                'read')
+        self.assertEqual(objects, {'/url/a'})
+
+    def _store_previous_version_entries(self):
+        self.permission._client.flushdb()
+        self.permission._indexed = False
+        self.permission._index_checked = False
+        self.permission._client.sadd('permission:/url/a:read', 'user1')
+        self.permission._client.sadd('permission:/url/b:write', 'user1',
+                                     'user2')
+
+    def test_entries_of_previous_versions_are_found_before_migrate(self):
+        self._store_previous_version_entries()
+        objects = self.permission.principals_accessible_objects(['user2'],
+                                                                'write')
+        self.assertEqual(objects, {'/url/b'})
+        permissions = self.permission.object_permissions('/url/b')
+        self.assertEqual(permissions, {'write': {'user1', 'user2'}})
+
+    def test_entries_of_previous_versions_are_deleted_before_migrate(self):
+        self._store_previous_version_entries()
+        self.permission.delete_object_permissions('/url/a', '/url/b')
+        self.assertEqual(self.permission._client.keys('permission:*'), [])
+        objects = self.permission.principals_accessible_objects(['user1'],
+                                                                'write')
+        self.assertEqual(objects, set())
+
+    def test_entries_of_previous_versions_are_not_indexed_on_writes(self):
+        self._store_previous_version_entries()
+        permissions = self.permission.set_object_permissions(
+            '/url/a', {'write': ['user3']})
+        self.assertEqual(permissions, {'read': {'user1'}, 'write': {'user3'}})
+        members = self.permission._client.smembers('object:/url/a:permissions')
+        self.assertEqual(members, {b'write'})
+
+    def test_missing_index_warning_is_logged_once(self):
+        self._store_previous_version_entries()
+        with mock.patch('cliquet.permission.redis.logger') as logger:
+            self.permission.object_permissions('/url/a')
+            self.permission.delete_object_permissions('/url/b')
+        self.assertEqual(logger.warning.call_count, 1)
+
+    def test_index_is_used_if_there_is_no_entry_of_previous_versions(self):
+        self.permission._client.flushdb()
+        self.permission._indexed = False
+        self.permission._index_checked = False
+        self.permission.principals_accessible_objects(['user1'], 'read')
+        self.permission.add_principal_to_ace('/url/a', 'read', 'user1')
+        other = self.backend.load_from_config(self._get_config())
+        with mock.patch.object(other._client, 'scan_iter') as scan:
+            objects = other.principals_accessible_objects(['user1'], 'read')
+        self.assertFalse(scan.called)
+        self.assertEqual(objects, {'/url/a'})
+
+    def test_scripts_are_loaded_again_if_flushed_from_server(self):
+        self.permission.add_principal_to_ace('/url/a', 'read', 'user1')
+        self.assertTrue(self.permission.check_permission('/url/a', 'read',
+                                                         {'user1'}))
+        self.permission._client.script_flush()
+        self.assertTrue(self.permission.check_permission('/url/a', 'read',
+                                                         {'user1'}))
+
 
 @skip_if_no_postgresql
 class PostgreSQLPermissionTest(BaseTestPermission, unittest.TestCase):
@@ -510,3 +845,141 @@ class PostgreSQLPermissionTest(BaseTestPermission, unittest.TestCase):
             self.permission.client,
             'session_factory',
             side_effect=sqlalchemy.exc.SQLAlchemyError)]
+
+    def _executed_calls(self, method, *args, **kwargs):
+        session = self.permission.client.session_factory()
+        with mock.patch.object(session, 'execute',
+                               wraps=session.execute) as mocked:
+            method(*args, **kwargs)
+        return [call[0] for call in mocked.call_args_list]
+
+    def _executed_queries(self, method, *args, **kwargs):
+        calls = self._executed_calls(method, *args, **kwargs)
+        return [call[0] for call in calls]
+
+    def _explain(self, method, *args, **kwargs):
+        query, placeholders = self._executed_calls(method, *args, **kwargs)[0]
+        with self.permission.client.connect(readonly=True) as conn:
+            result = conn.execute('EXPLAIN ' + query, placeholders)
+            return '\n'.join([r[0] for r in result.fetchall()])
+
+    def test_check_permission_query_does_not_depend_on_values(self):
+        first = self._executed_queries(
+            self.permission.check_permission, 'obj', 'read', {'alice'})
+        second = self._executed_queries(
+            self.permission.check_permission, 'obj', 'read',
+            {'bob', 'carol', 'dave'},
+            get_bound_permissions=lambda o, p: [('obj', 'read'),
+                                                ('obj', 'write'),
+                                                ('parent', 'write')])
+        self.assertEqual(first, second)
+
+    def test_accessible_objects_query_does_not_depend_on_values(self):
+        first = self._executed_queries(
+            self.permission.principals_accessible_objects, ['alice'], 'read')
+        second = self._executed_queries(
+            self.permission.principals_accessible_objects,
+            ['bob', 'carol'], 'read', object_id_match='/url/*',
+            get_bound_permissions=lambda o, p: [('/url/*', 'read'),
+                                                ('/url/*', 'write')])
+        self.assertEqual(first, second)
+
+    def test_replace_object_permissions_query_does_not_depend_on_values(self):
+        first = self._executed_queries(
+            self.permission.replace_object_permissions,
+            'obj', {'read': ['alice']})
+        second = self._executed_queries(
+            self.permission.replace_object_permissions,
+            'obj', {'read': ['alice', 'bob'], 'write': ['carol']})
+        self.assertEqual(first, second)
+
+    def test_set_object_permissions_is_a_single_query(self):
+        queries = self._executed_queries(
+            self.permission.set_object_permissions, 'obj',
+            {'read': ['alice']}, owner='bob')
+        self.assertEqual(len(queries), 1)
+
+    def test_values_are_not_interpolated_in_queries(self):
+        principal = "system.Everyone'); DROP TABLE access_control_entries; --"
+        object_id = "/buckets/o'reilly"
+        self.permission.add_principal_to_ace(object_id, 'read', principal)
+        self.assertTrue(self.permission.check_permission(
+            object_id, 'read', {principal}))
+        authorized = self.permission.object_permission_authorized_principals(
+            object_id, 'read')
+        self.assertEqual(authorized, {principal})
+        self.assertEqual(self.permission.principals_accessible_objects(
+            [principal], 'read'), {object_id})
+        self.permission.replace_object_permissions(object_id,
+                                                   {'write': [principal]})
+        self.assertEqual(self.permission.object_permissions(object_id),
+                         {'read': {principal}, 'write': {principal}})
+
+    def test_accessible_objects_wildcard_is_the_only_special_character(self):
+        self.permission.add_principal_to_ace('/url/a_b/1', 'read', 'user1')
+        self.permission.add_principal_to_ace('/url/aXb/1', 'read', 'user1')
+        self.permission.add_principal_to_ace('/url/100%/1', 'read', 'user1')
+        self.permission.add_principal_to_ace('/url/1000/1', 'read', 'user1')
+        object_ids = self.permission.principals_accessible_objects(
+            ['user1'], 'read', object_id_match='/url/a_b/*')
+        self.assertEqual(object_ids, {'/url/a_b/1'})
+        object_ids = self.permission.principals_accessible_objects(
+            ['user1'], 'read', object_id_match='/url/100%/*')
+        self.assertEqual(object_ids, {'/url/100%/1'})
+
+    def test_accessible_objects_can_be_checked_without_being_fetched(self):
+        self.permission.add_principal_to_ace('/url/a/1', 'read', 'user1')
+        accessible = self.permission.accessible_objects(
+            ['user1'], 'read', object_id_match='/url/a/*')
+        self.assertTrue(accessible.exists())
+        self.assertEqual(accessible.fetch(), {'/url/a/1'})
+        accessible = self.permission.accessible_objects(
+            ['user2'], 'read', object_id_match='/url/a/*')
+        self.assertFalse(accessible.exists())
+
+    def test_accessible_objects_sub_query_selects_last_segments(self):
+        self.permission.add_principal_to_ace('/url/a/1', 'read', 'user1')
+        self.permission.add_principal_to_ace('/url/a/2', 'read', 'user1')
+        accessible = self.permission.accessible_objects(
+            ['user1'], 'read', object_id_match='/url/a/*')
+        query, placeholders = accessible.format(prefix='filter_')
+        self.assertTrue(all([p.startswith('filter_') for p in placeholders]))
+        with self.permission.client.connect(readonly=True) as conn:
+            result = conn.execute(query, placeholders)
+            ids = set([r[0] for r in result.fetchall()])
+        self.assertEqual(ids, {'1', '2'})
+
+    def _populate_and_analyze(self):
+        query = """
+        INSERT INTO access_control_entries (object_id, permission, principal)
+        SELECT '/buckets/' || i || '/records/' || j, p, 'user' || j
+          FROM generate_series(1, 200) AS i, generate_series(1, 20) AS j,
+               unnest(ARRAY['read', 'write']) AS p;
+        """
+        with self.permission.client.connect() as conn:
+            conn.execute(query)
+            engine = conn.get_bind()
+        # Update the visibility map, outside transaction.
+        with engine.connect() as conn:
+            conn = conn.execution_options(isolation_level='AUTOCOMMIT')
+            conn.execute('VACUUM ANALYZE access_control_entries;')
+
+    def test_accessible_objects_are_looked_up_by_prefix_in_index(self):
+        self._populate_and_analyze()
+        plan = self._explain(self.permission.principals_accessible_objects,
+                             ['user1', 'user2'], 'read',
+                             object_id_match='/buckets/42/records/*')
+        self.assertIn('Index Only Scan using '
+                      'idx_access_control_entries_permission_object_id_'
+                      'principal', plan)
+        self.assertNotIn('Seq Scan', plan)
+
+    def test_check_permission_is_an_index_only_scan(self):
+        self._populate_and_analyze()
+        plan = self._explain(
+            self.permission.check_permission, '/buckets/42/records/7',
+            'read', {'user7', 'system.Everyone'},
+            get_bound_permissions=lambda o, p: [(o, 'read'), (o, 'write'),
+                                                ('/buckets/42', 'write')])
+        self.assertIn('Index Only Scan', plan)
+        self.assertNotIn('Seq Scan', plan)
@@ -0,0 +1,142 @@
+import mock
+from pyramid import testing
+
+from cliquet.permission import postgresql
+
+from .support import unittest, skip_if_no_postgresql
+
+
+# Schema installed by versions of Cliquet without permission migrations.
+FIRST_VERSION_SCHEMA = """
+CREATE TABLE IF NOT EXISTS user_principals (
+    user_id TEXT,
+    principal TEXT,
+
+    PRIMARY KEY (user_id, principal)
+);
+
+CREATE TABLE IF NOT EXISTS access_control_entries (
+    object_id TEXT,
+    permission TEXT,
+    principal TEXT,
+
+    PRIMARY KEY (object_id, permission, principal)
+);
+CREATE INDEX idx_access_control_entries_object_id
+    ON access_control_entries(object_id);
+CREATE INDEX idx_access_control_entries_permission
+    ON access_control_entries(permission);
+CREATE INDEX idx_access_control_entries_principal
+    ON access_control_entries(principal);
+"""
+
+
+@skip_if_no_postgresql
+class PostgresqlPermissionMigrationTest(unittest.TestCase):
+    def __init__(self, *args, **kwargs):
+        super(PostgresqlPermissionMigrationTest, self).__init__(*args,
+                                                                **kwargs)
+        from cliquet.utils import sqlalchemy
+        if sqlalchemy is None:
+            return
+
+        from .test_permission import PostgreSQLPermissionTest
+        self.settings = PostgreSQLPermissionTest.settings.copy()
+        self.config = testing.setUp()
+        self.config.add_settings(self.settings)
+        self.version = postgresql.Permission.schema_version
+        self.permission = postgresql.load_from_config(self.config)
+
+    def setUp(self):
+        # Start empty.
+        self._delete_everything()
+        # Create schema in its last version
+        self.permission.initialize_schema()
+        # Patch to keep track of SQL files executed.
+        self.sql_execute_patcher = mock.patch(
+            'cliquet.permission.postgresql.Permission._execute_sql_file')
+
+    def tearDown(self):
+        postgresql.Permission.schema_version = self.version
+        mock.patch.stopall()
+
+    def _delete_everything(self):
+        q = """
+        DROP TABLE IF EXISTS user_principals CASCADE;
+        DROP TABLE IF EXISTS access_control_entries CASCADE;
+        DO $$
+        BEGIN
+          IF EXISTS (SELECT 1 FROM pg_tables WHERE tablename = 'metadata')
+          THEN
+            DELETE FROM metadata WHERE name = 'permission_schema_version';
+          END IF;
+        END$$;
+        """
+        with self.permission.client.connect() as conn:
+            conn.execute(q)
+
+    def _indexes(self):
+        query = """
+        SELECT indexname
+          FROM pg_indexes
+         WHERE tablename = 'access_control_entries';
+        """
+        with self.permission.client.connect() as conn:
+            result = conn.execute(query)
+            return set([r['indexname'] for r in result.fetchall()])
+
+    def test_schema_sets_the_current_version(self):
+        version = self.permission._get_installed_version()
+        self.assertEqual(version, self.version)
+
+    def test_schema_is_not_recreated_from_scratch_if_already_exists(self):
+        mocked = self.sql_execute_patcher.start()
+        self.permission.initialize_schema()
+        self.assertFalse(mocked.called)
+
+    def test_schema_is_considered_first_version_if_no_version_detected(self):
+        with self.permission.client.connect() as conn:
+            q = ("DELETE FROM metadata "
+                 "WHERE name = 'permission_schema_version';")
+            conn.execute(q)
+
+        mocked = self.sql_execute_patcher.start()
+        self.permission.initialize_schema()
+        mocked.assert_any_call('migrations/migration_001_002.sql')
+
+    def test_migration_fails_if_intermediary_version_is_missing(self):
+        with mock.patch.object(self.permission,
+                               '_get_installed_version') as current:
+            current.return_value = -1
+            self.sql_execute_patcher.start()
+            self.assertRaises(AssertionError,
+                              self.permission.initialize_schema)
+
+    def test_every_available_migration(self):
+        self._delete_everything()
+        with self.permission.client.connect() as conn:
+            conn.execute(FIRST_VERSION_SCHEMA)
+        self.permission.add_principal_to_ace('/buckets/a', 'write', 'alice')
+
+        version = self.permission._get_installed_version()
+        self.assertEqual(version, 1)
+
+        self.permission.initialize_schema()
+
+        version = self.permission._get_installed_version()
+        self.assertEqual(version, self.version)
+        self.assertEqual(self._indexes(), {
+            'access_control_entries_pkey',
+            'idx_access_control_entries_principal',
+            'idx_access_control_entries_permission_object_id_principal'})
+        # Previously created entries are still here.
+        self.assertTrue(self.permission.check_permission(
+            '/buckets/a', 'write', {'alice'}))
+
+    def test_every_available_migration_succeeds_if_metadata_was_flushed(self):
+        # The metadata table can be flushed by the storage backend.
+        with self.permission.client.connect() as conn:
+            conn.execute("DELETE FROM metadata;")
+        self.permission.initialize_schema()
+        version = self.permission._get_installed_version()
+        self.assertEqual(version, self.version)
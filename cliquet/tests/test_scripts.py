@@ -1,5 +1,6 @@
 import mock
 
+from cliquet.resource import BaseResource, ResourceSchema
 from cliquet.scripts import cliquet as cliquet_script
 
 from .support import unittest
@@ -8,6 +9,8 @@ from .support import unittest
 class InitSchemaTest(unittest.TestCase):
     def setUp(self):
         self.registry = mock.MagicMock()
+        self.registry.settings = {}
+        self.registry.cornice_services = {}
 
     def run_command(self, command):
         with mock.patch('cliquet.scripts.cliquet.bootstrap') as mocked:
@@ -28,6 +31,14 @@ class InitSchemaTest(unittest.TestCase):
         self.assertTrue(self.registry.cache.initialize_schema.called)
         self.assertTrue(self.registry.permission.initialize_schema.called)
 
+    def test_purge_cache_purges_expired_values(self):
+        self.run_command('purge-cache')
+        self.assertTrue(self.registry.cache.purge_expired.called)
+
+    def test_purge_cache_does_nothing_without_cache(self):
+        del self.registry.cache
+        self.run_command('purge-cache')  # not raising
+
     def test_migrate_in_read_only_display_warnings(self):
         with mock.patch('cliquet.scripts.cliquet.warnings.warn') as mocked:
             self.registry.settings = {'readonly': 'true'}
@@ -36,3 +47,29 @@ class InitSchemaTest(unittest.TestCase):
                                    'while in readonly mode.')
             mocked.assert_any_call('Cannot migrate the permission backend '
                                    'while in readonly mode.')
+
+    def test_migrate_updates_indices_of_resources_fields(self):
+        class Schema(ResourceSchema):
+            class Options:
+                indexed_fields = ('status',)
+
+        class Article(BaseResource):
+            mapping = Schema()
+
+        collection = mock.MagicMock(resource=Article)
+        record = mock.MagicMock(resource=Article)
+        self.registry.cornice_services = {'/articles': collection,
+                                          '/articles/{id}': record,
+                                          '/': object()}
+        self.run_command('migrate')
+        update = self.registry.storage.update_field_indices
+        update.assert_called_once_with(collection_id='article',
+                                       fields=('status',),
+                                       id_field='id',
+                                       modified_field='last_modified')
+
+    def test_migrate_does_not_update_indices_in_readonly(self):
+        self.registry.settings = {'readonly': 'true'}
+        self.run_command('migrate')
+        update = self.registry.storage.update_field_indices
+        self.assertFalse(update.called)
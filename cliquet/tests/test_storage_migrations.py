@@ -151,6 +151,23 @@ class PostgresqlStorageMigrationTest(unittest.TestCase):
         version = self.storage._get_installed_version()
         self.assertEqual(version, self.version)
 
+    def test_schema_is_created_if_permission_schema_was_created_first(self):
+        # The metadata table can be shared with the permission backend.
+        self._delete_everything()
+        with self.storage.client.connect() as conn:
+            conn.execute("""
+            CREATE TABLE metadata (name VARCHAR(128) NOT NULL,
+                                   value VARCHAR(512) NOT NULL);
+            INSERT INTO metadata (name, value)
+            VALUES ('permission_schema_version', '2');
+            """)
+        self.assertIsNone(self.storage._get_installed_version())
+        self.storage.initialize_schema()
+        version = self.storage._get_installed_version()
+        self.assertEqual(version, self.version)
+        record = self.storage.create('test', 'jean-louis', {'drink': 'mate'})
+        self.storage.delete('test', 'jean-louis', record['id'])
+
 
 class PostgresqlExceptionRaisedTest(unittest.TestCase):
     def setUp(self):
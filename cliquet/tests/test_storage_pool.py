@@ -72,6 +72,23 @@ class QueuePoolWithMaxBacklogTest(unittest.TestCase):
         self.assertEquals(len(self.connections), 3)
         self.assertEquals(len(self.errors), 3)
 
+    def test_cliquet_settings_are_not_passed_to_engine(self):
+        from cliquet.storage.postgresql.client import create_from_config
+
+        config = testing.setUp(settings={
+            'pooltest_url': 'sqlite://',
+            'pooltest_backend': 'cliquet.cache.postgresql',
+            'pooltest_prefix': 'stack1_',
+            'pooltest_max_size_bytes': 1000,
+            'pooltest_itersize': 100,
+            'pooltest_purge_interval_seconds': 60,
+            'pooltest_cache_ttl_seconds': 10,
+            'pooltest_tiered_backend': 'cliquet.cache.postgresql',
+            'pooltest_tiered_ttl_seconds': 5,
+            'pooltest_some_future_setting': 'value',
+        })
+        create_from_config(config, prefix='pooltest_')  # not raising
+
     def test_recreates_reinstantiate_with_same_pool_class(self):
         from cliquet.storage.postgresql.pool import QueuePoolWithMaxBacklog
         pool = QueuePoolWithMaxBacklog(None, max_backlog=2, pool_size=2)
@@ -14,7 +14,7 @@ from pyramid import testing
 from cliquet.utils import (
     native_value, strip_whitespace, random_bytes_hex, read_env, hmac_digest,
     current_service, encode_header, decode_header, follow_subrequest,
-    build_request, dict_subset
+    build_request, dict_subset, json, json_serializer, JSONCodec
 )
 
 from .support import unittest, DummyRequest
@@ -246,3 +246,44 @@ class DictSubsetTest(unittest.TestCase):
         obtained = dict_subset(input, ["a", "b.c.d", "b.d"])
         expected = dict(a=1, b=dict(c=2, d=3))
         self.assertEqual(obtained, expected)
+
+
+class JSONCodecTest(unittest.TestCase):
+    def setUp(self):
+        self.codec = JSONCodec()
+
+    def tearDown(self):
+        json.configure()
+
+    def test_ujson_is_used_by_default(self):
+        import ujson
+        self.assertEqual(self.codec.name, 'ujson')
+        self.assertEqual(self.codec.dumps, ujson.dumps)
+        self.assertEqual(self.codec.loads, ujson.loads)
+
+    def test_codec_can_be_specified(self):
+        import simplejson
+        self.codec.configure('simplejson')
+        self.assertEqual(self.codec.dumps, simplejson.dumps)
+        self.assertEqual(self.codec.loads, simplejson.loads)
+
+    def test_raises_if_codec_is_not_installed(self):
+        self.assertRaises(ImportError, self.codec.configure, 'unknown_json')
+
+    def test_ujson_serializer_does_not_escape_slashes(self):
+        serialized = self.codec.serializer({'url': 'http://moz.org'})
+        self.assertEqual(serialized, '{"url":"http://moz.org"}')
+
+    def test_serializer_options_are_passed_to_other_codecs(self):
+        self.codec.configure('json')
+        serialized = self.codec.serializer(object(), default=lambda o: 'o')
+        self.assertEqual(serialized, '"o"')
+
+    def test_modules_use_the_configured_codec(self):
+        from cliquet.cache import redis
+        from cliquet.listeners import redis as listener
+        json.configure('json')
+        record = {'url': 'http://moz.org'}
+        self.assertEqual(redis.json.dumps(record), '{"url": "http://moz.org"}')
+        self.assertEqual(listener.json.loads('[1]'), [1])
+        self.assertEqual(json_serializer(record), '{"url": "http://moz.org"}')
@@ -1,10 +1,13 @@
 # -*- coding: utf-8 -*-
 import colander
 import mock
+import threading
 import uuid
 
+from cornice.util import extract_request_data
 from pyramid.response import Response
 
+from cliquet.views import batch as batch_module
 from cliquet.views.batch import BatchPayloadSchema, batch as batch_service
 from cliquet.tests.support import BaseWebTest, unittest, DummyRequest
 from cliquet.utils import json
@@ -159,6 +162,182 @@ class BatchViewTest(BaseWebTest, unittest.TestCase):
         self.assertEqual(resp.json['responses'][0]['status'], 201)
         self.assertEqual(resp.json['responses'][1]['status'], 412)
 
+    def test_collection_timestamp_is_fetched_once_for_reads(self):
+        request = {'path': '/mushrooms'}
+        body = {'requests': [request, request, request]}
+        with mock.patch.object(self.storage, 'collection_timestamp',
+                               wraps=self.storage.collection_timestamp) as m:
+            self.app.post_json('/batch', body, headers=self.headers)
+        self.assertEqual(m.call_count, 1)
+
+    def test_collection_timestamp_is_fetched_again_after_writes(self):
+        body = {'requests': [
+            {'path': '/mushrooms'},
+            {'method': 'POST', 'path': '/mushrooms',
+             'body': {'data': {'name': 'Amanite'}}},
+            {'path': '/mushrooms'},
+        ]}
+        resp = self.app.post_json('/batch', body, headers=self.headers)
+        responses = resp.json['responses']
+        created = responses[1]['body']['data']
+        self.assertNotEqual(responses[0]['headers']['ETag'],
+                            responses[2]['headers']['ETag'])
+        self.assertEqual(responses[2]['headers']['ETag'],
+                         '"%s"' % created['last_modified'])
+
+
+class BulkCreationBatchViewTest(BaseWebTest, unittest.TestCase):
+
+    def _post_batch(self, requests, path='/mushrooms'):
+        body = {'defaults': {'method': 'POST', 'path': path},
+                'requests': requests}
+        with mock.patch.object(self.storage, 'create_many',
+                               wraps=self.storage.create_many) as bulk:
+            with mock.patch.object(self.storage, 'create',
+                                   wraps=self.storage.create) as single:
+                resp = self.app.post_json('/batch', body,
+                                          headers=self.headers)
+        return resp.json['responses'], bulk, single
+
+    def test_records_of_consecutive_creations_are_created_at_once(self):
+        requests = [{'body': {'data': {'name': 'Amanite %s' % i}}}
+                    for i in range(3)]
+        responses, bulk, single = self._post_batch(requests)
+        self.assertEqual(bulk.call_count, 1)
+        self.assertFalse(single.called)
+        self.assertEqual([r['status'] for r in responses], [201] * 3)
+        created = [r['body']['data'] for r in responses]
+        self.assertEqual([r['name'] for r in created],
+                         ['Amanite 0', 'Amanite 1', 'Amanite 2'])
+        resp = self.app.get('/mushrooms', headers=self.headers)
+        self.assertEqual(sorted(resp.json['data'], key=lambda r: r['name']),
+                         created)
+
+    def test_invalid_records_are_not_created(self):
+        requests = [{'body': {'data': {'name': 'Amanite'}}},
+                    {'body': {'data': {'name': 42}}},
+                    {'body': {'data': {'name': 'Cepe'}}}]
+        responses, bulk, _ = self._post_batch(requests)
+        self.assertEqual([r['status'] for r in responses], [201, 400, 201])
+        self.assertEqual(len(bulk.call_args[1]['records']), 2)
+
+    def test_records_with_ids_are_created_on_their_own(self):
+        record_id = str(uuid.uuid4())
+        requests = [{'body': {'data': {'name': 'Amanite'}}},
+                    {'body': {'data': {'id': record_id, 'name': 'Cepe'}}},
+                    {'body': {'data': {'id': record_id, 'name': 'Cepe'}}}]
+        responses, _, single = self._post_batch(requests)
+        self.assertEqual([r['status'] for r in responses], [201, 201, 200])
+        self.assertEqual(single.call_count, 2)
+
+    def test_creations_with_preconditions_are_not_deferred(self):
+        headers = {'If-Match': '"42"'}
+        requests = [{'body': {'data': {'name': 'Amanite'}},
+                     'headers': headers},
+                    {'body': {'data': {'name': 'Cepe'}}, 'headers': headers}]
+        responses, bulk, _ = self._post_batch(requests)
+        self.assertFalse(bulk.called)
+        self.assertEqual([r['status'] for r in responses], [412, 412])
+
+    def test_creations_are_visible_to_following_subrequests(self):
+        requests = [{'body': {'data': {'name': 'Amanite'}}},
+                    {'body': {'data': {'name': 'Cepe'}}},
+                    {'method': 'GET'}]
+        responses, _, _ = self._post_batch(requests)
+        self.assertEqual(len(responses[2]['body']['data']), 2)
+        last_created = responses[1]['body']['data']
+        self.assertEqual(responses[2]['headers']['ETag'],
+                         '"%s"' % last_created['last_modified'])
+
+    def test_permissions_of_shared_records_are_set(self):
+        requests = [{'body': {'data': {'name': 'Amanite'},
+                              'permissions': {'read': ['system.Everyone']}}},
+                    {'body': {'data': {'name': 'Cepe'}}}]
+        responses, bulk, _ = self._post_batch(requests, path='/toadstools')
+        self.assertEqual(bulk.call_count, 1)
+        permissions = [r['body']['permissions'] for r in responses]
+        self.assertEqual(permissions[0]['read'], ['system.Everyone'])
+        self.assertIn('write', permissions[1])
+        for response in responses:
+            record_id = response['body']['data']['id']
+            resp = self.app.get('/toadstools/%s' % record_id,
+                                headers=self.headers)
+            self.assertEqual(resp.json['permissions'],
+                             response['body']['permissions'])
+
+
+class ParallelBatchViewTest(BaseWebTest, unittest.TestCase):
+
+    def get_app_settings(self, extras=None):
+        settings = super(ParallelBatchViewTest, self).get_app_settings(extras)
+        settings['batch_parallel_requests'] = 4
+        return settings
+
+    def _run_in_threads(self, body):
+        threads = []
+        original = batch_module._run_subrequest
+
+        def run(request, subrequest):
+            threads.append((subrequest.method,
+                            threading.current_thread().name))
+            return original(request, subrequest)
+
+        with mock.patch('cliquet.views.batch._run_subrequest', run):
+            resp = self.app.post_json('/batch', body, headers=self.headers)
+        return resp, threads
+
+    def test_read_subrequests_are_run_in_other_threads(self):
+        body = {'requests': [{'path': '/mushrooms'}, {'path': '/psilos'}]}
+        _, threads = self._run_in_threads(body)
+        main = threading.current_thread().name
+        self.assertEqual(len(threads), 2)
+        self.assertNotIn(main, [name for (method, name) in threads])
+
+    def test_responses_are_returned_in_requests_order(self):
+        unknown = '/mushrooms/%s' % uuid.uuid4()
+        body = {'requests': [{'path': '/mushrooms'},
+                             {'path': unknown},
+                             {'path': '/'},
+                             {'method': 'HEAD', 'path': '/psilos'}]}
+        resp, _ = self._run_in_threads(body)
+        responses = resp.json['responses']
+        self.assertEqual([r['path'] for r in responses],
+                         ['/v0/mushrooms', '/v0' + unknown, '/v0/',
+                          '/v0/psilos'])
+        self.assertEqual([r['status'] for r in responses],
+                         [200, 404, 200, 200])
+
+    def test_subrequests_after_writes_are_run_in_current_thread(self):
+        body = {'requests': [
+            {'path': '/mushrooms'},
+            {'path': '/mushrooms'},
+            {'method': 'POST', 'path': '/mushrooms',
+             'body': {'data': {'name': 'Amanite'}}},
+            {'path': '/mushrooms'},
+            {'path': '/mushrooms'},
+        ]}
+        resp, threads = self._run_in_threads(body)
+        main = threading.current_thread().name
+        self.assertEqual([name == main for (method, name) in threads],
+                         [False, False, True, True, True])
+        responses = resp.json['responses']
+        self.assertEqual(len(responses[3]['body']['data']), 1)
+
+    def test_single_read_is_run_in_current_thread(self):
+        body = {'requests': [{'path': '/mushrooms'}]}
+        _, threads = self._run_in_threads(body)
+        main = threading.current_thread().name
+        self.assertEqual(threads, [('GET', main)])
+
+    def test_bound_data_is_shared_with_threads(self):
+        body = {'requests': [{'path': '/mushrooms'}, {'path': '/mushrooms'},
+                             {'path': '/mushrooms'}]}
+        with mock.patch.object(self.permission, 'user_principals',
+                               wraps=self.permission.user_principals) as m:
+            self._run_in_threads(body)
+        # Principals are fetched by the batch request, and reused.
+        self.assertEqual(m.call_count, 1)
+
 
 class BatchSchemaTest(unittest.TestCase):
     def setUp(self):
@@ -285,6 +464,15 @@ class BatchSchemaTest(unittest.TestCase):
         self.assertEqual(result['requests'][0]['headers'],
                          {'Authorization': 'me', 'Accept': '*/*'})
 
+    def test_defaults_values_are_not_shared_between_requests(self):
+        defaults = {'body': {'data': {'tags': ['a']}}}
+        batch_payload = {'requests': [{'path': '/'}, {'path': '/'}],
+                         'defaults': defaults}
+        result = self.schema.deserialize(self.schema.unflatten(batch_payload))
+        first, second = result['requests']
+        self.assertIsNot(first['body']['data']['tags'],
+                         second['body']['data']['tags'])
+
     def test_defaults_values_for_path_must_start_with_slash(self):
         request = {}
         defaults = {'path': 'http://localhost'}
@@ -343,6 +531,13 @@ class BatchServiceTest(unittest.TestCase):
         self.assertEqual(subrequest.body.decode('utf8'),
                          json.dumps(wanted))
 
+    def test_subrequests_body_are_not_parsed_again(self):
+        request = {'path': '/', 'body': {'json': 'payload'}}
+        self.post({'requests': [request]})
+        subrequest, = self.request.invoke_subrequest.call_args[0]
+        _, _, body, _ = extract_request_data(subrequest)
+        self.assertIs(body, request['body'])
+
     def test_subrequests_body_have_json_content_type(self):
         self.request.headers['Content-Type'] = 'text/xml'
         request = {'path': '/', 'body': {'json': 'payload'}}
@@ -54,7 +54,7 @@ class PostgreSQLTest(BaseWebTest):
     def run_failing_post(self):
         patch = mock.patch.object(
             self.permission,
-            'add_principal_to_ace',
+            'set_object_permissions',
             side_effect=BackendError('boom'))
         self.addCleanup(patch.stop)
         patch.start()
@@ -210,3 +210,35 @@ class WithoutTransactionTest(PostgreSQLTest, unittest.TestCase):
 
         resp = self.app.get('/psilos', headers=self.headers)
         self.assertEqual(len(resp.json['data']), 1)
+
+    def test_streamed_deletion_of_several_chunks(self):
+        for i in range(3):
+            self.app.post_json('/mushrooms', {'data': {'name': 'Amanite'}},
+                               headers=self.headers)
+        settings = self.app.app.registry.settings
+        with mock.patch.dict(settings, [('stream_collections', 'true')]):
+            with mock.patch('cliquet.resource.STREAMING_CHUNK_SIZE', 2):
+                resp = self.app.delete('/mushrooms', headers=self.headers)
+        self.assertEqual(len(resp.json['data']), 3)
+
+        resp = self.app.get('/mushrooms', headers=self.headers)
+        self.assertEqual(len(resp.json['data']), 0)
+
+
+@skip_if_no_postgresql
+class ParallelBatchTest(PostgreSQLTest, unittest.TestCase):
+
+    def get_app_settings(self, extras=None):
+        settings = super(ParallelBatchTest, self).get_app_settings(extras)
+        settings['batch_parallel_requests'] = 4
+        return settings
+
+    def test_connections_of_threads_are_given_back_to_pool(self):
+        session_factory = self.storage.client.session_factory
+        engine = session_factory.session_factory.kw['bind']
+        body = {'requests': [{'path': '/mushrooms'}, {'path': '/psilos'},
+                             {'path': '/mushrooms'}, {'path': '/psilos'}]}
+        resp = self.app.post_json('/batch', body, headers=self.headers)
+        statuses = [r['status'] for r in resp.json['responses']]
+        self.assertEqual(statuses, [200, 200, 200, 200])
+        self.assertEqual(engine.pool.checkedout(), 0)
@@ -1,6 +1,7 @@
 import ast
 import hashlib
 import hmac
+import importlib
 import os
 import re
 import six
@@ -11,18 +12,6 @@ from binascii import hexlify
 from six.moves.urllib import parse as urlparse
 from enum import Enum
 
-# ujson is not installable with pypy
-try:  # pragma: no cover
-    import ujson as json  # NOQA
-
-    def json_serializer(v, **kw):
-        return json.dumps(v, escape_forward_slashes=False)
-
-except ImportError:  # pragma: no cover
-    import json  # NOQA
-
-    json_serializer = json.dumps
-
 try:
     # Register psycopg2cffi as psycopg2
     from psycopg2cffi import compat
@@ -44,6 +33,54 @@ from cornice import cors
 from colander import null
 
 
+class JSONCodec(object):
+    """JSON encoder and decoder shared by storage, cache and permission
+    backends, events listeners and the responses renderer.
+
+    The underlying module (e.g. ``json``, ``simplejson``, ``ujson``) can be
+    switched with :meth:`configure`: every module that imported
+    :data:`cliquet.utils.json` uses the new one.
+    """
+    def __init__(self, name=None):
+        self.configure(name)
+
+    def configure(self, name=None):
+        """Use the module `name` to encode and decode JSON.
+
+        :param str name: name of an importable module with ``dumps()`` and
+            ``loads()`` functions. If not specified, ``ujson`` is used if
+            installed (not on PyPy), ``json`` otherwise.
+        :raises ImportError: if the module is not installed.
+        """
+        if not name:
+            try:
+                return self.configure('ujson')
+            except ImportError:  # pragma: no cover
+                return self.configure('json')
+
+        module = importlib.import_module(name)
+        self.name = name
+        # Bind functions directly, to avoid an indirection on every call.
+        self.dumps = module.dumps
+        self.loads = module.loads
+
+        if name == 'ujson':
+            def serializer(v, **kw):
+                return module.dumps(v, escape_forward_slashes=False)
+        else:
+            serializer = module.dumps
+        self.serializer = serializer
+
+
+json = JSONCodec()
+"""JSON codec used everywhere in Cliquet (see ``json_codec`` setting)."""
+
+
+def json_serializer(v, **kw):
+    """Serializer of the responses JSON renderer, using the current codec."""
+    return json.serializer(v, **kw)
+
+
 def strip_whitespace(v):
     """Remove whitespace, newlines, and tabs from the beginning/end
     of a string.
@@ -257,12 +294,14 @@ def build_request(original, dict_obj):
     headers = dict(original.headers)
     headers.update(**dict_obj.get('headers') or {})
     payload = dict_obj.get('body') or ''
+    body = None
 
     # Payload is always a dict (from ``BatchRequestSchema.body``).
     # Send it as JSON for subrequests.
     if isinstance(payload, dict):
         headers['Content-Type'] = encode_header(
             'application/json; charset=utf-8')
+        body = payload
         payload = json.dumps(payload)
 
     if six.PY3:  # pragma: no cover
@@ -275,6 +314,11 @@ def build_request(original, dict_obj):
     request.registry = original.registry
     apply_request_extensions(request)
 
+    if body is not None:
+        # The payload was already deserialized and validated along the
+        # original request: save Cornice from parsing it again.
+        request.deserializer = lambda request: body
+
     # This is used to distinguish subrequests from direct incoming requests.
     # See :func:`cliquet.initialization.setup_logging()`
     request.parent = original
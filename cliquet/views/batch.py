@@ -1,5 +1,13 @@
+import copy
+import functools
+import itertools
+import threading
+from collections import OrderedDict
+from multiprocessing.pool import ThreadPool
+
 import colander
 import six
+import transaction
 
 from pyramid import httpexceptions
 from pyramid.security import NO_PERMISSION_REQUIRED
@@ -7,6 +15,7 @@ from pyramid.security import NO_PERMISSION_REQUIRED
 from cliquet import errors
 from cliquet import logger
 from cliquet import Service
+from cliquet.resource import DeferredCreations
 from cliquet.utils import merge_dicts, build_request, build_response
 
 
@@ -56,11 +65,13 @@ class BatchPayloadSchema(colander.MappingSchema):
         self.get('defaults').get('path').missing = colander.drop
 
         # Fill requests values with defaults.
+        # Subrequests bodies are passed as is to the subrequests views: they
+        # should not share any value.
         requests = data.get('requests', [])
         for request in requests:
             defaults = data.get('defaults')
             if isinstance(defaults, dict):
-                merge_dicts(request, defaults)
+                merge_dicts(request, copy.deepcopy(defaults))
 
         return data
 
@@ -89,23 +100,49 @@ def post_batch(request):
 
     sublogger = logger.new()
 
-    for subrequest_spec in requests:
-        subrequest = build_request(request, subrequest_spec)
-
+    subrequests = [build_request(request, subrequest_spec)
+                   for subrequest_spec in requests]
+
+    # Read-only subrequests that come before any write are run concurrently.
+    # The following ones are run in order, in the current thread, since they
+    # may depend on changes not committed yet (i.e. invisible from the
+    # connections of other threads).
+    parallel = int(request.registry.settings['batch_parallel_requests'] or 0)
+    reads = list(itertools.takewhile(_is_read_only, subrequests))
+    results = []
+    if parallel > 1 and len(reads) > 1:
+        # Authenticate once, instead of once per thread: the principals
+        # are shared with subrequests through ``bound_data``.
+        request.effective_principals
+        # Each thread stacks its resource events apart, and they are merged
+        # in subrequests order once all of them have run.
+        for subrequest in reads:
+            subrequest.bound_data = dict(request.bound_data,
+                                         resource_events=OrderedDict())
+        pool = _threads_pool(parallel)
+        run = functools.partial(_run_subrequest_in_thread, request)
+        results = pool.map(run, reads)
+        _merge_resource_events(request, reads)
+
+    # Records of consecutive ``POST`` subrequests on the same collection are
+    # created at once, after their views have run.
+    remaining = list(zip(requests, subrequests))[len(results):]
+    for key, run in itertools.groupby(remaining, key=_bulk_creation_key):
+        run = [subrequest for _, subrequest in run]
+        if key is None or len(run) < 2:
+            results.extend([_run_subrequest(request, subrequest)
+                            for subrequest in run])
+            continue
+        creations = DeferredCreations()
+        for subrequest in run:
+            subrequest.deferred_creations = creations
+            results.append(_run_subrequest(request, subrequest))
+        creations.flush()
+
+    for resp, subrequest in results:
         sublogger.bind(path=subrequest.path,
-                       method=subrequest.method)
-        try:
-            # Invoke subrequest without individual transaction.
-            resp, subrequest = request.follow_subrequest(subrequest,
-                                                         use_tweens=False)
-        except httpexceptions.HTTPException as e:
-            if e.content_type == 'application/json':
-                resp = e
-            else:
-                # JSONify raw Pyramid errors.
-                resp = errors.http_error(e)
-
-        sublogger.bind(code=resp.status_code)
+                       method=subrequest.method,
+                       code=resp.status_code)
         sublogger.info('subrequest.summary')
 
         dict_resp = build_response(resp, subrequest)
@@ -120,3 +157,80 @@ def post_batch(request):
     return {
         'responses': responses
     }
+
+
+def _is_read_only(subrequest):
+    return subrequest.method in ('GET', 'HEAD')
+
+
+def _bulk_creation_key(item):
+    """Subrequests with the same key can have their records created at once.
+
+    :returns: ``None`` if the records of the subrequest should be created on
+        their own.
+    """
+    spec, subrequest = item
+    headers = spec.get('headers', {})
+    preconditions = ('if-match', 'if-none-match')
+    has_preconditions = any(h.lower() in preconditions for h in headers)
+    if subrequest.method != 'POST' or has_preconditions:
+        return None
+    return (spec['path'], sorted(headers.items()))
+
+
+def _run_subrequest(request, subrequest):
+    """Invoke the subrequest and turn errors into responses.
+
+    :rtype: tuple
+    :returns: the response and the subrequest (or the redirection request)
+    """
+    try:
+        # Invoke subrequest without individual transaction.
+        resp, subrequest = request.follow_subrequest(subrequest,
+                                                     use_tweens=False)
+    except httpexceptions.HTTPException as e:
+        if e.content_type == 'application/json':
+            resp = e
+        else:
+            # JSONify raw Pyramid errors.
+            resp = errors.http_error(e)
+    return resp, subrequest
+
+
+def _run_subrequest_in_thread(request, subrequest):
+    """Same as :func:`_run_subrequest`, from a thread of the pool.
+    """
+    try:
+        return _run_subrequest(request, subrequest)
+    finally:
+        # Transactions and logger context are bound to the current thread:
+        # give back the connections joined in the subrequest, and leave no
+        # context for the next one.
+        transaction.abort()
+        logger.new()
+
+
+def _merge_resource_events(request, subrequests):
+    """Stack the resource events of the `subrequests` on the `request`
+    ones, like if they had been run one after the other.
+    """
+    events = request.bound_data.setdefault('resource_events', OrderedDict())
+    for subrequest in subrequests:
+        stacked = subrequest.bound_data['resource_events']
+        for group_by, (action, timestamp, impacted, req) in stacked.items():
+            if group_by in events:
+                events[group_by][2].extend(impacted)
+            else:
+                events[group_by] = (action, timestamp, impacted, req)
+
+
+# Threads pools are created on first use (i.e. after the processes fork).
+_THREADS_POOLS = {}
+_THREADS_POOLS_LOCK = threading.Lock()
+
+
+def _threads_pool(size):
+    with _THREADS_POOLS_LOCK:
+        if size not in _THREADS_POOLS:
+            _THREADS_POOLS[size] = ThreadPool(processes=size)
+        return _THREADS_POOLS[size]
@@ -0,0 +1,120 @@
+"""Measure the duration of batch requests creating records (i.e. the
+``batch_create`` scenario of the load tests), compared to the way
+subrequests used to be validated and authenticated.
+
+Usage::
+
+    python loadtests/benchmarks/batch_subrequests.py --batches 200 --size 25
+
+Storage, cache and permission backends are in memory: only the processing of
+subrequests is measured.
+"""
+from __future__ import print_function
+
+import argparse
+import random
+import time
+import uuid
+
+import colander
+import mock
+import webtest
+
+from cliquet import utils
+from cliquet.authentication import BasicAuthAuthenticationPolicy
+from cliquet.resource.schema import StaticSchemaMixin
+from cliquet.tests.testapp import main as testapp
+
+
+SETTINGS = {
+    'cliquet.project_name': 'testapp',
+    'cliquet.storage_backend': 'cliquet.storage.memory',
+    'cliquet.cache_backend': 'cliquet.cache.memory',
+    'cliquet.permission_backend': 'cliquet.permission.memory',
+    'cliquet.userid_hmac_secret': 'b4c96a8692291d88fe5a97dd91846eb4',
+    'multiauth.policies': 'basicauth',
+    'cliquet.psilo_read_principals': 'system.Authenticated',
+    'cliquet.psilo_create_principals': 'system.Authenticated',
+    'cliquet.psilo_write_principals': 'system.Authenticated',
+}
+
+
+def build_record():
+    return {
+        "name": "Mushroom {0}".format(uuid.uuid4().hex),
+        "editable": (random.randint(0, 1) == 0),
+        "size": random.randint(0, 10),
+    }
+
+
+def batch_create(size):
+    """Batch payload of the ``batch_create`` load test scenario."""
+    requests = [{"body": {"data": build_record()}} for i in range(size)]
+    return {"defaults": {"method": "POST", "path": "/psilos"},
+            "requests": requests}
+
+
+def legacy_build_request(original, dict_obj):
+    """Subrequests as previously built: their body is parsed again."""
+    request = utils.build_request(original, dict_obj)
+    request.__dict__.pop('deserializer', None)
+    return request
+
+
+def legacy_unauthenticated_userid(self, request):
+    """Basic Auth as previously implemented: digest computed on each call."""
+    credentials = self._get_credentials(request)
+    if credentials:
+        username, password = credentials
+        if not username:
+            return
+        hmac_secret = request.registry.settings['userid_hmac_secret']
+        return utils.hmac_digest(hmac_secret, '%s:%s' % credentials)
+
+
+def legacy():
+    """Patch the application to process subrequests as it used to."""
+    return [
+        # Schemas were cloned by Cornice for each (sub)request.
+        mock.patch.object(StaticSchemaMixin, 'bind', colander.SchemaNode.bind),
+        mock.patch('cliquet.views.batch.build_request', legacy_build_request),
+        mock.patch.object(BasicAuthAuthenticationPolicy,
+                          'unauthenticated_userid',
+                          legacy_unauthenticated_userid),
+    ]
+
+
+def measure(app, batches, size):
+    """:returns: the average duration of a batch request in milliseconds."""
+    headers = {'Authorization': 'Basic %s' % utils.encode64('bob:secret')}
+    payloads = [batch_create(size) for i in range(batches)]
+
+    start = time.time()
+    for payload in payloads:
+        app.post_json('/v0/batch', payload, headers=headers)
+    return (time.time() - start) * 1000.0 / batches
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--batches', type=int, default=200)
+    parser.add_argument('--size', type=int, default=25)
+    args = parser.parse_args()
+
+    for name, patches in (('previous subrequests', legacy()),
+                          ('current subrequests', [])):
+        # Start with an empty storage, since the memory backends get slower
+        # as records are created.
+        app = webtest.TestApp(testapp(dict(SETTINGS)))
+        for patch in patches:
+            patch.start()
+        try:
+            duration = measure(app, args.batches, args.size)
+        finally:
+            for patch in patches:
+                patch.stop()
+        print('{0:>20}: {1:>8.2f} ms per batch'.format(name, duration))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+"""Measure the duration of accessible objects lookups (e.g. shared records
+listing) in the Redis permission backend, compared to a scan of the whole
+keyspace.
+
+Usage::
+
+    python loadtests/benchmarks/redis_permission_accessible_objects.py \\
+        --url redis://localhost:6379/5 --aces 1000000 --lookups 100
+
+.. warning::
+
+    The database of the specified Redis instance is flushed.
+"""
+from __future__ import print_function
+
+import argparse
+import random
+import time
+
+from pyramid import testing
+
+from cliquet.permission import redis as redisbackend
+
+
+COLLECTIONS = 1000
+USERS = 10000
+
+
+def load_permission(url):
+    config = testing.setUp(settings={'permission_url': url,
+                                     'permission_pool_size': 10})
+    return redisbackend.load_from_config(config)
+
+
+def populate(permission, aces):
+    """Store ACEs in the format of previous versions, and index them
+    like the ``migrate`` command does.
+    """
+    client = permission._client
+    pipe = client.pipeline(transaction=False)
+    for i in range(aces):
+        object_id = '/buckets/b/collections/%s/records/%s' % (
+            i % COLLECTIONS, i)
+        pipe.sadd('permission:%s:read' % object_id, 'user%s' % (i % USERS))
+        if i % 10000 == 0:
+            pipe.execute()
+    pipe.execute()
+
+    start = time.time()
+    permission.initialize_schema()
+    print('Indexed {0} ACEs in {1:.1f} s'.format(aces, time.time() - start))
+
+
+def scan_lookup(permission, principals, pattern):
+    """Lookup as performed by previous versions."""
+    client = permission._client
+    objects = set()
+    for key in client.scan_iter(match='permission:%s:read' % pattern,
+                                count=1000):
+        members = permission._decode_set(client.smembers(key))
+        if members & principals:
+            objects.add(key.decode('utf-8').split(':')[1])
+    return objects
+
+
+def measure(func, lookups):
+    """:returns: the average duration of `func` in milliseconds."""
+    start = time.time()
+    for i in range(lookups):
+        func()
+    return (time.time() - start) * 1000.0 / lookups
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', default='redis://localhost:6379/5')
+    parser.add_argument('--aces', type=int, default=1000000)
+    parser.add_argument('--lookups', type=int, default=100)
+    args = parser.parse_args()
+
+    permission = load_permission(args.url)
+    permission.flush()
+    populate(permission, args.aces)
+
+    def arguments():
+        principals = {'user%s' % random.randint(0, USERS - 1),
+                      'system.Everyone', 'system.Authenticated'}
+        pattern = ('/buckets/b/collections/%s/records/*' %
+                   random.randint(0, COLLECTIONS - 1))
+        return principals, pattern
+
+    def indexed():
+        principals, pattern = arguments()
+        permission.principals_accessible_objects(principals, 'read',
+                                                 object_id_match=pattern)
+
+    def scanned():
+        principals, pattern = arguments()
+        scan_lookup(permission, principals, pattern)
+
+    # The scan of the keyspace is much slower: measure a few lookups only.
+    for name, func, lookups in (('reverse index', indexed, args.lookups),
+                                ('keyspace scan', scanned, 3)):
+        duration = measure(func, lookups)
+        print('{0:>14}: {1:>10.2f} ms per lookup'.format(name, duration))
+
+    permission.flush()
+
+
+if __name__ == '__main__':
+    main()
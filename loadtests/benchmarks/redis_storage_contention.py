@@ -0,0 +1,87 @@
+"""Measure the throughput of concurrent writes in the same collection of the
+Redis storage backend.
+
+Usage::
+
+    python loadtests/benchmarks/redis_storage_contention.py \\
+        --url redis://localhost:6379/5 --threads 8 --writes 500
+
+.. warning::
+
+    The database of the specified Redis instance is flushed.
+"""
+from __future__ import print_function
+
+import argparse
+import threading
+import time
+
+from pyramid import testing
+
+from cliquet.storage import redis as redisbackend
+
+
+def load_storage(url):
+    config = testing.setUp(settings={'storage_url': url,
+                                     'storage_pool_size': 100})
+    return redisbackend.load_from_config(config)
+
+
+def run(storage, action, threads, writes):
+    """Run the `action` ``writes`` times in each of the ``threads``.
+
+    :returns: the elapsed time in seconds, and the list of results.
+    """
+    results = []
+
+    def worker(index):
+        for i in range(writes):
+            results.append(action(index, i))
+
+    pool = [threading.Thread(target=worker, args=(index,))
+            for index in range(threads)]
+    start = time.time()
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    return time.time() - start, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', default='redis://localhost:6379/5')
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--writes', type=int, default=500)
+    args = parser.parse_args()
+
+    storage = load_storage(args.url)
+    storage.flush()
+    kw = dict(collection_id='benchmark', parent_id='contention')
+
+    def create(index, i):
+        return storage.create(record={'thread': index, 'i': i}, **kw)
+
+    def update(index, i):
+        object_id = '{0}-{1}'.format(index, i)
+        return storage.update(object_id=object_id, record={'i': i}, **kw)
+
+    def delete(index, i):
+        object_id = '{0}-{1}'.format(index, i)
+        return storage.delete(object_id=object_id, **kw)
+
+    total = args.threads * args.writes
+    for name, action in (('create', create),
+                         ('update', update),
+                         ('delete', delete)):
+        elapsed, results = run(storage, action, args.threads, args.writes)
+        timestamps = set(r['last_modified'] for r in results)
+        print('{0:>8}: {1:>8.0f} writes/s, {2} distinct timestamps '
+              'for {3} writes'.format(name, total / elapsed,
+                                      len(timestamps), total))
+
+    storage.flush()
+
+
+if __name__ == '__main__':
+    main()